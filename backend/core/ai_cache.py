@@ -0,0 +1,91 @@
+"""
+Cache das respostas da IA por conteúdo: chave = modelo + hash do prompt normalizado.
+
+Chamadas determinísticas para a mesma entrada (título da conversa, insights com os mesmos
+dados, análise da mesma imagem) são respondidas da memória do processo, sem rede.
+Entradas expiram após AI_RESPONSE_CACHE_TTL segundos e, acima de AI_RESPONSE_CACHE_SIZE,
+as menos usadas recentemente são descartadas. Partes que não dá para endereçar por
+conteúdo (ex: arquivos enviados ao Gemini) desligam o cache daquela chamada.
+
+Imagens PIL também não entram na chave (hashear os pixels obriga a decodificar a imagem
+inteira): quem envia uma imagem passa os bytes do arquivo, ou um digest deles, em
+`cache_key` de ai_provider.generate_text.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+
+def _digest_part(digest, part):
+    if isinstance(part, str):
+        # Espaços e indentação não mudam o prompt
+        digest.update(b'text:')
+        digest.update(' '.join(part.split()).encode())
+    elif isinstance(part, (bytes, bytearray, memoryview)):
+        digest.update(b'bytes:')
+        digest.update(bytes(part))
+    else:
+        return False
+    digest.update(b'\0')
+    return True
+
+
+def prompt_key(model_name, contents):
+    """Chave do cache para (modelo, contents), ou None se alguma parte não for endereçável"""
+    digest = hashlib.sha256(f'{model_name}\0'.encode())
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    for part in parts:
+        if not _digest_part(digest, part):
+            return None
+    return digest.hexdigest()
+
+
+class PromptCache:
+    """LRU com TTL, thread-safe, com contadores de hits/misses/evictions por modelo"""
+
+    def __init__(self, max_entries, ttl, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # chave -> (expira_em, texto, modelo)
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def get(self, key, model_name):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._counters[(model_name, 'misses')] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters[(model_name, 'hits')] += 1
+            return entry[1]
+
+    def set(self, key, model_name, text):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, text, model_name)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                # Conta no modelo da entrada descartada, não no da que entrou
+                _, (_, _, evicted_model) = self._entries.popitem(last=False)
+                self._counters[(evicted_model, 'evictions')] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def stats(self):
+        """{modelo: {'hits': n, 'misses': n, 'evictions': n}} e o tamanho atual"""
+        with self._lock:
+            result = {}
+            for (model_name, outcome), value in self._counters.items():
+                result.setdefault(model_name, {'hits': 0, 'misses': 0, 'evictions': 0})[outcome] = value
+            return {'models': result, 'entries': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
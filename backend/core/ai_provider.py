@@ -0,0 +1,189 @@
+"""
+Provedor do Gemini compartilhado pelo processo.
+
+genai.configure() roda uma vez por processo e os GenerativeModel ficam guardados por nome,
+então cada requisição de IA só pega um handle pronto (e o cliente HTTP/gRPC já aberto).
+Depois de um fork (workers do gunicorn com --preload) o filho descarta o provedor herdado
+e cria o seu na primeira chamada: conexões não são compartilhadas entre processos.
+
+AI_PROVIDER=fake (ou use_provider(FakeProvider(...)) nos testes) troca o Gemini por um
+provedor local que responde sem rede.
+
+Todas as chamadas passam por generate_text() / stream_text(): as determinísticas são
+respondidas pelo cache por conteúdo de core/ai_cache.py quando o prompt se repete.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from django.conf import settings
+
+from .ai_cache import PromptCache, prompt_key
+
+DEFAULT_MODEL = 'gemini-2.5-flash'
+
+_provider = None
+_provider_lock = threading.Lock()
+
+response_cache = PromptCache(
+    max_entries=settings.AI_RESPONSE_CACHE_SIZE,
+    ttl=settings.AI_RESPONSE_CACHE_TTL,
+)
+
+
+class GeminiProvider:
+    def __init__(self, api_key):
+        import google.generativeai as genai
+
+        self._genai = genai
+        genai.configure(api_key=api_key)
+        self._models = {}
+        self._models_lock = threading.Lock()
+
+    def model(self, name=DEFAULT_MODEL):
+        model = self._models.get(name)
+        if model is None:
+            with self._models_lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._models[name] = self._genai.GenerativeModel(name)
+        return model
+
+    def upload_file(self, path):
+        return self._genai.upload_file(path)
+
+    def get_file(self, name):
+        return self._genai.get_file(name)
+
+    def delete_file(self, name):
+        return self._genai.delete_file(name)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, provider, name):
+        self.provider = provider
+        self.name = name
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        self.provider.calls.append((self.name, contents))
+        reply = self.provider.reply
+        text = reply(self.name, contents) if callable(reply) else reply
+        if stream:
+            # Um pedaço por palavra, como os chunks do stream do Gemini
+            words = text.split(' ')
+            return [FakeResponse(word if i == 0 else ' ' + word) for i, word in enumerate(words)]
+        return FakeResponse(text)
+
+
+class FakeProvider:
+    """
+    Provedor local para testes e desenvolvimento sem chave. `reply` é um texto fixo ou
+    uma função (nome_do_modelo, contents) -> texto; as chamadas ficam em `calls`.
+    """
+
+    def __init__(self, reply='Resposta de teste'):
+        self.reply = reply
+        self.calls = []
+        self._models = {}
+
+    def model(self, name=DEFAULT_MODEL):
+        return self._models.setdefault(name, FakeModel(self, name))
+
+    def upload_file(self, path):
+        return SimpleNamespace(name=os.path.basename(path), state=SimpleNamespace(name='ACTIVE'))
+
+    def get_file(self, name):
+        return SimpleNamespace(name=name, state=SimpleNamespace(name='ACTIVE'))
+
+    def delete_file(self, name):
+        return None
+
+
+def _create_provider():
+    if settings.AI_PROVIDER == 'fake':
+        return FakeProvider()
+    return GeminiProvider(settings.GEMINI_API_KEY)
+
+
+def get_provider():
+    global _provider
+
+    provider = _provider
+    if provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _create_provider()
+            provider = _provider
+    return provider
+
+
+def get_model(name=DEFAULT_MODEL):
+    """Handle do modelo `name`, criado uma vez por processo"""
+    return get_provider().model(name)
+
+
+def generate_text(contents, model=DEFAULT_MODEL, cache=True, cache_key=None):
+    """
+    Texto gerado pelo modelo para `contents` (prompt ou lista de partes). Com cache=True,
+    o mesmo (modelo, prompt normalizado) dentro do TTL é respondido sem chamar a API.
+    Use cache=False para respostas que devem variar (ex: chat).
+
+    `cache_key` substitui `contents` no cálculo da chave: ex. o prompt e os bytes do
+    arquivo enviado no lugar da imagem já decodificada.
+    """
+    key = prompt_key(model, contents if cache_key is None else cache_key) if cache else None
+    if key is not None:
+        text = response_cache.get(key, model)
+        if text is not None:
+            return text
+
+    text = get_model(model).generate_content(contents).text
+    if key is not None:
+        response_cache.set(key, model, text)
+    return text
+
+
+def stream_text(contents, model=DEFAULT_MODEL):
+    """Pedaços de texto à medida que o modelo gera (sem cache)"""
+    for chunk in get_model(model).generate_content(contents, stream=True):
+        yield chunk.text
+
+
+def set_provider(provider):
+    """
+    Troca o provedor do processo (None = recriar a partir das settings). Retorna o anterior.
+    As respostas em cache vieram do provedor antigo e são descartadas.
+    """
+    global _provider
+
+    with _provider_lock:
+        previous, _provider = _provider, provider
+    response_cache.clear()
+    return previous
+
+
+@contextmanager
+def use_provider(provider):
+    previous = set_provider(provider)
+    try:
+        yield provider
+    finally:
+        set_provider(previous)
+
+
+def _reset_after_fork():
+    global _provider, _provider_lock
+
+    _provider = None
+    _provider_lock = threading.Lock()
+    response_cache.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
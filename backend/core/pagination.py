@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class DateCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) na coluna de data natural de cada model.
+
+    A view define `cursor_ordering` (ex: ('-date', '-id')); o id desempata registros
+    com a mesma data. Como o cursor filtra por posição em vez de usar OFFSET, páginas
+    profundas custam o mesmo que a primeira. ?page_size= é opcional e limitado a max_page_size.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
@@ -0,0 +1,26 @@
+"""
+Trabalho depois da resposta.
+
+O servidor (WSGI ou ASGI) chama response.close() quando termina de enviar o corpo, inclusive
+o de um StreamingHttpResponse. call_after_response pendura uma função nesse ponto: o
+cliente já recebeu tudo e o custo dela (ex: uma chamada extra ao modelo) não entra na
+latência da requisição.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def call_after_response(response, callback):
+    """Roda callback() depois que `response` foi enviada; erros só vão para o log"""
+    close = response.close
+
+    def close_then_run():
+        close()
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Erro depois da resposta: {e}", exc_info=True)
+
+    response.close = close_then_run
+    return response
@@ -115,6 +115,38 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Padrão: cache em arquivos, compartilhado pelos workers do gunicorn da mesma máquina/container.
+# Para vários containers use django.core.cache.backends.redis.RedisCache com CACHE_LOCATION=redis://...
+# (LocMemCache deixa cada worker com o próprio cache)
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default='/var/tmp/senshi-cache'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=3600, cast=int),
+    }
+}
+
+# Os testes trocam o cache acima por LocMemCache (core/test_runner.py)
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# IA (Gemini): um provedor por processo, ver core/ai_provider.py. AI_PROVIDER=fake responde sem rede.
+AI_PROVIDER = config('AI_PROVIDER', default='gemini')
+GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+# Cache por conteúdo das respostas determinísticas (core/ai_cache.py), em memória do processo
+AI_RESPONSE_CACHE_TTL = config('AI_RESPONSE_CACHE_TTL', default=3600, cast=int)
+AI_RESPONSE_CACHE_SIZE = config('AI_RESPONSE_CACHE_SIZE', default=512, cast=int)
+
+# Memória das conversas (users/memory.py): turnos recentes até CHAT_MEMORY_TOKENS, o resto resumido
+CHAT_MEMORY_TOKENS = config('CHAT_MEMORY_TOKENS', default=2000, cast=int)
+CHAT_SUMMARY_TOKENS = config('CHAT_SUMMARY_TOKENS', default=400, cast=int)
+
+# Snapshot do usuário usado pela IA: curto, além de ser invalidado a cada escrita no tracker
+AI_CONTEXT_CACHE_TIMEOUT = config('AI_CONTEXT_CACHE_TIMEOUT', default=300, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -188,6 +220,8 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Listas paginadas por cursor na data de cada model (ver core/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.DateCursorPagination',
 }
 
 # JWT Configuration
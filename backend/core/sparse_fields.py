@@ -0,0 +1,51 @@
+"""
+Sparse fieldsets: ?fields=a,b devolve só esses campos e ?omit=c,d remove campos da resposta.
+
+O SparseFieldsetMixin recorta o serializer raiz nos GETs; as views usam
+requested_field_names() para levar a mesma seleção ao SELECT (.only()/.defer(), ver
+tracker/queryset_plan.py), então colunas grandes não pedidas nem são lidas do banco.
+"""
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+
+def _parse(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_field_names(request, available):
+    """
+    Campos pedidos via ?fields= / ?omit= dentre `available`, ou None quando a
+    requisição não recorta a resposta. Nomes desconhecidos são ignorados.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = request.query_params.get('fields', '')
+    omit = request.query_params.get('omit', '')
+    if not fields and not omit:
+        return None
+
+    names = set(available)
+    if fields:
+        names &= _parse(fields)
+    if omit:
+        names -= _parse(omit)
+    return names
+
+
+class SparseFieldsetMixin:
+    """Mixin de ModelSerializer: aplica ?fields= / ?omit= ao serializer raiz da resposta"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_response_root():
+            return fields
+        names = requested_field_names(self.context.get('request'), fields.keys())
+        if names is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in names}
+
+    def _is_response_root(self):
+        # Serializers aninhados (ex: messages dentro da conversa) não são recortados
+        parent = self.parent
+        return parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)
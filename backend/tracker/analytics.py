@@ -0,0 +1,252 @@
+"""
+Cálculos vetorizados (NumPy) sobre séries longas de dados de treino e corpo.
+As funções recebem arrays já carregados do banco e não fazem queries.
+"""
+import numpy as np
+
+UNKNOWN_MUSCLE_GROUP = 'Outros'
+
+
+def monday_of(days):
+    """Segunda-feira da semana de cada dia (array datetime64[D])"""
+    # 1970-01-01 (dia 0) foi uma quinta-feira: +3 alinha o resto da divisão na segunda
+    return days - ((days.astype('int64') + 3) % 7)
+
+
+def weekly_volume(days, muscle_groups, reps, weights):
+    """
+    Agrega séries por semana e grupo muscular.
+
+    days: datetime64[D] (dia local de cada série)
+    muscle_groups: strings (uma por série; vazio/None vira 'Outros')
+    reps, weights: floats (NaN = não informado)
+
+    Retorna (semanas, grupos, tonelagem, séries, reps), onde as três últimas são
+    matrizes [grupo, semana]. Tonelagem = soma de reps × carga.
+    """
+    if len(days) == 0:
+        return np.array([], dtype='datetime64[D]'), [], np.zeros((0, 0)), np.zeros((0, 0), dtype='int64'), np.zeros((0, 0))
+
+    weeks = monday_of(days)
+    first_week = weeks.min()
+    week_index = ((weeks - first_week).astype('int64') // 7)
+    week_count = int(week_index.max()) + 1
+
+    muscle_groups = np.asarray(muscle_groups, dtype=object)
+    muscle_groups[np.equal(muscle_groups, None) | np.equal(muscle_groups, '')] = UNKNOWN_MUSCLE_GROUP
+    group_names, group_index = np.unique(muscle_groups.astype(str), return_inverse=True)
+
+    reps = np.nan_to_num(reps, nan=0.0)
+    weights = np.nan_to_num(weights, nan=0.0)
+
+    # Uma célula por (grupo, semana): bincount soma tudo de uma vez
+    cell = group_index * week_count + week_index
+    size = len(group_names) * week_count
+    shape = (len(group_names), week_count)
+
+    tonnage = np.bincount(cell, weights=reps * weights, minlength=size).reshape(shape)
+    sets = np.bincount(cell, minlength=size).reshape(shape)
+    rep_totals = np.bincount(cell, weights=reps, minlength=size).reshape(shape)
+
+    week_starts = first_week + np.arange(week_count) * 7
+    return week_starts, list(group_names), tonnage, sets, rep_totals
+
+
+def _age_on(birth_date, today):
+    age = today.year - birth_date.year
+    if (today.month, today.day) < (birth_date.month, birth_date.day):
+        age -= 1
+    return age
+
+
+def _rounded(values, digits):
+    """Array float (NaN = sem valor) -> lista de floats arredondados / None"""
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+
+class BodyMetricsCalculator:
+    """
+    IMC, TMB (Harris-Benedict) e % de massa magra para uma série inteira de medições.
+
+    Recebe os dados do perfil uma única vez (altura, nascimento, sexo); os cálculos são
+    feitos sobre arrays, sem acessar o banco. Valores ausentes viram None.
+    """
+
+    def __init__(self, height_cm=None, birth_date=None, gender=None, today=None):
+        self.height_cm = height_cm if height_cm and height_cm > 0 else None
+        self.birth_date = birth_date
+        self.gender = gender
+        self.today = today
+
+    @classmethod
+    def from_profile(cls, profile, today=None):
+        if profile is None:
+            return cls(today=today)
+        return cls(profile.height_cm, profile.birth_date, profile.gender, today=today)
+
+    @property
+    def age(self):
+        if not self.birth_date:
+            return None
+        if self.today is None:
+            from datetime import date as date_cls
+            return _age_on(self.birth_date, date_cls.today())
+        return _age_on(self.birth_date, self.today)
+
+    def bmi_array(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        if self.height_cm is None:
+            return np.full(weights.shape, np.nan)
+        height_m = self.height_cm / 100
+        return weights / (height_m ** 2)
+
+    def bmr_array(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        age = self.age
+        if self.height_cm is None or age is None or not self.gender:
+            return np.full(weights.shape, np.nan)
+        if self.gender == 'M':
+            # Homens: TMB = 88.362 + (13.397 × peso) + (4.799 × altura) - (5.677 × idade)
+            return 88.362 + 13.397 * weights + 4.799 * self.height_cm - 5.677 * age
+        # Mulheres: TMB = 447.593 + (9.247 × peso) + (3.098 × altura) - (4.330 × idade)
+        return 447.593 + 9.247 * weights + 3.098 * self.height_cm - 4.330 * age
+
+    def series(self, weights, muscle_masses):
+        """
+        Métricas por medição (listas alinhadas com a entrada, em ordem cronológica):
+        bmi, bmr, muscle_mass_percentage.
+        """
+        weights = np.asarray(weights, dtype=float)
+        muscle_masses = np.asarray(muscle_masses, dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lean = np.where((muscle_masses > 0) & (weights > 0), muscle_masses / weights * 100, np.nan)
+
+        return {
+            'bmi': _rounded(self.bmi_array(weights), 1),
+            'bmr': _rounded(self.bmr_array(weights), 0),
+            'muscle_mass_percentage': _rounded(lean, 1),
+        }
+
+    def trends(self, days, weights, muscle_masses, fat_percentages):
+        """
+        Variação entre a primeira e a última medição e ritmo de peso (kg/semana,
+        regressão linear sobre as datas). Medições sem o valor são ignoradas.
+        """
+        weights = np.asarray(weights, dtype=float)
+        result = {
+            'weight_change_kg': 0,
+            'fat_change_percent': None,
+            'muscle_mass_change_kg': None,
+            'weight_rate_kg_per_week': None,
+        }
+        if len(weights) < 2:
+            return result
+
+        def change(values):
+            values = np.asarray(values, dtype=float)
+            present = values[~np.isnan(values) & (values != 0)]
+            if len(present) < 2:
+                return None
+            return round(float(present[-1] - present[0]), 1)
+
+        result['weight_change_kg'] = round(float(weights[-1] - weights[0]), 1)
+        result['fat_change_percent'] = change(fat_percentages)
+        result['muscle_mass_change_kg'] = change(muscle_masses)
+
+        day_numbers = np.asarray(days, dtype='datetime64[D]').astype('int64')
+        if day_numbers[-1] > day_numbers[0]:
+            slope = np.polyfit(day_numbers - day_numbers[0], weights, 1)[0]
+            result['weight_rate_kg_per_week'] = round(float(slope * 7), 2)
+        return result
+
+
+# --- Bitsets de dias (heatmap, streaks) ---
+# Um bitset é um int Python: o bit i representa o i-ésimo dia de uma janela (ou do ano,
+# com i = dia do ano - 1). Contagens usam int.bit_count() (popcount) e combinações entre
+# hábitos usam | e &.
+
+def year_bitmap(day_indexes):
+    """Bitset com os bits `day_indexes` (array de inteiros >= 0) ligados"""
+    day_indexes = np.asarray(day_indexes, dtype='int64')
+    if len(day_indexes) == 0:
+        return 0
+    bits = np.zeros(int(day_indexes.max()) + 1, dtype=bool)
+    bits[day_indexes] = True
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+
+def group_year_bitmaps(habit_ids, dates):
+    """
+    {habit_id: {ano: bitmap}} a partir de pares (habit_id, data) de dias completados.
+    Agrupa por (hábito, ano) ordenando uma vez e cortando nos limites de cada grupo.
+    """
+    if len(habit_ids) == 0:
+        return {}
+    habit_ids = np.asarray(habit_ids, dtype='int64')
+    days = np.asarray(dates, dtype='datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    day_of_year = (days - years).astype('int64')
+    years = years.astype('int64') + 1970
+
+    keys = habit_ids * 10000 + years
+    order = np.argsort(keys, kind='stable')
+    keys, day_of_year = keys[order], day_of_year[order]
+    group_keys, group_starts = np.unique(keys, return_index=True)
+
+    bitmaps = {}
+    for key, group in zip(group_keys, np.split(day_of_year, group_starts[1:])):
+        habit_id, year = divmod(int(key), 10000)
+        bitmaps.setdefault(habit_id, {})[year] = year_bitmap(group)
+    return bitmaps
+
+
+# 366 bits cabem em 46 bytes: tamanho fixo do bitmap de um ano no banco (HabitYearBitmap.bits)
+YEAR_BITMAP_BYTES = 46
+
+
+def bitmap_to_bytes(bitset):
+    return bitset.to_bytes(YEAR_BITMAP_BYTES, 'little')
+
+
+def bitmap_from_bytes(data):
+    # Postgres devolve memoryview, SQLite devolve bytes
+    return int.from_bytes(bytes(data), 'little')
+
+
+def window_bitset(year_bitmaps, start, end):
+    """
+    Bitset da janela [start, end] (datas inclusivas) a partir de {ano: bitmap do ano}:
+    o bit 0 é `start`. Cada ano é deslocado para a sua posição e recortado.
+    """
+    from datetime import date as date_cls
+
+    length = (end - start).days + 1
+    result = 0
+    for year, bitmap in year_bitmaps.items():
+        if not bitmap or year < start.year or year > end.year:
+            continue
+        offset = (date_cls(year, 1, 1) - start).days
+        result |= bitmap << offset if offset >= 0 else bitmap >> -offset
+    return result & ((1 << length) - 1)
+
+
+def bitset_to_array(bitset, length):
+    """Bitset -> array uint8 de 0/1 com `length` posições"""
+    raw = bitset.to_bytes((length + 7) // 8, 'little')
+    return np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder='little')[:length]
+
+
+def trailing_run(bitset, last_index):
+    """Quantos bits ligados seguidos terminam em `last_index` (ex: streak atual até hoje)"""
+    zeros = ~bitset & ((1 << (last_index + 1)) - 1)
+    return last_index + 1 - zeros.bit_length()
+
+
+def longest_run(bitset):
+    """Maior sequência de bits ligados: cada x & (x >> 1) encurta todas as sequências em 1"""
+    length = 0
+    while bitset:
+        bitset &= bitset >> 1
+        length += 1
+    return length
@@ -0,0 +1,81 @@
+"""
+GET condicional (ETag / Last-Modified) a partir das versões por usuário e recurso (DataVersion).
+"""
+import hashlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from rest_framework.response import Response
+
+from .services import bump_data_versions, data_versions, get_user_timezone, user_today
+
+
+class NotModified(Exception):
+    pass
+
+
+class ConditionalGetMixin:
+    """
+    Mixin para APIView/ViewSet.
+
+    version_resources: recursos que o GET lê; o ETag é derivado das suas versões.
+    version_writes: recursos incrementados por bump_versions() (padrão: o primeiro lido).
+    etag_includes_today: o resultado depende do dia atual no fuso do usuário (streaks, semana).
+    get_etag_extra(): outras versões que não são por usuário (ex: biblioteca global de exercícios).
+
+    Com If-None-Match igual ao ETag atual, a resposta é 304 logo após autenticação e
+    permissões, sem avaliar nenhum queryset.
+    """
+    version_resources = ()
+    version_writes = None
+    etag_includes_today = False
+
+    def get_etag(self, request):
+        versions = data_versions(request.user.id, self.version_resources)
+        parts = [str(request.user.id), request.get_full_path()]
+        parts += [f'{resource}:{version}' for resource, (version, _) in sorted(versions.items())]
+        if self.etag_includes_today:
+            parts.append(self.request_today(request).isoformat())
+        parts += [str(part) for part in self.get_etag_extra(request)]
+
+        self._last_modified = max((updated for _, updated in versions.values() if updated), default=None)
+        return '"%s"' % hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def get_etag_extra(self, request):
+        return ()
+
+    def request_today(self, request):
+        """Dia de hoje no fuso do usuário, consultado uma vez por requisição"""
+        if getattr(self, '_request_today', None) is None:
+            self._request_today = user_today(get_user_timezone(request.user.id))
+        return self._request_today
+
+    def bump_versions(self):
+        writes = self.version_writes if self.version_writes is not None else self.version_resources[:1]
+        bump_data_versions(self.request.user.id, writes)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._etag = None
+        if request.method in ('GET', 'HEAD') and self.version_resources:
+            self._etag = self.get_etag(request)
+            # Comparação fraca: ignora o prefixo W/ (ex: ETag alterado por GZipMiddleware)
+            candidates = {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}
+            if self._etag in candidates or '*' in candidates:
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=304)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, '_etag', None) and response.status_code in (200, 304):
+            response['ETag'] = self._etag
+            if self._last_modified:
+                response['Last-Modified'] = http_date(self._last_modified.timestamp())
+            # O navegador guarda a resposta mas sempre revalida com If-None-Match
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Authorization'])
+        return response
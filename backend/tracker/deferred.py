@@ -0,0 +1,64 @@
+"""
+Recálculos derivados (DailySummary, bitmaps dos hábitos, geração do cache das estatísticas)
+agendados para depois do commit e deduplicados por transação.
+
+Apagar um hábito dispara um post_delete por check-in em cascata; se cada um agendasse o
+próprio on_commit, 300 check-ins virariam 300 recálculos do mesmo (hábito, ano). Aqui as
+chaves se acumulam num lote da transação atual, aplicado uma única vez depois do
+commit: cada fase roda uma vez, com todas as chaves dela, sempre na ordem de PHASES:
+resumos, total de hábitos dos resumos, bitmaps e, por último, a invalidação das
+estatísticas (que precisa ver as anteriores já gravadas).
+
+Fora de um bloco atomic o on_commit roda na hora, então cada chave é aplicada
+imediatamente, como antes. Os recálculos são idempotentes: uma chave adicionada num
+savepoint que depois é desfeito só gera um recálculo a mais.
+"""
+from django.db import transaction
+
+PHASES = ('summary', 'habit_totals', 'bitmap', 'stats')
+
+
+class _Batch:
+    def __init__(self):
+        self.keys = {phase: {} for phase in PHASES}
+        self.handlers = {}
+        self.flushed = False
+
+    def run(self):
+        if self.flushed:
+            return
+        self.flushed = True
+        for phase in PHASES:
+            if self.keys[phase]:
+                self.handlers[phase](list(self.keys[phase]))
+
+
+def _current_batch(connection):
+    """Lote ainda pendente na transação atual, ou None"""
+    batch = getattr(connection, 'tracker_deferred_batch', None)
+    if batch is None or batch.flushed:
+        return None
+    # Commit, rollback ou rollback dos savepoints em que o lote foi registrado descartam os callbacks
+    for callback in reversed(connection.run_on_commit):
+        if callback[1] == batch.run:
+            return batch
+    return None
+
+
+def defer(phase, key, handler):
+    """
+    Agenda `handler(keys)` para depois do commit, com `key` entre as chaves da fase.
+    A mesma chave agendada várias vezes na transação roda uma vez só.
+
+    Cada chamada registra batch.run de novo (só o primeiro a rodar faz o trabalho): o lote
+    sobrevive ao rollback de um savepoint interno e captureOnCommitCallbacks o enxerga.
+    """
+    connection = transaction.get_connection()
+    batch = _current_batch(connection)
+    if batch is None:
+        batch = connection.tracker_deferred_batch = _Batch()
+
+    batch.keys[phase][key] = None
+    batch.handlers[phase] = handler
+    # Registrado depois das chaves: fora de um atomic o on_commit roda na hora
+    transaction.on_commit(batch.run)
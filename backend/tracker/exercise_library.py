@@ -0,0 +1,142 @@
+"""
+Biblioteca de exercícios em memória do processo, com busca por prefixo sem acento.
+
+Os exercícios globais (user=None, criados pelas migrations 0005/0008/0009) quase nunca
+mudam: ficam em um índice por processo, reconstruído só quando a versão muda. A versão
+vem do banco (quantidade, maior id e maior updated_at dos globais, em uma query
+agregada), então criações, edições e remoções, inclusive pelo admin, são vistas por
+todos os workers sem depender do cache.
+
+A query agregada roda no máximo a cada VERSION_CHECK_SECONDS por processo, não a cada
+requisição. Escritas em exercícios globais feitas por este processo descartam a versão
+lida (signal exercise_changed, depois do commit); os outros workers veem a mudança no
+próximo check.
+
+Os exercícios do próprio usuário continuam vindo do banco a cada requisição e são
+mesclados com os globais.
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.db.models import Count, Max
+
+from .models import Exercise
+from .serializers import ExerciseSerializer
+
+VERSION_CHECK_SECONDS = 5
+
+_index = None
+_index_lock = threading.Lock()
+_version = None  # (time.monotonic() da leitura, versão)
+
+
+def normalize(text):
+    """'Supino Máquina' -> 'supino maquina': sem acentos, minúsculo e espaços únicos"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+class ExerciseIndex:
+    """
+    Índice de busca por prefixo sobre exercícios já serializados (dicts com 'name').
+
+    Cada palavra do nome gera uma chave com o restante do nome a partir dela, então
+    'rosca' encontra 'Rosca Direta' e 'direta' também. As chaves ficam em uma lista
+    ordenada: a busca é um bisect até o primeiro prefixo e uma varredura enquanto casar.
+    """
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.entries = sorted(entries, key=lambda entry: (normalize(entry['name']), entry['id']))
+        keys = []
+        for position, entry in enumerate(self.entries):
+            words = normalize(entry['name']).split(' ')
+            for start in range(len(words)):
+                # rank 0: casou com o começo do nome; 1: com uma palavra do meio
+                keys.append((' '.join(words[start:]), min(start, 1), position))
+        keys.sort()
+        self._keys = keys
+
+    def __len__(self):
+        return len(self.entries)
+
+    def matches(self, query):
+        """[(rank, posição)] dos exercícios cujo nome (ou uma palavra dele) começa com `query`"""
+        query = normalize(query)
+        if not query:
+            return []
+        best = {}
+        for key, rank, position in self._keys[bisect_left(self._keys, (query,)):]:
+            if not key.startswith(query):
+                break
+            best[position] = min(rank, best.get(position, rank))
+        return sorted((rank, position) for position, rank in best.items())
+
+    def search(self, query, limit=None):
+        return [self.entries[position] for _, position in self.matches(query)[:limit]]
+
+
+def search(indexes, query, limit):
+    """Busca em vários índices (ex: globais + do usuário), começo do nome antes, depois alfabética"""
+    found = [
+        (rank, position, order, index.entries[position])
+        for order, index in enumerate(indexes)
+        for rank, position in index.matches(query)
+    ]
+    found.sort(key=lambda item: (item[0], normalize(item[3]['name']), item[2], item[1]))
+    return [entry for *_, entry in found[:limit]]
+
+
+def merged(indexes):
+    """Todas as entradas dos índices, em ordem alfabética (sem acento)"""
+    entries = [entry for index in indexes for entry in index.entries]
+    return sorted(entries, key=lambda entry: (normalize(entry['name']), entry['id']))
+
+
+def library_version():
+    """
+    Versão dos exercícios globais: muda a cada criação, edição ou remoção.
+    Relida do banco no máximo a cada VERSION_CHECK_SECONDS (ver forget_version).
+    """
+    global _version
+
+    checked = _version
+    if checked is not None and time.monotonic() - checked[0] < VERSION_CHECK_SECONDS:
+        return checked[1]
+
+    state = Exercise.objects.filter(user__isnull=True).aggregate(
+        count=Count('id'), last_id=Max('id'), updated_at=Max('updated_at')
+    )
+    updated_at = state['updated_at'].isoformat() if state['updated_at'] else ''
+    version = f"{state['count']}:{state['last_id']}:{updated_at}"
+    _version = (time.monotonic(), version)
+    return version
+
+
+def forget_version():
+    """Faz a próxima library_version() ler o banco (após escritas em exercícios globais)"""
+    global _version
+    _version = None
+
+
+def global_index(version=None):
+    """
+    Índice dos exercícios globais deste processo, reconstruído quando a versão muda.
+    Passe `version` se já a tiver lido nesta requisição (ex: para o ETag).
+    """
+    global _index
+
+    if version is None:
+        version = library_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != version:
+            exercises = Exercise.objects.filter(user__isnull=True)
+            _index = ExerciseIndex([dict(row) for row in ExerciseSerializer(exercises, many=True).data], version)
+        return _index
@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from tracker.services import backfill_personal_records
+
+
+class Command(BaseCommand):
+    help = "Refaz os PRs automáticos a partir do histórico de treinos (em lotes, ordem cronológica)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="ID de um usuário específico (padrão: todos)")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Usuários processados por lote")
+        parser.add_argument('--batch-size', type=int, default=500, help="Treinos lidos por vez do banco")
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        if options['user']:
+            user_ids = user_ids.filter(id=options['user'])
+        user_ids = list(user_ids)
+
+        chunk_size = options['chunk_size']
+        total = 0
+        for i in range(0, len(user_ids), chunk_size):
+            total += backfill_personal_records(user_ids[i:i + chunk_size], batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} PRs detectados para {len(user_ids)} usuário(s)"
+        ))
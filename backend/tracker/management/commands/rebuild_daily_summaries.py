@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from tracker.services import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    help = "Reconstrói a tabela DailySummary a partir de HabitLog, Workout e JournalEntry"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="ID de um usuário específico (padrão: todos)")
+        parser.add_argument('--chunk-size', type=int, default=200, help="Usuários processados por lote")
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+        if options['user']:
+            user_ids = user_ids.filter(id=options['user'])
+        user_ids = list(user_ids)
+
+        chunk_size = options['chunk_size']
+        total = 0
+        for i in range(0, len(user_ids), chunk_size):
+            total += rebuild_daily_summaries(user_ids[i:i + chunk_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} resumos diários reconstruídos para {len(user_ids)} usuário(s)"
+        ))
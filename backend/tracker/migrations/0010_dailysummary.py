@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_fix_squat_names'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('habits_completed', models.PositiveIntegerField(default=0)),
+                ('habits_total', models.PositiveIntegerField(default=0)),
+                ('workouts', models.PositiveIntegerField(default=0)),
+                ('journal_entries', models.PositiveIntegerField(default=0)),
+                ('journal_mood', models.FloatField(blank=True, help_text='Média do humor no dia (1-5)', null=True)),
+                ('score', models.PositiveIntegerField(default=0, help_text='% de hábitos completados no dia (0-100)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
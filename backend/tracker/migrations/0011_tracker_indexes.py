@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_dailysummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bodymeasurement',
+            index=models.Index(fields=['user', '-date'], name='measurement_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habitlog',
+            index=models.Index(fields=['user', 'date', 'completed'], name='habitlog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['user', 'date'], name='journal_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personalrecord',
+            index=models.Index(fields=['user', 'exercise_name', 'weight_kg'], name='pr_user_exercise_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personalrecord',
+            index=models.Index(fields=['user', 'date'], name='pr_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workout',
+            index=models.Index(fields=['user', 'date_time'], name='workout_user_date_time_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_tracker_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exercise_name', models.CharField(max_length=200)),
+                ('position', models.PositiveSmallIntegerField(default=0, help_text='Ordem do exercício no treino')),
+                ('set_index', models.PositiveSmallIntegerField(help_text='Número da série (1, 2, 3...)')),
+                ('reps', models.IntegerField(blank=True, null=True)),
+                ('weight_kg', models.FloatField(blank=True, null=True)),
+                ('duration_seconds', models.IntegerField(blank=True, null=True)),
+                ('distance_km', models.FloatField(blank=True, null=True)),
+                ('exercise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='workout_sets', to='tracker.exercise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workout_sets', to=settings.AUTH_USER_MODEL)),
+                ('workout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sets', to='tracker.workout')),
+            ],
+            options={
+                'ordering': ['workout', 'position', 'set_index'],
+                'indexes': [models.Index(fields=['user', 'exercise'], name='workoutset_user_exercise_idx'), models.Index(fields=['user', 'exercise_name'], name='workoutset_user_name_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,200 @@
+import json
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+# --- Cópia congelada de tracker/parsing.py ---
+# Migrations não importam código do app: mudanças futuras no parser não podem alterar o
+# que esta migration grava. Para reprocessar treinos antigos com um parser novo, crie uma
+# migration nova.
+
+NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+# Listas por série usam "/" ou ";" (ex: reps "10/8/6"). A vírgula é separador decimal ("82,5").
+LIST_SEPARATORS_RE = re.compile(r'[/;]')
+MAX_SETS = 50
+# Partes de uma duração: número + unidade opcional (h/hora, min/minuto, s/seg/sec)
+DURATION_PART_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(h(?:oras?|rs?)?|m(?:in(?:utos?)?)?|s(?:eg(?:undos?)?|ec)?)?')
+DURATION_UNITS = {'h': 3600, 'm': 60, 's': 1}
+
+
+def parse_number(value):
+    """Primeiro número de um valor livre ("80kg", "82,5", 10) ou None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    return float(match.group().replace(',', '.'))
+
+
+def parse_list(value):
+    """Valores por série: "10/8/6" -> [10.0, 8.0, 6.0]; "10" -> [10.0]; "" -> []"""
+    if isinstance(value, (list, tuple)):
+        items = value
+    elif value is None or value == '':
+        return []
+    else:
+        items = LIST_SEPARATORS_RE.split(str(value))
+    return [number for number in (parse_number(item) for item in items) if number is not None]
+
+
+def parse_duration_seconds(value):
+    """
+    Duração em segundos: "1:30" (mm:ss), "1:02:00" (hh:mm:ss), "45s", "1h", "30min", "30",
+    e compostas como "1h30", "1h30min" ou "2min 15s".
+    Sem unidade, o número é interpretado como minutos; depois de uma unidade, como a
+    unidade seguinte ("1h30" = 1h e 30min, "2min15" = 2min e 15s).
+    """
+    if value is None or value == '':
+        return None
+    text = str(value).strip().lower()
+
+    if ':' in text:
+        parts = [parse_number(part) or 0 for part in text.split(':')]
+        seconds = 0
+        for part in parts:
+            seconds = seconds * 60 + part
+        return int(seconds)
+
+    parts = DURATION_PART_RE.findall(text)
+    if not parts:
+        return None
+
+    seconds = 0
+    previous = None
+    for number, unit in parts:
+        if unit:
+            scale = DURATION_UNITS[unit[0]]
+        elif previous is None:
+            scale = 60
+        elif previous > 1:
+            scale = previous // 60
+        else:
+            return None  # número solto depois dos segundos: ambíguo
+        if previous is not None and scale >= previous:
+            return None  # unidades fora de ordem ou repetidas ("30min 1h")
+        seconds += float(number.replace(',', '.')) * scale
+        previous = scale
+    return int(seconds)
+
+
+def parse_distance_km(value):
+    """Distância em km: "5km", "400m" (metros) ou "5" (km)"""
+    number = parse_number(value)
+    if number is None:
+        return None
+    text = str(value).strip().lower()
+    if re.search(r'\d\s*m\b', text) or text.endswith('metros'):
+        return number / 1000
+    return number
+
+
+def load_exercises(exercises_data):
+    """Lista de exercícios do JSON; retorna [] para JSON inválido ou vazio"""
+    if isinstance(exercises_data, list):
+        return exercises_data
+    try:
+        data = json.loads(exercises_data or '[]')
+    except (TypeError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
+
+
+def expand_sets(exercise):
+    """
+    Expande um item do JSON em uma lista de séries:
+        [{'set_index': 1, 'reps': 10, 'weight_kg': 80.0, 'duration_seconds': None, 'distance_km': None}, ...]
+
+    "sets" define quantas séries existem; reps/weight podem trazer um valor por série
+    ("10/8/6"). Sem "sets", o número de séries é o maior tamanho entre as listas (mínimo 1).
+    """
+    reps = parse_list(exercise.get('reps'))
+    weights = parse_list(exercise.get('weight'))
+    duration = parse_duration_seconds(exercise.get('time'))
+    distance = parse_distance_km(exercise.get('distance'))
+
+    set_count = parse_number(exercise.get('sets'))
+    set_count = int(set_count) if set_count else max(len(reps), len(weights), 1)
+    set_count = min(max(set_count, 1), MAX_SETS)
+
+    def value_for(values, index):
+        if not values:
+            return None
+        return values[index] if index < len(values) else values[-1]
+
+    sets = []
+    for index in range(set_count):
+        rep_value = value_for(reps, index)
+        sets.append({
+            'set_index': index + 1,
+            'reps': int(rep_value) if rep_value is not None else None,
+            'weight_kg': value_for(weights, index),
+            'duration_seconds': duration,
+            'distance_km': distance,
+        })
+    return sets
+
+
+def iter_workout_sets(exercises_data):
+    """Gera (posição do exercício, nome, série) para todas as séries de um exercises_data"""
+    for position, exercise in enumerate(load_exercises(exercises_data)):
+        if not isinstance(exercise, dict):
+            continue
+        name = str(exercise.get('exercise_name') or '').strip()
+        if not name:
+            continue
+        for workout_set in expand_sets(exercise):
+            yield position, name[:200], workout_set
+
+
+def backfill_workout_sets(apps, schema_editor):
+    """Cria as linhas de WorkoutSet a partir do exercises_data de todos os treinos existentes"""
+    Workout = apps.get_model('tracker', 'Workout')
+    WorkoutSet = apps.get_model('tracker', 'WorkoutSet')
+    Exercise = apps.get_model('tracker', 'Exercise')
+
+    # Nome -> id: exercícios do próprio usuário têm prioridade sobre os globais
+    exercise_ids = {}
+    for exercise in Exercise.objects.order_by('user_id').values('id', 'user_id', 'name'):
+        exercise_ids[(exercise['user_id'], exercise['name'])] = exercise['id']
+
+    pending = []
+    workouts = Workout.objects.values('id', 'user_id', 'exercises_data').iterator(chunk_size=BATCH_SIZE)
+    for workout in workouts:
+        for position, name, workout_set in iter_workout_sets(workout['exercises_data']):
+            pending.append(WorkoutSet(
+                workout_id=workout['id'],
+                user_id=workout['user_id'],
+                exercise_id=exercise_ids.get((workout['user_id'], name), exercise_ids.get((None, name))),
+                exercise_name=name,
+                position=position,
+                **workout_set,
+            ))
+        if len(pending) >= BATCH_SIZE:
+            WorkoutSet.objects.bulk_create(pending)
+            pending = []
+
+    if pending:
+        WorkoutSet.objects.bulk_create(pending)
+
+
+def remove_workout_sets(apps, schema_editor):
+    apps.get_model('tracker', 'WorkoutSet').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_workoutset'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_workout_sets, remove_workout_sets),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0013_backfill_workout_sets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='personalrecord',
+            name='estimated_1rm',
+            field=models.FloatField(blank=True, help_text='1RM estimado (Epley)', null=True),
+        ),
+        migrations.AddField(
+            model_name='personalrecord',
+            name='workout',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to='tracker.workout'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Cópia congelada do formato de tracker/analytics.py na época desta migration:
+# bit i = dia do ano i (0 = 1º de janeiro), 46 bytes little-endian por (hábito, ano).
+YEAR_BITMAP_BYTES = 46
+
+
+def bitmap_to_bytes(bitset):
+    return bitset.to_bytes(YEAR_BITMAP_BYTES, 'little')
+
+
+def set_completed_day(bitmaps, habit_id, day):
+    """Liga o bit do dia no bitmap (habit_id, ano) do dict `bitmaps`"""
+    key = (habit_id, day.year)
+    bitmaps[key] = bitmaps.get(key, 0) | (1 << (day.timetuple().tm_yday - 1))
+
+
+def backfill_habit_bitmaps(apps, schema_editor):
+    """Gera os bitmaps anuais e a tabela de valores a partir dos HabitLogs existentes"""
+    HabitLog = apps.get_model('tracker', 'HabitLog')
+    HabitYearBitmap = apps.get_model('tracker', 'HabitYearBitmap')
+    HabitDayValue = apps.get_model('tracker', 'HabitDayValue')
+
+    # Cada linha é dobrada no bitmap do (hábito, ano) enquanto os chunks chegam: a memória
+    # cresce com o número de bitmaps (46 bytes cada), não com o número de check-ins
+    owners, year_bitmaps = {}, {}
+    logs = HabitLog.objects.filter(completed=True).values_list('habit_id', 'user_id', 'date')
+    for habit_id, user_id, day in logs.iterator(chunk_size=BATCH_SIZE):
+        owners[habit_id] = user_id
+        set_completed_day(year_bitmaps, habit_id, day)
+
+    bitmaps = [
+        HabitYearBitmap(
+            habit_id=habit_id,
+            user_id=owners[habit_id],
+            year=year,
+            bits=bitmap_to_bytes(bitmap),
+            completed_count=bitmap.bit_count(),
+        )
+        for (habit_id, year), bitmap in year_bitmaps.items()
+    ]
+    HabitYearBitmap.objects.bulk_create(bitmaps, batch_size=BATCH_SIZE)
+
+    values = []
+    logs = HabitLog.objects.filter(value__isnull=False).values_list('habit_id', 'user_id', 'date', 'value')
+    for habit_id, user_id, day, value in logs.iterator(chunk_size=BATCH_SIZE):
+        values.append(HabitDayValue(habit_id=habit_id, user_id=user_id, date=day, value=value))
+        if len(values) >= BATCH_SIZE:
+            HabitDayValue.objects.bulk_create(values)
+            values = []
+    if values:
+        HabitDayValue.objects.bulk_create(values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_dataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitDayValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('value', models.FloatField()),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_values', to='tracker.habit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='habitvalue_user_date_idx')],
+                'unique_together': {('habit', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HabitYearBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('bits', models.BinaryField(max_length=46)),
+                ('completed_count', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='year_bitmaps', to='tracker.habit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'year'], name='habitbitmap_user_year_idx')],
+                'unique_together': {('habit', 'year')},
+            },
+        ),
+        migrations.RunPython(backfill_habit_bitmaps, migrations.RunPython.noop),
+    ]
@@ -24,6 +24,47 @@ class HabitLog(models.Model):
     
     class Meta:
         unique_together = ('habit', 'date', 'user')
+        indexes = [
+            # Check-ins do usuário em um intervalo de datas (estatísticas, timeline)
+            models.Index(fields=['user', 'date', 'completed'], name='habitlog_user_date_idx'),
+        ]
+
+class HabitYearBitmap(models.Model):
+    """
+    Histórico compacto de um hábito: uma linha por (hábito, ano) com um bitmap de 366 bits
+    (bit i = dia do ano i + 1 completado, little-endian). Derivado de HabitLog e mantido
+    pelos signals e pelo upsert em lote (ver services.refresh_habit_bitmap).
+    """
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='year_bitmaps')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    year = models.PositiveSmallIntegerField()
+    bits = models.BinaryField(max_length=46)
+    completed_count = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('habit', 'year')
+        indexes = [
+            # Streaks e heatmap leem todos os anos do usuário em uma query
+            models.Index(fields=['user', 'year'], name='habitbitmap_user_year_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.habit_id} - {self.year} ({self.completed_count})"
+
+
+class HabitDayValue(models.Model):
+    """Tabela esparsa com os valores (HabitLog.value) dos dias que têm valor, ao lado do bitmap"""
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='day_values')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    date = models.DateField()
+    value = models.FloatField()
+
+    class Meta:
+        unique_together = ('habit', 'date')
+        indexes = [
+            models.Index(fields=['user', 'date'], name='habitvalue_user_date_idx'),
+        ]
 
 # --- 2. FÍSICO (Medidas e Fotos) ---
 class BodyMeasurement(models.Model):
@@ -41,45 +82,23 @@ class BodyMeasurement(models.Model):
 
     class Meta:
         ordering = ['-date'] # Mostra sempre o mais recente primeiro
+        indexes = [
+            models.Index(fields=['user', '-date'], name='measurement_user_date_idx'),
+        ]
+
+    def _metrics_calculator(self):
+        from users.models import UserProfile
+        from .analytics import BodyMetricsCalculator
+        profile = UserProfile.objects.filter(user_id=self.user_id).first()
+        return BodyMetricsCalculator.from_profile(profile)
 
     def calculate_bmi(self):
         """Calcula IMC (Índice de Massa Corporal) usando altura do perfil"""
-        try:
-            profile = self.user.profile
-            if profile.height_cm and profile.height_cm > 0:
-                height_m = profile.height_cm / 100
-                return round(self.weight_kg / (height_m ** 2), 1)
-        except:
-            pass
-        return None
+        return self._metrics_calculator().series([self.weight_kg], [None])['bmi'][0]
 
     def calculate_bmr(self):
         """Calcula TMB (Taxa Metabólica Basal) usando fórmula de Harris-Benedict"""
-        try:
-            from datetime import date as date_cls
-            profile = self.user.profile
-
-            if not profile.height_cm or not profile.birth_date or not profile.gender:
-                return None
-
-            # Calcular idade
-            today = date_cls.today()
-            age = today.year - profile.birth_date.year
-            if (today.month, today.day) < (profile.birth_date.month, profile.birth_date.day):
-                age -= 1
-
-            # Fórmula de Harris-Benedict
-            if profile.gender == 'M':
-                # Homens: TMB = 88.362 + (13.397 × peso) + (4.799 × altura) - (5.677 × idade)
-                bmr = 88.362 + (13.397 * self.weight_kg) + (4.799 * profile.height_cm) - (5.677 * age)
-            else:  # Feminino
-                # Mulheres: TMB = 447.593 + (9.247 × peso) + (3.098 × altura) - (4.330 × idade)
-                bmr = 447.593 + (9.247 * self.weight_kg) + (3.098 * profile.height_cm) - (4.330 * age)
-
-            return round(bmr, 0)
-        except:
-            pass
-        return None
+        return self._metrics_calculator().series([self.weight_kg], [None])['bmr'][0]
 
 # --- 3. PERFORMANCE (Treinos e PRs) ---
 class Exercise(models.Model):
@@ -95,6 +114,8 @@ class Exercise(models.Model):
     name = models.CharField(max_length=200)
     exercise_type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='strength')
     muscle_group = models.CharField(max_length=50, blank=True, help_text="Ex: Peito, Costas, Pernas")
+    # Entra na versão da biblioteca global (tracker/exercise_library.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -114,12 +135,44 @@ class Workout(models.Model):
     feeling = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)], default=3)
     comments = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date_time'], name='workout_user_date_time_idx'),
+        ]
+
     def set_exercises(self, data):
         self.exercises_data = json.dumps(data)
 
     def get_exercises(self):
         return json.loads(self.exercises_data)
 
+class WorkoutSet(models.Model):
+    """
+    Uma série de um treino, normalizada a partir de Workout.exercises_data.
+    Mantida pelo WorkoutSerializer (dual-write) para consultas por exercício em SQL.
+    """
+    workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name='sets')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workout_sets')
+    # Nulo quando o nome digitado não existe na biblioteca de exercícios
+    exercise = models.ForeignKey(Exercise, on_delete=models.SET_NULL, null=True, blank=True, related_name='workout_sets')
+    exercise_name = models.CharField(max_length=200)
+    position = models.PositiveSmallIntegerField(default=0, help_text="Ordem do exercício no treino")
+    set_index = models.PositiveSmallIntegerField(help_text="Número da série (1, 2, 3...)")
+    reps = models.IntegerField(null=True, blank=True)
+    weight_kg = models.FloatField(null=True, blank=True)
+    duration_seconds = models.IntegerField(null=True, blank=True)
+    distance_km = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['workout', 'position', 'set_index']
+        indexes = [
+            models.Index(fields=['user', 'exercise'], name='workoutset_user_exercise_idx'),
+            models.Index(fields=['user', 'exercise_name'], name='workoutset_user_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.exercise_name} - série {self.set_index}"
+
 class PersonalRecord(models.Model):
     """
     A tabela de troféus. Registra os recordes pessoais.
@@ -131,6 +184,17 @@ class PersonalRecord(models.Model):
     date = models.DateField()
     video = models.FileField(upload_to='pr_videos/', null=True, blank=True) # Opcional: vídeo do feito
 
+    # Preenchidos pela detecção automática de PRs (nulo para recordes cadastrados à mão)
+    workout = models.ForeignKey(Workout, on_delete=models.CASCADE, null=True, blank=True, related_name='personal_records')
+    estimated_1rm = models.FloatField(null=True, blank=True, help_text="1RM estimado (Epley)")
+
+    class Meta:
+        indexes = [
+            # Histórico por exercício (PRHistoryView) e linha do tempo de recordes
+            models.Index(fields=['user', 'exercise_name', 'weight_kg'], name='pr_user_exercise_idx'),
+            models.Index(fields=['user', 'date'], name='pr_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"PR: {self.exercise_name} - {self.weight_kg}kg"
 
@@ -163,6 +227,11 @@ class JournalEntry(models.Model):
         (1, '😭'), (2, '😕'), (3, '😐'), (4, '🙂'), (5, '🤩')
     ])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'date'], name='journal_user_date_idx'),
+        ]
+
 class WorkoutTemplate(models.Model):
     WORKOUT_TYPE_CHOICES = [
         ('warmup', 'Aquecimento'),
@@ -183,4 +252,52 @@ class WorkoutTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.name} ({self.user.username})"
\ No newline at end of file
+        return f"{self.name} ({self.user.username})"
+
+
+# --- 5. ROLLUP (Resumo diário para estatísticas) ---
+class DailySummary(models.Model):
+    """
+    Resumo por usuário e dia, mantido pelos signals de HabitLog, Workout e JournalEntry.
+    As views de estatísticas leem esta tabela em vez de contar os registros brutos.
+    Dias sem nenhuma atividade não têm linha.
+
+    habits_total (e o score) usa o número atual de hábitos do usuário em todas as linhas,
+    inclusive dias passados: criar ou apagar um hábito regrava todas, e o rebuild produz o
+    mesmo resultado que os recálculos incrementais.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+    habits_completed = models.PositiveIntegerField(default=0)
+    habits_total = models.PositiveIntegerField(default=0)
+    workouts = models.PositiveIntegerField(default=0)
+    journal_entries = models.PositiveIntegerField(default=0)
+    journal_mood = models.FloatField(null=True, blank=True, help_text="Média do humor no dia (1-5)")
+    score = models.PositiveIntegerField(default=0, help_text="% de hábitos completados no dia (0-100)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'date')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date}"
+
+
+# --- 6. VERSÕES (ETag dos GETs) ---
+class DataVersion(models.Model):
+    """
+    Contador de versão por usuário e recurso ('habits', 'workouts', ...), incrementado a
+    cada escrita. Os GETs montam o ETag a partir dessas versões e respondem 304 sem
+    consultar os dados quando nada mudou.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='data_versions')
+    resource = models.CharField(max_length=32)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'resource')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.resource} v{self.version}"
@@ -0,0 +1,183 @@
+"""
+Deriva select_related, prefetch_related e .only() dos campos declarados em um serializer.
+
+Ex: HabitLogSerializer com habit_name (source='habit.name') vira
+    select_related('habit').only('id', 'habit', 'habit__name', 'date', ...)
+e a listagem deixa de fazer uma query por log para ler o nome do hábito.
+
+Campos que não mapeiam para colunas (source='*', SerializerMethodField, propriedades)
+desligam o .only(): todas as colunas são carregadas, mas os joins e prefetches
+continuam valendo. Nesse caso, colunas de campos não pedidos via ?fields= / ?omit=
+(core/sparse_fields.py) ainda ficam de fora com .defer().
+"""
+from dataclasses import dataclass, field as dataclass_field
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from core.sparse_fields import requested_field_names
+
+
+@dataclass
+class QuerysetPlan:
+    select_related: set = dataclass_field(default_factory=set)
+    prefetch_related: list = dataclass_field(default_factory=list)
+    # None = não dá para restringir as colunas
+    only: set = dataclass_field(default_factory=set)
+    # Usado quando only é None: colunas de campos que a requisição não pediu
+    defer: set = dataclass_field(default_factory=set)
+
+    def apply(self, queryset, extra_columns=()):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only is not None:
+            queryset = queryset.only(*sorted(self.only | set(extra_columns)))
+        elif self.defer - set(extra_columns):
+            queryset = queryset.defer(*sorted(self.defer - set(extra_columns)))
+        return queryset
+
+
+@lru_cache(maxsize=256)
+def queryset_plan(serializer_class, field_names=None):
+    """
+    Plano (em cache) para o model do Meta do serializer. field_names (frozenset) limita
+    os campos considerados, como em ?fields= / ?omit=.
+    """
+    return _build_plan(serializer_class(), serializer_class.Meta.model, field_names)
+
+
+@lru_cache(maxsize=None)
+def serializer_field_names(serializer_class):
+    """Nomes dos campos declarados no serializer (para validar ?fields= / ?omit=)"""
+    return tuple(serializer_class().fields.keys())
+
+
+def optimize_queryset(queryset, serializer_class, extra_columns=(), field_names=None):
+    """Aplica o plano do serializer; extra_columns entram no .only() (ex: campos de ordenação)"""
+    if field_names is not None:
+        field_names = frozenset(field_names)
+    return queryset_plan(serializer_class, field_names).apply(queryset, extra_columns)
+
+
+def _build_plan(serializer, model, field_names=None):
+    plan = QuerysetPlan(only={model._meta.pk.name})
+    for name, serializer_field in serializer.fields.items():
+        if serializer_field.write_only:
+            continue
+        if field_names is not None and name not in field_names:
+            _defer_column(plan, model, serializer_field)
+            continue
+        if serializer_field.source == '*':
+            plan.only = None
+            continue
+        _add_field(plan, model, serializer_field, serializer_field.source.split('.'))
+    return plan
+
+
+def _add_field(plan, model, serializer_field, attrs):
+    path = []
+    current = model
+    for position, attr in enumerate(attrs):
+        last = position == len(attrs) - 1
+        try:
+            model_field = current._meta.get_field(attr)
+        except FieldDoesNotExist:
+            # Propriedade ou método do model: precisa dos objetos completos
+            plan.only = None
+            return
+
+        lookup = '__'.join(path + [attr])
+
+        if model_field.many_to_many or model_field.one_to_many:
+            plan.prefetch_related.append(_prefetch(lookup, model_field, serializer_field if last else None))
+            return
+
+        if not model_field.is_relation:
+            if not last:
+                # Ex: chave dentro de um JSONField
+                plan.only = None
+                return
+            _add_column(plan, lookup)
+            return
+
+        # ForeignKey / OneToOne
+        if last:
+            if isinstance(serializer_field, serializers.BaseSerializer):
+                plan.select_related.add(lookup)
+                nested = _build_plan(serializer_field, model_field.related_model)
+                _merge_nested(plan, nested, lookup)
+                # O FK precisa estar carregado para o join ser usado
+                if model_field.concrete:
+                    _add_column(plan, lookup)
+            elif model_field.concrete:
+                _add_column(plan, lookup)  # PrimaryKeyRelatedField: só o id
+            else:
+                # OneToOne reverso sem serializer aninhado
+                plan.select_related.add(lookup)
+                plan.only = None
+            return
+
+        plan.select_related.add(lookup)
+        if model_field.concrete:
+            _add_column(plan, lookup)
+        path.append(attr)
+        current = model_field.related_model
+
+
+def _defer_column(plan, model, serializer_field):
+    if serializer_field.source == '*' or '.' in serializer_field.source:
+        return
+    try:
+        model_field = model._meta.get_field(serializer_field.source)
+    except FieldDoesNotExist:
+        return
+    if model_field.concrete and not model_field.is_relation and not model_field.primary_key:
+        plan.defer.add(model_field.name)
+
+
+def _add_column(plan, lookup):
+    if plan.only is not None:
+        plan.only.add(lookup)
+
+
+def _merge_nested(plan, nested, lookup):
+    plan.select_related.update(f'{lookup}__{related}' for related in nested.select_related)
+    plan.prefetch_related.extend(
+        Prefetch(f'{lookup}__{item.prefetch_through}', queryset=item.queryset, to_attr=item.to_attr)
+        if isinstance(item, Prefetch) else f'{lookup}__{item}'
+        for item in nested.prefetch_related
+    )
+    if nested.only is None:
+        plan.only = None
+    elif plan.only is not None:
+        plan.only.update(f'{lookup}__{column}' for column in nested.only)
+
+
+def _prefetch(lookup, model_field, serializer_field):
+    """Prefetch com o queryset do filho otimizado quando há um serializer aninhado"""
+    child = getattr(serializer_field, 'child', serializer_field)
+    if not isinstance(child, serializers.BaseSerializer):
+        return lookup
+
+    related_model = model_field.related_model
+    nested = _build_plan(child, related_model)
+    if nested.only is not None and model_field.one_to_many:
+        # O prefetch reverso agrupa os filhos pelo FK: ele precisa estar carregado
+        nested.only.add(model_field.field.name)
+    return Prefetch(lookup, queryset=nested.apply(related_model._default_manager.all()))
+
+
+def optimize_for_request(queryset, request, serializer_class, extra_columns=()):
+    """
+    Otimiza o queryset de um GET a partir do serializer da resposta, respeitando
+    ?fields= / ?omit=. Escritas recebem o queryset original (objetos completos).
+    """
+    if request.method not in SAFE_METHODS:
+        return queryset
+    field_names = requested_field_names(request, serializer_field_names(serializer_class))
+    return optimize_queryset(queryset, serializer_class, extra_columns, field_names)
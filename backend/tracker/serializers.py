@@ -1,13 +1,16 @@
+from django.db import transaction
 from rest_framework import serializers
+from core.sparse_fields import SparseFieldsetMixin
 from .models import Habit, HabitLog, Workout, PersonalRecord, BodyMeasurement, LifeAssessment, JournalEntry, WorkoutTemplate, Exercise
+from .services import sync_workout_sets
 
-class HabitSerializer(serializers.ModelSerializer):
+class HabitSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Habit
         fields = ['id', 'name', 'category', 'target_frequency', 'user', 'created_at']
         read_only_fields = ['user', 'created_at']
 
-class HabitLogSerializer(serializers.ModelSerializer):
+class HabitLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     habit_name = serializers.ReadOnlyField(source='habit.name')
 
     class Meta:
@@ -15,43 +18,64 @@ class HabitLogSerializer(serializers.ModelSerializer):
         fields = ['id', 'habit', 'habit_name', 'date', 'completed', 'value', 'user']
         read_only_fields = ['habit_name', 'user', 'date'] # User e date serão preenchidos pela View
 
-class WorkoutSerializer(serializers.ModelSerializer):
+class HabitLogBulkEntrySerializer(serializers.Serializer):
+    """Uma entrada do check-in em lote: {habit, date, completed, value}. Sem value, o valor gravado é mantido"""
+    habit = serializers.IntegerField()
+    date = serializers.DateField()
+    completed = serializers.BooleanField(default=True)
+    value = serializers.FloatField(required=False, allow_null=True)
+
+class WorkoutSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Workout
         fields = '__all__'
         read_only_fields = ['user']
 
-class PersonalRecordSerializer(serializers.ModelSerializer):
+    # Dual-write: toda escrita do treino também regrava as séries normalizadas (WorkoutSet)
+    def create(self, validated_data):
+        with transaction.atomic():
+            workout = super().create(validated_data)
+            sync_workout_sets(workout)
+        return workout
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            workout = super().update(instance, validated_data)
+            if 'exercises_data' in validated_data:
+                sync_workout_sets(workout)
+        return workout
+
+class PersonalRecordSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = PersonalRecord
         fields = '__all__'
-        read_only_fields = ['user']
+        read_only_fields = ['user', 'workout', 'estimated_1rm']
 
-class BodyMeasurementSerializer(serializers.ModelSerializer):
+class BodyMeasurementSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = BodyMeasurement
         fields = '__all__'
         read_only_fields = ['user']
 
-class LifeAssessmentSerializer(serializers.ModelSerializer):
+class LifeAssessmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = LifeAssessment
         fields = '__all__'
         read_only_fields = ['user', 'date']
 
-class JournalEntrySerializer(serializers.ModelSerializer):
+class JournalEntrySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = JournalEntry
         fields = '__all__'
         read_only_fields = ['user', 'date']
 
-class WorkoutTemplateSerializer(serializers.ModelSerializer):
+class WorkoutTemplateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = WorkoutTemplate
         fields = '__all__'
         read_only_fields = ['user']
 
-class ExerciseSerializer(serializers.ModelSerializer):
+class ExerciseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Exercise
         fields = '__all__'
\ No newline at end of file
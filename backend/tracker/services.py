@@ -0,0 +1,1041 @@
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Q, Sum, Window
+from django.db.models.functions import FirstValue, RowNumber, TruncDate
+from django.utils import timezone
+
+from users.models import UserProfile
+from .models import BodyMeasurement, DailySummary, DataVersion, Exercise, Habit, HabitDayValue, HabitLog, HabitYearBitmap, JournalEntry, PersonalRecord, Workout, WorkoutSet
+from .parsing import iter_workout_sets
+from .stats_cache import STAT_DEPENDENCIES, schedule_stats_invalidation, stats_depending_on
+from . import analytics, deferred
+
+
+# --- DATAS E FUSO HORÁRIO DO USUÁRIO ---
+# Colunas DateTimeField (Workout.date_time, JournalEntry.date) nunca devem ser filtradas
+# com __date: o cast na coluna impede o uso dos índices. Convertemos os dias do
+# calendário do usuário em intervalos semiabertos [início, fim) de timestamps.
+
+def _zone(name):
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.get_default_timezone()
+
+
+def get_user_timezone(user_id):
+    """Fuso do perfil do usuário (UserProfile.timezone) ou o TIME_ZONE do servidor"""
+    return _zone(UserProfile.objects.filter(user_id=user_id).values_list('timezone', flat=True).first())
+
+
+def profile_timezone(profile):
+    """Fuso de um UserProfile já carregado (sem nova query)"""
+    return _zone(profile.timezone)
+
+
+def user_today(tz):
+    """Data de hoje no fuso do usuário"""
+    return timezone.localdate(timezone=tz)
+
+
+def local_day(value, tz):
+    """Dia do calendário do usuário em que um datetime aware cai"""
+    return timezone.localdate(value, timezone=tz)
+
+
+def day_window(start_day, end_day, tz):
+    """
+    Converte os dias [start_day, end_day] (inclusivos) do fuso `tz` em um intervalo
+    semiaberto de datetimes aware. Use com __gte / __lt.
+    """
+    start = datetime.combine(start_day, time.min, tzinfo=tz)
+    end = datetime.combine(end_day + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+
+# --- STREAKS (Dias consecutivos) ---
+# Técnica "gaps and islands": numeramos os dias do DailySummary com pelo menos 1 hábito
+# completado (ROW_NUMBER) e subtraímos esse número do "número do dia".
+# Dias consecutivos ficam com a mesma diferença (mesma ilha), então basta
+# agrupar pela diferença para obter o tamanho de cada sequência.
+def calculate_habit_streaks(user, today):
+    """
+    Retorna (streak_atual, maior_streak) a partir dos bitmaps anuais dos hábitos.
+
+    O streak atual é a sequência de dias com hábito completado que termina hoje
+    (se hoje não tem nada completado, o streak atual é 0).
+    """
+    rows = HabitYearBitmap.objects.filter(
+        user_id=user.pk, year__lte=today.year
+    ).values_list('year', 'bits').order_by()
+
+    # Um dia conta se qualquer hábito foi completado: OR dos bitmaps de cada ano
+    years = {}
+    for year, bits in rows:
+        years[year] = years.get(year, 0) | analytics.bitmap_from_bytes(bits)
+    if not years:
+        return 0, 0
+
+    start = date(min(years), 1, 1)
+    bitset = analytics.window_bitset(years, start, today)
+    return analytics.trailing_run(bitset, (today - start).days), analytics.longest_run(bitset)
+
+
+# --- RESUMO DIÁRIO (DailySummary) ---
+def _score(habits_completed, habits_total):
+    if not habits_total:
+        return 0
+    return min(int(habits_completed / habits_total * 100), 100)
+
+
+def refresh_daily_summaries(user_id, days):
+    """
+    Recalcula o DailySummary de um usuário nos dias informados, com uma query agrupada
+    por model (o custo não depende de quantos dias mudaram).
+    Chamado depois do commit das escritas em HabitLog, Workout e JournalEntry.
+    """
+    days = sorted(set(days))
+    if not days:
+        return []
+    tz = get_user_timezone(user_id)
+    start, end = day_window(days[0], days[-1], tz)
+
+    completed = dict(
+        HabitLog.objects.filter(user_id=user_id, date__in=days, completed=True).values('date').annotate(
+            total=Count('id')
+        ).values_list('date', 'total').order_by()
+    )
+    workouts = dict(
+        Workout.objects.filter(user_id=user_id, date_time__gte=start, date_time__lt=end).annotate(
+            day=TruncDate('date_time', tzinfo=tz)
+        ).values('day').annotate(total=Count('id')).values_list('day', 'total').order_by()
+    )
+    journal = {
+        item['day']: item
+        for item in JournalEntry.objects.filter(user_id=user_id, date__gte=start, date__lt=end).annotate(
+            day=TruncDate('date', tzinfo=tz)
+        ).values('day').annotate(total=Count('id'), mood=Avg('mood_rating')).order_by()
+    }
+
+    habits_total = Habit.objects.filter(user_id=user_id).count()
+    summaries, empty_days = [], []
+    for day in days:
+        habits_completed = completed.get(day, 0)
+        entries = journal.get(day, {'total': 0, 'mood': None})
+        if not (habits_completed or workouts.get(day) or entries['total']):
+            empty_days.append(day)
+            continue
+        summaries.append(DailySummary(
+            user_id=user_id,
+            date=day,
+            habits_completed=habits_completed,
+            habits_total=habits_total,
+            workouts=workouts.get(day, 0),
+            journal_entries=entries['total'],
+            journal_mood=entries['mood'],
+            score=_score(habits_completed, habits_total),
+        ))
+
+    with transaction.atomic():
+        if empty_days:
+            # Dias sem atividade: mantemos a tabela esparsa
+            DailySummary.objects.filter(user_id=user_id, date__in=empty_days).delete()
+        DailySummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=[
+                'habits_completed', 'habits_total', 'workouts', 'journal_entries', 'journal_mood', 'score',
+                'updated_at',
+            ],
+        )
+    return summaries
+
+
+def _refresh_summaries(keys):
+    days_by_user = {}
+    for user_id, day in keys:
+        days_by_user.setdefault(user_id, []).append(day)
+    for user_id, days in days_by_user.items():
+        refresh_daily_summaries(user_id, days)
+
+
+def refresh_habit_totals(user_ids):
+    """
+    Regrava habits_total (e o score) em todos os DailySummary dos usuários com o número
+    atual de hábitos: a mesma regra do recálculo de um dia e de rebuild_daily_summaries.
+    """
+    totals = dict(
+        Habit.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            total=Count('id')
+        ).values_list('user_id', 'total').order_by()
+    )
+    changed = []
+    for user_id in user_ids:
+        total = totals.get(user_id, 0)
+        for summary in DailySummary.objects.filter(user_id=user_id).exclude(habits_total=total).only(
+            'id', 'habits_completed'
+        ):
+            summary.habits_total = total
+            summary.score = _score(summary.habits_completed, total)
+            changed.append(summary)
+    DailySummary.objects.bulk_update(changed, ['habits_total', 'score'], batch_size=1000)
+
+
+def schedule_habit_totals_refresh(user_id):
+    """Agenda refresh_habit_totals para depois do commit (criar ou apagar um hábito)"""
+    deferred.defer('habit_totals', user_id, refresh_habit_totals)
+
+
+def schedule_summary_refresh(user_id, day):
+    """
+    Agenda o recálculo para depois do commit (evita recriar linhas durante deletes em cascata).
+    Os dias agendados na mesma transação são recalculados juntos, uma vez por usuário.
+    """
+    deferred.defer('summary', (user_id, day), _refresh_summaries)
+
+
+def _group_users_by_timezone(user_ids):
+    """{tzinfo: [user_id, ...]} para os usuários informados"""
+    names = dict(
+        UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'timezone')
+    )
+    groups = {}
+    for user_id in user_ids:
+        groups.setdefault(_zone(names.get(user_id)), []).append(user_id)
+    return groups
+
+
+def rebuild_daily_summaries(user_ids, batch_size=1000):
+    """
+    Reconstrói o DailySummary dos usuários informados a partir dos registros brutos.
+    Usa queries agrupadas por dia (uma por modelo), então o custo não depende do número de dias.
+    habits_total é o número atual de hábitos em todas as linhas, como nos recálculos incrementais.
+    Retorna o número de linhas criadas.
+    """
+    user_ids = list(user_ids)
+
+    days = {}
+
+    def row(user_id, day):
+        return days.setdefault((user_id, day), {
+            'habits_completed': 0, 'workouts': 0, 'journal_entries': 0, 'journal_mood': None,
+        })
+
+    habit_rows = HabitLog.objects.filter(user_id__in=user_ids, completed=True).values(
+        'user_id', 'date'
+    ).annotate(total=Count('id')).order_by()
+    for item in habit_rows:
+        row(item['user_id'], item['date'])['habits_completed'] = item['total']
+
+    # Treinos e diário são agrupados pelo dia no fuso de cada usuário (uma query por fuso)
+    for tz, tz_user_ids in _group_users_by_timezone(user_ids).items():
+        workout_rows = Workout.objects.filter(user_id__in=tz_user_ids).annotate(
+            day=TruncDate('date_time', tzinfo=tz)
+        ).values('user_id', 'day').annotate(total=Count('id')).order_by()
+        for item in workout_rows:
+            row(item['user_id'], item['day'])['workouts'] = item['total']
+
+        journal_rows = JournalEntry.objects.filter(user_id__in=tz_user_ids).annotate(
+            day=TruncDate('date', tzinfo=tz)
+        ).values('user_id', 'day').annotate(total=Count('id'), mood=Avg('mood_rating')).order_by()
+        for item in journal_rows:
+            data = row(item['user_id'], item['day'])
+            data['journal_entries'] = item['total']
+            data['journal_mood'] = item['mood']
+
+    habit_totals = dict(
+        Habit.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            total=Count('id')
+        ).values_list('user_id', 'total').order_by()
+    )
+
+    summaries = []
+    for (user_id, day), data in days.items():
+        habits_total = habit_totals.get(user_id, 0)
+        summaries.append(DailySummary(
+            user_id=user_id,
+            date=day,
+            habits_total=habits_total,
+            score=_score(data['habits_completed'], habits_total),
+            **data,
+        ))
+
+    with transaction.atomic():
+        DailySummary.objects.filter(user_id__in=user_ids).delete()
+        DailySummary.objects.bulk_create(summaries, batch_size=batch_size)
+        for user_id in user_ids:
+            schedule_stats_invalidation(user_id, STAT_DEPENDENCIES)
+
+    return len(summaries)
+
+
+def bulk_upsert_habit_logs(user, entries):
+    """
+    Grava vários check-ins de hábito em uma transação, com upsert no unique_together
+    (habit, date, user). `entries` são dicts já validados com habit (id), date,
+    completed e, opcionalmente, value. Se o mesmo (habit, date) vier repetido, vale o último.
+
+    Entradas sem a chave value mantêm o valor já gravado (o check-in do DailyLog só
+    manda completed); entradas com value, mesmo null, sobrescrevem.
+
+    Retorna os HabitLogs gravados, ou None se algum hábito não pertencer ao usuário.
+    """
+    entries = list({(entry['habit'], entry['date']): entry for entry in entries}.values())
+
+    # Valida a posse de todos os hábitos com uma única query
+    habit_ids = {entry['habit'] for entry in entries}
+    habits = {
+        habit.id: habit
+        for habit in Habit.objects.filter(user=user, id__in=habit_ids).only('id', 'name', 'user_id')
+    }
+    if len(habits) != len(habit_ids):
+        return None
+
+    logs = [
+        HabitLog(
+            habit=habits[entry['habit']],
+            user=user,
+            date=entry['date'],
+            completed=entry['completed'],
+            value=entry.get('value'),
+        )
+        for entry in entries
+    ]
+    with_value = [log for log, entry in zip(logs, entries) if 'value' in entry]
+    without_value = [log for log, entry in zip(logs, entries) if 'value' not in entry]
+
+    with transaction.atomic():
+        for group, update_fields in ((with_value, ['completed', 'value']), (without_value, ['completed'])):
+            if group:
+                HabitLog.objects.bulk_create(
+                    group,
+                    update_conflicts=True,
+                    unique_fields=['habit', 'date', 'user'],
+                    update_fields=update_fields,
+                )
+        if without_value:
+            # O value dessas linhas ficou como estava no banco: relê para a resposta
+            stored = {
+                (habit_id, day): value
+                for habit_id, day, value in HabitLog.objects.filter(
+                    user=user,
+                    habit_id__in={log.habit_id for log in without_value},
+                    date__in={log.date for log in without_value},
+                ).values_list('habit_id', 'date', 'value')
+            }
+            for log in without_value:
+                log.value = stored.get((log.habit_id, log.date))
+
+        # bulk_create não dispara signals: atualiza o resumo diário explicitamente
+        for day in {log.date for log in logs}:
+            schedule_summary_refresh(user.pk, day)
+        for habit_id, year in {(log.habit_id, log.date.year) for log in logs}:
+            schedule_bitmap_refresh(habit_id, year)
+        bump_data_versions(user.pk, ['habit_logs'])
+        schedule_stats_invalidation(user.pk, stats_depending_on('tracker.HabitLog'))
+
+    return logs
+
+
+def summary_totals(user, start, end):
+    """Soma as colunas do DailySummary em [start, end] (datas inclusivas) com um range scan"""
+    totals = DailySummary.objects.filter(user=user, date__gte=start, date__lte=end).aggregate(
+        habits_completed=Sum('habits_completed'),
+        workouts=Sum('workouts'),
+        journal_entries=Sum('journal_entries'),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+
+BUCKET_GRANULARITIES = ('day', 'week', 'month')
+MAX_BUCKETS = 366
+
+
+def period_buckets(today, granularity, count):
+    """
+    `count` períodos consecutivos terminando em `today`, do mais antigo ao mais recente:
+    [(início, fim), ...] com datas inclusivas. Semanas começam na segunda e meses no dia 1;
+    o último período vai só até hoje.
+    """
+    from dateutil.relativedelta import relativedelta
+
+    if granularity == 'day':
+        starts = [today - timedelta(days=i) for i in range(count)]
+        step = relativedelta(days=1)
+    elif granularity == 'week':
+        monday = today - timedelta(days=today.weekday())
+        starts = [monday - timedelta(weeks=i) for i in range(count)]
+        step = relativedelta(weeks=1)
+    else:
+        first = today.replace(day=1)
+        starts = [first - relativedelta(months=i) for i in range(count)]
+        step = relativedelta(months=1)
+
+    starts.reverse()
+    return [(start, min(start + step - timedelta(days=1), today)) for start in starts]
+
+
+def summary_series(user, buckets):
+    """
+    Totais do DailySummary para vários períodos [(início, fim), ...] em uma única query:
+    cada período vira um conjunto de agregações condicionais (Sum com filter=Q).
+    Retorna uma lista de dicts com habits_completed, workouts, journal_entries e average_mood.
+    """
+    if not buckets:
+        return []
+
+    aggregates = {}
+    for i, (start, end) in enumerate(buckets):
+        in_bucket = Q(date__gte=start, date__lte=end)
+        aggregates[f'habits_{i}'] = Sum('habits_completed', filter=in_bucket)
+        aggregates[f'workouts_{i}'] = Sum('workouts', filter=in_bucket)
+        aggregates[f'journal_{i}'] = Sum('journal_entries', filter=in_bucket)
+        # Média do humor ponderada pelo número de entradas de cada dia
+        aggregates[f'mood_{i}'] = Sum(F('journal_mood') * F('journal_entries'), filter=in_bucket)
+        aggregates[f'mood_entries_{i}'] = Sum(
+            'journal_entries', filter=in_bucket & Q(journal_mood__isnull=False)
+        )
+
+    first_day = min(start for start, _ in buckets)
+    last_day = max(end for _, end in buckets)
+    totals = DailySummary.objects.filter(
+        user=user, date__gte=first_day, date__lte=last_day
+    ).aggregate(**aggregates)
+
+    series = []
+    for i, (start, end) in enumerate(buckets):
+        mood_entries = totals[f'mood_entries_{i}']
+        series.append({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'habits_completed': totals[f'habits_{i}'] or 0,
+            'workouts': totals[f'workouts_{i}'] or 0,
+            'journal_entries': totals[f'journal_{i}'] or 0,
+            'average_mood': round(totals[f'mood_{i}'] / mood_entries, 2) if mood_entries else None,
+        })
+    return series
+
+
+# --- VERSÕES DOS DADOS (ETag) ---
+
+def bump_data_versions(user_id, resources):
+    """Incrementa a versão de cada recurso do usuário (cria o contador na primeira escrita)"""
+    resources = set(resources)
+    if not resources:
+        return
+    now = timezone.now()
+    counters = DataVersion.objects.filter(user_id=user_id, resource__in=resources)
+    if counters.update(version=F('version') + 1, updated_at=now) == len(resources):
+        return
+
+    existing = set(counters.values_list('resource', flat=True))
+    missing = resources - existing
+    # Pode haver outra requisição criando o mesmo contador: ignora o conflito e incrementa
+    DataVersion.objects.bulk_create(
+        [DataVersion(user_id=user_id, resource=resource, version=0, updated_at=now) for resource in missing],
+        ignore_conflicts=True,
+    )
+    DataVersion.objects.filter(user_id=user_id, resource__in=missing).update(
+        version=F('version') + 1, updated_at=now
+    )
+
+
+def data_versions(user_id, resources):
+    """{recurso: (versão, updated_at)}; recursos nunca escritos ficam com (0, None)"""
+    found = {
+        resource: (version, updated_at)
+        for resource, version, updated_at in DataVersion.objects.filter(
+            user_id=user_id, resource__in=resources
+        ).values_list('resource', 'version', 'updated_at')
+    }
+    return {resource: found.get(resource, (0, None)) for resource in resources}
+
+# --- SÉRIES NORMALIZADAS (WorkoutSet) ---
+def resolve_exercise_ids(user_id, names):
+    """{nome: exercise_id} para os nomes informados; exercícios do usuário têm prioridade sobre os globais"""
+    exercise_ids = {}
+    exercises = Exercise.objects.filter(
+        Q(user_id=user_id) | Q(user__isnull=True), name__in=set(names)
+    ).values_list('name', 'id', 'user_id')
+    for name, exercise_id, owner_id in exercises:
+        if owner_id is not None or name not in exercise_ids:
+            exercise_ids[name] = exercise_id
+    return exercise_ids
+
+
+def sync_workout_sets(workout):
+    """
+    Regrava as séries normalizadas (WorkoutSet) de um treino a partir do exercises_data.
+    Chamado pelo WorkoutSerializer no create/update (dual-write).
+    """
+    rows = list(iter_workout_sets(workout.exercises_data))
+    exercise_ids = resolve_exercise_ids(workout.user_id, [name for _, name, _ in rows]) if rows else {}
+
+    with transaction.atomic():
+        WorkoutSet.objects.filter(workout=workout).delete()
+        WorkoutSet.objects.bulk_create([
+            WorkoutSet(
+                workout=workout,
+                user_id=workout.user_id,
+                exercise_id=exercise_ids.get(name),
+                exercise_name=name,
+                position=position,
+                **workout_set,
+            )
+            for position, name, workout_set in rows
+        ])
+
+
+def exercise_history(user, exercise_id=None, exercise_name=None, muscle_group=None, limit=20):
+    """
+    Histórico por treino de um exercício (ou grupo muscular), agregado em SQL sobre WorkoutSet:
+    séries, repetições, carga máxima e volume (reps × carga) de cada sessão, mais os totais.
+    """
+    sets = WorkoutSet.objects.filter(user=user)
+    if exercise_id:
+        sets = sets.filter(exercise_id=exercise_id)
+    if exercise_name:
+        sets = sets.filter(exercise_name=exercise_name)
+    if muscle_group:
+        sets = sets.filter(exercise__muscle_group__icontains=muscle_group)
+
+    def volume():
+        return Sum(F('reps') * F('weight_kg'))
+
+    sessions = sets.values('workout_id', 'workout__date_time').annotate(
+        set_count=Count('id'),
+        total_reps=Sum('reps'),
+        max_weight_kg=Max('weight_kg'),
+        volume_kg=volume(),
+    ).order_by('-workout__date_time')[:limit]
+
+    totals = sets.aggregate(
+        set_count=Count('id'),
+        total_reps=Sum('reps'),
+        max_weight_kg=Max('weight_kg'),
+        volume_kg=volume(),
+        last_trained=Max('workout__date_time'),
+    )
+
+    return {
+        'sessions': [
+            {
+                'workout': session['workout_id'],
+                'date_time': session['workout__date_time'],
+                'sets': session['set_count'],
+                'reps': session['total_reps'] or 0,
+                'max_weight_kg': session['max_weight_kg'],
+                'volume_kg': round(session['volume_kg'] or 0, 1),
+            }
+            for session in sessions
+        ],
+        'totals': {
+            'sets': totals['set_count'],
+            'reps': totals['total_reps'] or 0,
+            'max_weight_kg': totals['max_weight_kg'],
+            'volume_kg': round(totals['volume_kg'] or 0, 1),
+        },
+        'last_trained': totals['last_trained'],
+    }
+
+
+# --- RECORDES PESSOAIS ---
+def personal_record_history(user):
+    """
+    Melhor recorde (maior carga; desempate por mais reps e data mais antiga), recorde mais
+    recente e quantidade de registros de cada exercício, em uma única query com window functions.
+    """
+    partition = [F('exercise_name')]
+    best_order = [F('weight_kg').desc(), F('reps').desc(), F('date').asc(), F('id').asc()]
+
+    def best(field):
+        return Window(FirstValue(field), partition_by=partition, order_by=best_order)
+
+    records = PersonalRecord.objects.filter(user=user).annotate(
+        # row == 1 é o registro mais recente de cada exercício
+        row=Window(RowNumber(), partition_by=partition, order_by=[F('date').desc(), F('id').desc()]),
+        best_weight_kg=best('weight_kg'),
+        best_reps=best('reps'),
+        best_date=best('date'),
+        record_count=Window(Count('id'), partition_by=partition),
+    ).filter(row=1).order_by('exercise_name').values(
+        'exercise_name', 'weight_kg', 'reps', 'date',
+        'best_weight_kg', 'best_reps', 'best_date', 'record_count',
+    )
+
+    return [
+        {
+            'exercise_name': record['exercise_name'],
+            'best_weight_kg': record['best_weight_kg'],
+            'best_reps': record['best_reps'],
+            'best_date': record['best_date'].isoformat(),
+            'latest_weight_kg': record['weight_kg'],
+            'latest_reps': record['reps'],
+            'latest_date': record['date'].isoformat(),
+            'record_count': record['record_count'],
+        }
+        for record in records
+    ]
+
+
+# --- DETECÇÃO AUTOMÁTICA DE PRs ---
+# Cada treino salvo gera candidatos a recorde por (exercício, nº de reps): a maior carga
+# levantada para aquele número de repetições (1RM, 3RM, 5RM...). O candidato vira um
+# PersonalRecord quando supera o 1RM estimado do exercício ou a maior carga já feita com
+# pelo menos aquelas reps (85kg x5 também vale como marca para 1-4 reps). O índice de
+# "melhor até agora" vem de uma query agregada (sem reprocessar treinos antigos).
+MAX_PR_REPS = 12
+
+
+def estimated_one_rep_max(weight_kg, reps):
+    """1RM estimado pela fórmula de Epley"""
+    if reps <= 1:
+        return round(weight_kg, 1)
+    return round(weight_kg * (1 + reps / 30), 1)
+
+
+def workout_rep_maxes(exercises_data):
+    """{(exercício, reps): maior carga} das séries de um exercises_data"""
+    bests = {}
+    for _, name, workout_set in iter_workout_sets(exercises_data):
+        reps, weight = workout_set['reps'], workout_set['weight_kg']
+        if not reps or not weight or reps > MAX_PR_REPS or weight <= 0:
+            continue
+        key = (name, reps)
+        if weight > bests.get(key, 0):
+            bests[key] = weight
+    return bests
+
+
+class ExerciseBests:
+    """Melhor carga por nº de reps e melhor 1RM estimado de um exercício"""
+
+    def __init__(self):
+        self.rep_maxes = {}
+        self.one_rep_max = 0
+
+    def add(self, weight, reps):
+        if weight > self.rep_maxes.get(reps, 0):
+            self.rep_maxes[reps] = weight
+        self.one_rep_max = max(self.one_rep_max, estimated_one_rep_max(weight, reps))
+
+    def beaten_by(self, weight, reps):
+        """
+        True se weight x reps supera o 1RM estimado ou a maior carga feita com `reps` ou
+        mais repetições. Um nº de reps sem marca anterior só conta pelo 1RM estimado.
+        """
+        if estimated_one_rep_max(weight, reps) > self.one_rep_max:
+            return True
+        heavier_reps = [best for best_reps, best in self.rep_maxes.items() if best_reps >= reps]
+        return bool(heavier_reps) and weight > max(heavier_reps)
+
+
+def best_so_far_index(user_id, exercise_names, until):
+    """{exercício: ExerciseBests} dos PRs do usuário com data até `until`"""
+    rows = PersonalRecord.objects.filter(
+        user_id=user_id, exercise_name__in=exercise_names, date__lte=until
+    ).values('exercise_name', 'reps').annotate(best=Max('weight_kg')).order_by()
+    index = {}
+    for row in rows:
+        index.setdefault(row['exercise_name'], ExerciseBests()).add(row['best'], row['reps'])
+    return index
+
+
+def _new_records(user_id, workout_id, day, bests, index):
+    """PRs (não salvos) dos candidatos que superam o índice; atualiza o índice"""
+    records = []
+    # Mais reps primeiro: 60kg x1 no mesmo treino de 85kg x5 não vira recorde
+    for (name, reps), weight in sorted(bests.items(), key=lambda item: (item[0][0], -item[0][1])):
+        exercise = index.setdefault(name, ExerciseBests())
+        if not exercise.beaten_by(weight, reps):
+            continue
+        exercise.add(weight, reps)
+        records.append(PersonalRecord(
+            user_id=user_id,
+            workout_id=workout_id,
+            exercise_name=name,
+            weight_kg=weight,
+            reps=reps,
+            date=day,
+            estimated_1rm=estimated_one_rep_max(weight, reps),
+        ))
+    return records
+
+
+def detect_personal_records(workout):
+    """
+    Recalcula os PRs automáticos de um treino (create ou update).
+    Os PRs gerados antes por este mesmo treino são descartados e recalculados.
+    """
+    day = local_day(workout.date_time, get_user_timezone(workout.user_id))
+    bests = workout_rep_maxes(workout.exercises_data)
+
+    with transaction.atomic():
+        deleted, _ = PersonalRecord.objects.filter(workout=workout).delete()
+        records = []
+        if bests:
+            index = best_so_far_index(workout.user_id, {name for name, _ in bests}, day)
+            records = _new_records(workout.user_id, workout.pk, day, bests, index)
+            PersonalRecord.objects.bulk_create(records)
+        if deleted or records:
+            bump_data_versions(workout.user_id, ['records'])
+            schedule_stats_invalidation(workout.user_id, stats_depending_on('tracker.PersonalRecord'))
+    return records
+
+
+def schedule_record_detection(workout):
+    transaction.on_commit(lambda: detect_personal_records(workout))
+
+
+def backfill_personal_records(user_ids, batch_size=500):
+    """
+    Refaz os PRs automáticos dos usuários percorrendo os treinos em ordem cronológica.
+    Os treinos são lidos em lotes (iterator) e o índice de melhor-até-agora fica em memória
+    apenas para o usuário atual, então a memória não cresce com o histórico.
+    Retorna o número de PRs criados.
+    """
+    user_ids = list(user_ids)
+    zones = {
+        user_id: tz
+        for tz, tz_user_ids in _group_users_by_timezone(user_ids).items()
+        for user_id in tz_user_ids
+    }
+
+    PersonalRecord.objects.filter(user_id__in=user_ids, workout__isnull=False).delete()
+
+    created = 0
+    pending = []
+    current_user = None
+    index = {}
+    manual = []
+
+    workouts = Workout.objects.filter(user_id__in=user_ids).order_by(
+        'user_id', 'date_time', 'id'
+    ).values('id', 'user_id', 'date_time', 'exercises_data').iterator(chunk_size=batch_size)
+
+    for workout in workouts:
+        if workout['user_id'] != current_user:
+            current_user = workout['user_id']
+            index = {}
+            # PRs cadastrados à mão entram no índice conforme a data dos treinos avança
+            manual = list(
+                PersonalRecord.objects.filter(user_id=current_user, workout__isnull=True)
+                .order_by('-date').values_list('date', 'exercise_name', 'reps', 'weight_kg')
+            )
+
+        day = local_day(workout['date_time'], zones[current_user])
+        while manual and manual[-1][0] <= day:
+            _, name, reps, weight = manual.pop()
+            index.setdefault(name, ExerciseBests()).add(weight, reps)
+
+        bests = workout_rep_maxes(workout['exercises_data'])
+        pending.extend(_new_records(current_user, workout['id'], day, bests, index))
+
+        if len(pending) >= batch_size:
+            PersonalRecord.objects.bulk_create(pending)
+            created += len(pending)
+            pending = []
+
+    if pending:
+        PersonalRecord.objects.bulk_create(pending)
+        created += len(pending)
+
+    # bulk_create não dispara signals: invalida ETags e o cache do histórico de PRs
+    for user_id in user_ids:
+        bump_data_versions(user_id, ['records'])
+        schedule_stats_invalidation(user_id, stats_depending_on('tracker.PersonalRecord'))
+
+    return created
+
+
+# --- VOLUME DE TREINO (NumPy) ---
+def training_volume(user, start, end, tz):
+    """
+    Tonelagem, séries e reps por semana e grupo muscular entre os dias [start, end].
+    Uma query traz (dia, grupo, reps, carga) de cada série; o resto é vetorizado em NumPy.
+    """
+    window_start, window_end = day_window(start, end, tz)
+    rows = WorkoutSet.objects.filter(
+        user=user, workout__date_time__gte=window_start, workout__date_time__lt=window_end
+    ).annotate(
+        day=TruncDate('workout__date_time', tzinfo=tz)
+    ).values_list('day', 'exercise__muscle_group', 'reps', 'weight_kg')
+
+    columns = list(zip(*rows)) or [(), (), (), ()]
+    days = np.array(columns[0], dtype='datetime64[D]')
+    reps = np.array(columns[2], dtype=float)
+    weights = np.array(columns[3], dtype=float)
+
+    weeks, groups, tonnage, sets, rep_totals = analytics.weekly_volume(days, columns[1], reps, weights)
+
+    return {
+        'weeks': [str(week) for week in weeks],
+        'muscle_groups': {
+            group: {
+                'tonnage_kg': np.round(tonnage[i], 1).tolist(),
+                'sets': sets[i].tolist(),
+                'reps': rep_totals[i].astype(int).tolist(),
+            }
+            for i, group in enumerate(groups)
+        },
+        'totals': {
+            group: {
+                'tonnage_kg': round(float(tonnage[i].sum()), 1),
+                'sets': int(sets[i].sum()),
+                'reps': int(rep_totals[i].sum()),
+            }
+            for i, group in enumerate(groups)
+        },
+    }
+
+
+# --- Métricas corporais ---
+
+def body_metrics_calculator(user_id):
+    """Calculadora de métricas com o perfil carregado uma única vez (uma query)"""
+    profile = UserProfile.objects.filter(user_id=user_id).values(
+        'height_cm', 'birth_date', 'gender', 'timezone'
+    ).first() or {}
+    return analytics.BodyMetricsCalculator(
+        profile.get('height_cm'), profile.get('birth_date'), profile.get('gender'),
+        today=user_today(_zone(profile.get('timezone'))),
+    )
+
+
+def body_metrics(user, limit=12):
+    """
+    Últimas `limit` medições em ordem cronológica, com IMC, TMB e % de massa magra,
+    mais as tendências da série. Duas queries: medições e perfil.
+    """
+    rows = list(BodyMeasurement.objects.filter(user=user).order_by('-date').values(
+        'date', 'weight_kg', 'muscle_mass_kg', 'fat_mass_percentage', 'notes', 'photo_front', 'photo_back'
+    )[:limit])
+    rows.reverse()
+
+    calculator = body_metrics_calculator(user.id)
+    weights = [row['weight_kg'] for row in rows]
+    muscle_masses = [row['muscle_mass_kg'] for row in rows]
+    fat_percentages = [row['fat_mass_percentage'] for row in rows]
+    metrics = calculator.series(weights, muscle_masses)
+
+    measurements = [
+        {
+            'date': row['date'].isoformat(),
+            'weight_kg': row['weight_kg'],
+            'fat_percentage': row['fat_mass_percentage'],
+            'muscle_mass_kg': row['muscle_mass_kg'],
+            'muscle_mass_percentage': metrics['muscle_mass_percentage'][i],
+            'bmi': metrics['bmi'][i],
+            'bmr': metrics['bmr'][i],
+            'notes': row['notes'],
+            'has_photos': bool(row['photo_front'] or row['photo_back']),
+        }
+        for i, row in enumerate(rows)
+    ]
+    trends = calculator.trends(
+        [row['date'] for row in rows], weights, muscle_masses, fat_percentages
+    )
+    return {
+        'measurements': measurements,
+        'trends': trends,
+        'latest': measurements[-1] if measurements else None,
+    }
+
+
+# --- BITMAPS DE HÁBITOS (HabitYearBitmap / HabitDayValue) ---
+# Derivados de HabitLog: uma linha de 46 bytes por (hábito, ano) em vez de uma por dia.
+# Streaks, heatmap e taxas de conclusão leem só os bitmaps.
+
+def refresh_habit_bitmap(habit_id, year):
+    """
+    Recalcula (idempotente) o bitmap e os valores de um hábito em um ano a partir de HabitLog.
+    A linha do hábito fica travada até o fim: refreshes simultâneos do mesmo hábito rodam em
+    fila e o último grava o estado mais recente (as gravações são upserts de qualquer forma).
+    """
+    start, end = date(year, 1, 1), date(year, 12, 31)
+
+    with transaction.atomic():
+        user_id = Habit.objects.select_for_update().filter(pk=habit_id).values_list('user_id', flat=True).first()
+        if user_id is None:
+            return  # hábito apagado: o CASCADE já removeu os bitmaps
+
+        rows = HabitLog.objects.filter(
+            habit_id=habit_id, date__gte=start, date__lte=end
+        ).values_list('date', 'completed', 'value').order_by()
+
+        completed_days = [(day - start).days for day, completed, _ in rows if completed]
+        values = [
+            HabitDayValue(habit_id=habit_id, user_id=user_id, date=day, value=value)
+            for day, _, value in rows if value is not None
+        ]
+
+        if completed_days:
+            HabitYearBitmap.objects.bulk_create(
+                [HabitYearBitmap(
+                    habit_id=habit_id,
+                    user_id=user_id,
+                    year=year,
+                    bits=analytics.bitmap_to_bytes(analytics.year_bitmap(completed_days)),
+                    completed_count=len(completed_days),
+                )],
+                update_conflicts=True,
+                unique_fields=['habit', 'year'],
+                update_fields=['user', 'bits', 'completed_count', 'updated_at'],
+            )
+        else:
+            HabitYearBitmap.objects.filter(habit_id=habit_id, year=year).delete()
+
+        HabitDayValue.objects.filter(habit_id=habit_id, date__gte=start, date__lte=end).exclude(
+            date__in=[value.date for value in values]
+        ).delete()
+        HabitDayValue.objects.bulk_create(
+            values,
+            update_conflicts=True,
+            unique_fields=['habit', 'date'],
+            update_fields=['user', 'value'],
+        )
+
+
+def _refresh_bitmaps(keys):
+    # Hábitos apagados na transação (delete em cascata dos check-ins) não têm o que recalcular
+    existing = set(Habit.objects.filter(pk__in={habit_id for habit_id, _ in keys}).values_list('pk', flat=True))
+    for habit_id, year in keys:
+        if habit_id in existing:
+            refresh_habit_bitmap(habit_id, year)
+
+
+def schedule_bitmap_refresh(habit_id, year):
+    """Agenda o recálculo do (hábito, ano) para depois do commit, uma vez por transação"""
+    deferred.defer('bitmap', (habit_id, year), _refresh_bitmaps)
+
+
+def rebuild_habit_bitmaps(user_ids, batch_size=1000):
+    """
+    Reconstrói do zero os bitmaps e valores dos usuários a partir de HabitLog.
+    Retorna quantos bitmaps (hábito, ano) foram gravados.
+    """
+    rows = HabitLog.objects.filter(user_id__in=user_ids).filter(
+        Q(completed=True) | Q(value__isnull=False)
+    ).values_list('habit_id', 'user_id', 'date', 'completed', 'value').order_by()
+
+    owners, completed, values = {}, [], []
+    for habit_id, user_id, day, done, value in rows:
+        owners[habit_id] = user_id
+        if done:
+            completed.append((habit_id, day))
+        if value is not None:
+            values.append(HabitDayValue(habit_id=habit_id, user_id=user_id, date=day, value=value))
+
+    bitmaps = [
+        HabitYearBitmap(
+            habit_id=habit_id,
+            user_id=owners[habit_id],
+            year=year,
+            bits=analytics.bitmap_to_bytes(bitmap),
+            completed_count=bitmap.bit_count(),
+        )
+        for habit_id, years in analytics.group_year_bitmaps(
+            [habit_id for habit_id, _ in completed], [day for _, day in completed]
+        ).items()
+        for year, bitmap in years.items()
+    ]
+
+    with transaction.atomic():
+        HabitYearBitmap.objects.filter(user_id__in=user_ids).delete()
+        HabitDayValue.objects.filter(user_id__in=user_ids).delete()
+        HabitYearBitmap.objects.bulk_create(bitmaps, batch_size=batch_size)
+        HabitDayValue.objects.bulk_create(values, batch_size=batch_size)
+
+    for user_id in set(user_ids):
+        schedule_stats_invalidation(user_id, stats_depending_on('tracker.HabitLog'))
+    return len(bitmaps)
+
+
+def habit_year_bitmaps(user_id, start, end):
+    """
+    {habit_id: {ano: bitmap}} dos anos que cobrem [start, end], lidos de HabitYearBitmap
+    (uma linha por hábito e ano). Bit i do bitmap = dia do ano i + 1; quem usa recorta a
+    janela com analytics.window_bitset.
+    """
+    rows = HabitYearBitmap.objects.filter(
+        user_id=user_id, year__gte=start.year, year__lte=end.year
+    ).values_list('habit_id', 'year', 'bits').order_by()
+
+    bitmaps = {}
+    for habit_id, year, bits in rows:
+        bitmaps.setdefault(habit_id, {})[year] = analytics.bitmap_from_bytes(bits)
+    return bitmaps
+
+
+def habit_completion_rate(user_id, start, end, habits=None):
+    """
+    Dias-hábito completados em [start, end] sobre o total possível (hábitos × dias),
+    contando bits dos bitmaps em vez de linhas de HabitLog. `habits` evita a contagem
+    quando quem chama já sabe quantos hábitos o usuário tem.
+    """
+    if habits is None:
+        habits = Habit.objects.filter(user_id=user_id).count()
+    days = (end - start).days + 1
+    completed = sum(
+        analytics.window_bitset(years, start, end).bit_count()
+        for years in habit_year_bitmaps(user_id, start, end).values()
+    )
+    possible = habits * days
+    return {
+        'habits': habits,
+        'days': days,
+        'completed': completed,
+        'rate': round(completed / possible * 100, 1) if possible else 0,
+    }
+
+
+def habit_heatmap(user, start, end, today):
+    """
+    Heatmap de [start, end] por hábito e combinado. Cada hábito vira um bitset da janela;
+    contagens são popcount, o combinado "algum hábito" é o OR e "todos" é o AND.
+    """
+    length = (end - start).days + 1
+    habits = list(Habit.objects.filter(user=user).order_by('created_at', 'id').values('id', 'name'))
+    year_bitmaps = habit_year_bitmaps(user.pk, start, end)
+
+    # Posição de hoje na janela (para o streak atual); fora da janela não há streak atual
+    today_index = (today - start).days if start <= today <= end else None
+
+    def describe(bitset):
+        return {
+            'completed': bitset.bit_count(),
+            'rate': round(bitset.bit_count() / length * 100, 1),
+            'current_streak': analytics.trailing_run(bitset, today_index) if today_index is not None else 0,
+            'longest_streak': analytics.longest_run(bitset),
+        }
+
+    any_bits, all_bits = 0, (1 << length) - 1 if habits else 0
+    counts = np.zeros(length, dtype='int64')
+    result = []
+    for habit in habits:
+        bitset = analytics.window_bitset(year_bitmaps.get(habit['id'], {}), start, end)
+        any_bits |= bitset
+        all_bits &= bitset
+        days = analytics.bitset_to_array(bitset, length)
+        counts += days
+        result.append({'id': habit['id'], 'name': habit['name'], 'days': days.tolist(), **describe(bitset)})
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': length,
+        'habits': result,
+        'combined': {
+            'counts': counts.tolist(),
+            'all_completed_days': all_bits.bit_count(),
+            **describe(any_bits),
+        },
+    }
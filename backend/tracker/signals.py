@@ -0,0 +1,132 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import exercise_library
+from .models import Exercise, Habit, HabitLog, JournalEntry, Workout
+from .services import (
+    get_user_timezone, local_day, schedule_bitmap_refresh, schedule_habit_totals_refresh, schedule_record_detection,
+    schedule_summary_refresh
+)
+from .stats_cache import STAT_DEPENDENCIES, schedule_stats_invalidation, stats_depending_on
+
+
+# --- DailySummary: mantém o rollup diário em dia a cada escrita ---
+# Treinos e diário são atribuídos ao dia do calendário no fuso do usuário.
+
+@receiver(pre_save, sender=HabitLog)
+def habit_log_remember_previous(sender, instance, **kwargs):
+    # Guarda hábito e data antigos: um PATCH pode mover o check-in para outro hábito ou dia
+    instance._previous_habit_date = None
+    if instance.pk:
+        instance._previous_habit_date = HabitLog.objects.filter(
+            pk=instance.pk
+        ).values_list('habit_id', 'date').first()
+
+
+@receiver(post_save, sender=HabitLog)
+@receiver(post_delete, sender=HabitLog)
+def habit_log_changed(sender, instance, **kwargs):
+    schedule_summary_refresh(instance.user_id, instance.date)
+
+    previous = getattr(instance, '_previous_habit_date', None)
+    if previous and previous[1] != instance.date:
+        schedule_summary_refresh(instance.user_id, previous[1])
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def habit_changed(sender, instance, created=True, **kwargs):
+    # habits_total é o número atual de hábitos em todos os dias: só criar ou apagar muda
+    # (post_delete não envia created)
+    if created:
+        schedule_habit_totals_refresh(instance.user_id)
+
+
+@receiver(pre_save, sender=Workout)
+def workout_remember_day(sender, instance, **kwargs):
+    # Guarda o horário antigo para recalcular os dois resumos se o treino mudar de data
+    instance._summary_previous_date_time = None
+    if instance.pk:
+        instance._summary_previous_date_time = Workout.objects.filter(
+            pk=instance.pk
+        ).values_list('date_time', flat=True).first()
+
+
+@receiver(post_save, sender=Workout)
+@receiver(post_delete, sender=Workout)
+def workout_changed(sender, instance, **kwargs):
+    tz = get_user_timezone(instance.user_id)
+    day = local_day(instance.date_time, tz)
+    schedule_summary_refresh(instance.user_id, day)
+
+    previous = getattr(instance, '_summary_previous_date_time', None)
+    if previous and local_day(previous, tz) != day:
+        schedule_summary_refresh(instance.user_id, local_day(previous, tz))
+
+
+@receiver(pre_save, sender=JournalEntry)
+def journal_entry_remember_day(sender, instance, **kwargs):
+    instance._summary_previous_date = None
+    if instance.pk:
+        instance._summary_previous_date = JournalEntry.objects.filter(
+            pk=instance.pk
+        ).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_delete, sender=JournalEntry)
+def journal_entry_changed(sender, instance, **kwargs):
+    tz = get_user_timezone(instance.user_id)
+    day = local_day(instance.date, tz)
+    schedule_summary_refresh(instance.user_id, day)
+
+    previous = getattr(instance, '_summary_previous_date', None)
+    if previous and local_day(previous, tz) != day:
+        schedule_summary_refresh(instance.user_id, local_day(previous, tz))
+
+
+# --- Bitmaps anuais dos hábitos: recalcula o (hábito, ano) do check-in alterado ---
+# O hábito e a data antigos vêm de habit_log_remember_previous.
+
+@receiver(post_save, sender=HabitLog)
+@receiver(post_delete, sender=HabitLog)
+def habit_log_bitmap_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_bitmap_refresh(instance.habit_id, instance.date.year)
+
+    previous = getattr(instance, '_previous_habit_date', None)
+    if previous and (previous[0], previous[1].year) != (instance.habit_id, instance.date.year):
+        schedule_bitmap_refresh(previous[0], previous[1].year)
+
+
+# --- PRs: detecção automática a cada treino criado ou atualizado ---
+
+@receiver(post_save, sender=Workout)
+def workout_detect_records(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_record_detection(instance)
+
+
+# --- Biblioteca de exercícios: descarta a versão lida por este processo ---
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def exercise_changed(sender, instance, **kwargs):
+    if instance.user_id is None:
+        transaction.on_commit(exercise_library.forget_version)
+
+
+# --- Cache das estatísticas: invalida as que dependem do model alterado ---
+# A invalidação roda na última fase de tracker.deferred, depois do recálculo do DailySummary.
+
+def stats_source_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_stats_invalidation(instance.user_id, stats_depending_on(sender._meta.label))
+
+
+for _label in sorted({label for labels in STAT_DEPENDENCIES.values() for label in labels}):
+    post_save.connect(stats_source_changed, sender=apps.get_model(_label), dispatch_uid=f'stats-cache-save-{_label}')
+    post_delete.connect(stats_source_changed, sender=apps.get_model(_label), dispatch_uid=f'stats-cache-delete-{_label}')
@@ -0,0 +1,153 @@
+"""
+Cache dos endpoints de estatísticas, por usuário e parâmetros, no cache do Django.
+
+Cada estatística tem uma "geração" por usuário: um contador DataVersion com recurso
+'stats:<estatística>', lido do banco a cada consulta e portanto o mesmo em todos os
+workers, qualquer que seja o backend de cache. As respostas ficam em chaves que incluem
+a geração. Os signals (tracker/signals.py) incrementam a geração das estatísticas que
+dependem do model alterado (STAT_DEPENDENCIES), o que invalida todas as variações de
+parâmetros de uma vez sem precisar listar chaves.
+
+Os hits/misses são contados por processo e registrados no log (logger
+tracker.stats_cache, nível INFO) a cada COUNTERS_LOG_EVERY consultas.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from rest_framework.response import Response
+
+from . import deferred
+
+# Estatística -> models (app_label.Model) dos quais ela depende. Os contadores vêm do
+# DailySummary, que é recalculado on_commit a partir destes models; a invalidação também
+# roda on_commit, na fase seguinte (tracker.deferred), então acontece com o resumo já atualizado.
+STAT_DEPENDENCIES = {
+    'habit_stats': ('tracker.Habit', 'tracker.HabitLog', 'tracker.Workout', 'users.UserProfile'),
+    'weekly_workouts': ('tracker.Workout', 'users.UserProfile'),
+    'progress_comparison': ('tracker.HabitLog', 'tracker.Workout', 'tracker.JournalEntry', 'users.UserProfile'),
+    'body_metrics': ('tracker.BodyMeasurement', 'users.UserProfile'),
+    'pr_history': ('tracker.PersonalRecord',),
+    # Snapshot do usuário usado nos prompts da IA (users/services.py)
+    'ai_context': (
+        'tracker.Habit', 'tracker.HabitLog', 'tracker.Workout', 'tracker.LifeAssessment',
+        'tracker.BodyMeasurement', 'users.UserProfile',
+    ),
+}
+
+logger = logging.getLogger(__name__)
+
+# Consultas entre dois registros dos contadores no log
+COUNTERS_LOG_EVERY = 1000
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+_lookups = 0
+
+
+def _count(stat, outcome):
+    global _lookups
+
+    with _counters_lock:
+        _counters[(stat, outcome)] += 1
+        _lookups += 1
+        should_log = _lookups % COUNTERS_LOG_EVERY == 0
+    if should_log:
+        logger.info("Cache de estatísticas (pid %s): %s", os.getpid(), cache_counters())
+
+
+def cache_counters():
+    """{estatística: {'hits': n, 'misses': n}} deste processo"""
+    result = {stat: {'hits': 0, 'misses': 0} for stat in STAT_DEPENDENCIES}
+    with _counters_lock:
+        for (stat, outcome), value in _counters.items():
+            result.setdefault(stat, {'hits': 0, 'misses': 0})[outcome] += value
+    return result
+
+
+def reset_cache_counters():
+    global _lookups
+
+    with _counters_lock:
+        _counters.clear()
+        _lookups = 0
+
+
+def generation_resource(stat):
+    return f'stats:{stat}'
+
+
+def _generation(stat, user_id):
+    from .services import data_versions
+
+    resource = generation_resource(stat)
+    return data_versions(user_id, [resource])[resource][0]
+
+
+def invalidate_stats(user_id, stats):
+    """Incrementa a geração das estatísticas: as respostas antigas deixam de ser encontradas"""
+    from .services import bump_data_versions
+
+    bump_data_versions(user_id, [generation_resource(stat) for stat in stats])
+
+
+def stats_depending_on(label):
+    return [stat for stat, models in STAT_DEPENDENCIES.items() if label in models]
+
+
+def _invalidate(keys):
+    stats_by_user = {}
+    for user_id, stat in keys:
+        stats_by_user.setdefault(user_id, []).append(stat)
+    for user_id, stats in stats_by_user.items():
+        invalidate_stats(user_id, stats)
+
+
+def schedule_stats_invalidation(user_id, stats):
+    """Invalida depois do commit, na última fase de tracker.deferred (após resumos e bitmaps)"""
+    for stat in stats:
+        deferred.defer('stats', (user_id, stat), _invalidate)
+
+
+def cached_stat_response(stat, request, compute, **params):
+    """
+    Resposta em cache de `compute()` (que retorna um Response) para o usuário da requisição.
+    A chave inclui os query params e os `params` extras (ex: o dia de hoje no fuso do
+    usuário). Só respostas 200 são guardadas.
+    """
+    user_id = request.user.id
+    parts = sorted(request.query_params.items()) + sorted((key, str(value)) for key, value in params.items())
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    key = f'stats:{stat}:{user_id}:{_generation(stat, user_id)}:{digest}'
+
+    data = cache.get(key)
+    if data is not None:
+        _count(stat, 'hits')
+        return Response(data)
+
+    _count(stat, 'misses')
+    response = compute()
+    if response.status_code == 200:
+        cache.set(key, response.data)
+    return response
+
+
+def cached_stat(stat, user_id, compute, timeout=DEFAULT_TIMEOUT, **params):
+    """Como cached_stat_response, para valores que não são Responses (ex: contexto da IA)"""
+    parts = sorted((key, str(value)) for key, value in params.items())
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    key = f'stats:{stat}:{user_id}:{_generation(stat, user_id)}:{digest}'
+
+    value = cache.get(key)
+    if value is not None:
+        _count(stat, 'hits')
+        return value
+
+    _count(stat, 'misses')
+    value = compute()
+    cache.set(key, value, timeout)
+    return value
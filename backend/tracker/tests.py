@@ -1,3 +1,1274 @@
+import os
+import time
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max, Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import DailySummary, Exercise, Habit, HabitLog, JournalEntry, Workout
+from .services import rebuild_daily_summaries, rebuild_habit_bitmaps
+
+# Benchmarks com muitos dados (medem tempo contra um orçamento folgado):
+#   RUN_BENCHMARKS=1 python manage.py test tracker
+benchmark = skipUnless(os.environ.get('RUN_BENCHMARKS'), "defina RUN_BENCHMARKS=1 para rodar os benchmarks")
+
+
+class HabitStatsStreakTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.habit = Habit.objects.create(user=self.user, name='Meditar', target_frequency='diário')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def _log_days(self, days, offset=0):
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, user=self.user, date=self.today - timedelta(days=offset + i), completed=True)
+            for i in range(days)
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_daily_summaries([self.user.id])
+            rebuild_habit_bitmaps([self.user.id])
+
+    def _get_stats(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/tracker/habit-stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_current_and_longest_streak(self):
+        self._log_days(3)
+        # Sequência antiga mais longa, separada por um dia sem check-in
+        self._log_days(10, offset=4)
+        data, _ = self._get_stats()
+        self.assertEqual(data['streak'], 3)
+        self.assertEqual(data['longest_streak'], 10)
+
+    def test_streak_is_zero_without_checkin_today(self):
+        self._log_days(5, offset=1)
+        data, _ = self._get_stats()
+        self.assertEqual(data['streak'], 0)
+        self.assertEqual(data['longest_streak'], 5)
+
+    def test_query_count_does_not_grow_with_streak(self):
+        self._log_days(5)
+        _, short_queries = self._get_stats()
+
+        HabitLog.objects.all().delete()
+        self._log_days(300)
+        data, long_queries = self._get_stats()
+
+        self.assertEqual(data['streak'], 300)
+        self.assertEqual(short_queries, long_queries)
+
+
+class DailySummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.habit = Habit.objects.create(user=self.user, name='Ler', target_frequency='diário')
+        self.today = timezone.localdate()
+
+    def test_signals_keep_summary_up_to_date(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            log = HabitLog.objects.create(habit=self.habit, user=self.user, date=self.today, completed=True)
+            Workout.objects.create(user=self.user, date_time=timezone.now())
+            JournalEntry.objects.create(user=self.user, content='Dia bom', mood_rating=4)
+
+        summary = DailySummary.objects.get(user=self.user, date=self.today)
+        self.assertEqual(summary.habits_completed, 1)
+        self.assertEqual(summary.habits_total, 1)
+        self.assertEqual(summary.workouts, 1)
+        self.assertEqual(summary.journal_mood, 4)
+        self.assertEqual(summary.score, 100)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            log.completed = False
+            log.save()
+        self.assertEqual(DailySummary.objects.get(user=self.user, date=self.today).habits_completed, 0)
+
+    def test_moving_a_log_refreshes_both_days(self):
+        yesterday = self.today - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            log = HabitLog.objects.create(habit=self.habit, user=self.user, date=yesterday, completed=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            log.date = self.today
+            log.save()
+
+        self.assertFalse(DailySummary.objects.filter(user=self.user, date=yesterday).exists())
+        self.assertEqual(DailySummary.objects.get(user=self.user, date=self.today).habits_completed, 1)
+
+    def test_moving_a_journal_entry_refreshes_both_days(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = JournalEntry.objects.create(user=self.user, content='Dia bom', mood_rating=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.date = entry.date - timedelta(days=3)
+            entry.save()
+
+        self.assertFalse(DailySummary.objects.filter(user=self.user, date=self.today, journal_entries__gt=0).exists())
+        self.assertEqual(
+            DailySummary.objects.get(user=self.user, date=self.today - timedelta(days=3)).journal_entries, 1
+        )
+
+    def test_habits_total_is_the_current_count_on_every_day(self):
+        yesterday = self.today - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in (yesterday, self.today):
+                HabitLog.objects.create(habit=self.habit, user=self.user, date=day, completed=True)
+            Habit.objects.create(user=self.user, name='Correr', target_frequency='diário')
+
+        incremental = list(DailySummary.objects.filter(user=self.user).values_list('date', 'habits_total', 'score'))
+        self.assertEqual(sorted(incremental), [(yesterday, 2, 50), (self.today, 2, 50)])
+
+        rebuild_daily_summaries([self.user.id])
+        rebuilt = list(DailySummary.objects.filter(user=self.user).values_list('date', 'habits_total', 'score'))
+        self.assertEqual(sorted(rebuilt), sorted(incremental))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Habit.objects.get(name='Correr').delete()
+        self.assertEqual(
+            sorted(DailySummary.objects.filter(user=self.user).values_list('habits_total', 'score')), [(1, 100), (1, 100)]
+        )
+
+    def test_rebuild_matches_raw_rows(self):
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, user=self.user, date=self.today - timedelta(days=i), completed=True)
+            for i in range(3)
+        ])
+        self.assertEqual(rebuild_daily_summaries([self.user.id]), 3)
+        self.assertEqual(
+            sorted(DailySummary.objects.filter(user=self.user).values_list('habits_completed', flat=True)),
+            [1, 1, 1],
+        )
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def _seed(self, days):
+        for i in range(days):
+            day = self.today - timedelta(days=i)
+            habit = Habit.objects.create(user=self.user, name=f'Hábito {i}', target_frequency='diário')
+            HabitLog.objects.create(habit=habit, user=self.user, date=day, completed=True)
+            Workout.objects.create(user=self.user, date_time=timezone.now() - timedelta(days=i))
+
+    def test_groups_by_day_with_fixed_query_count(self):
+        self._seed(3)
+        url = f'/api/tracker/timeline/?from={self.today - timedelta(days=29)}&to={self.today}'
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['days']), 3)
+        self.assertEqual(response.data['days'][0]['date'], self.today.isoformat())
+        self.assertEqual(len(response.data['days'][0]['habit_logs']), 1)
+        self.assertEqual(len(response.data['days'][0]['workouts']), 1)
+
+        self._seed(20)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(url)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_cursor_pages_over_days(self):
+        self._seed(5)
+        url = f'/api/tracker/timeline/?from={self.today - timedelta(days=4)}&to={self.today}&page_size=3'
+        first = self.client.get(url).data
+        self.assertEqual(len(first['days']), 3)
+        self.assertEqual(first['next_cursor'], (self.today - timedelta(days=3)).isoformat())
+
+        second = self.client.get(f"{url}&cursor={first['next_cursor']}").data
+        self.assertEqual(len(second['days']), 2)
+        self.assertIsNone(second['next_cursor'])
+
+
+class HabitLogBulkUpsertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        self.habits = [
+            Habit.objects.create(user=self.user, name=f'Hábito {i}', target_frequency='diário')
+            for i in range(3)
+        ]
+
+    def _post(self, entries):
+        return self.client.post('/api/tracker/habit-logs/bulk/', entries, format='json')
+
+    def test_creates_then_updates_in_place(self):
+        entries = [{'habit': h.id, 'date': self.today.isoformat(), 'completed': True} for h in self.habits]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._post(entries)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(HabitLog.objects.filter(user=self.user, completed=True).count(), 3)
+        self.assertEqual(DailySummary.objects.get(user=self.user, date=self.today).habits_completed, 3)
+
+        entries[0].update(completed=False, value=2.5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post(entries)
+        self.assertEqual(HabitLog.objects.filter(user=self.user).count(), 3)
+        log = HabitLog.objects.get(habit=self.habits[0])
+        self.assertFalse(log.completed)
+        self.assertEqual(log.value, 2.5)
+        self.assertEqual(DailySummary.objects.get(user=self.user, date=self.today).habits_completed, 2)
+
+    def test_entries_without_value_keep_the_stored_value(self):
+        HabitLog.objects.create(habit=self.habits[0], user=self.user, date=self.today, completed=True, value=42)
+
+        response = self._post([
+            {'habit': self.habits[0].id, 'date': self.today.isoformat(), 'completed': False},
+            {'habit': self.habits[1].id, 'date': self.today.isoformat(), 'value': None},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['value'], 42)
+        log = HabitLog.objects.get(habit=self.habits[0])
+        self.assertFalse(log.completed)
+        self.assertEqual(log.value, 42)
+        self.assertIsNone(HabitLog.objects.get(habit=self.habits[1]).value)
+
+    def test_rejects_oversized_payload_before_validating(self):
+        entries = [{'habit': self.habits[0].id, 'date': 'não é data'}] * 501
+        response = self._post(entries)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Máximo de 500', response.data['error'])
+
+    def test_rejects_habits_from_other_users(self):
+        other = User.objects.create_user(username='outro', password='senha-forte-123')
+        foreign = Habit.objects.create(user=other, name='Alheio', target_frequency='diário')
+        response = self._post([{'habit': foreign.id, 'date': self.today.isoformat()}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(HabitLog.objects.exists())
+
+
+class QueryPlanTests(TestCase):
+    """
+    Garante que as queries quentes de tracker/views.py usam os índices compostos
+    (user + data) em vez de varrer a tabela. Roda em PostgreSQL e SQLite.
+    """
+    USERS = 5
+    DAYS = 365
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import BodyMeasurement, PersonalRecord
+
+        cls.today = timezone.localdate()
+        now = timezone.now()
+        users = [
+            User.objects.create_user(username=f'atleta{i}', password='senha-forte-123')
+            for i in range(cls.USERS)
+        ]
+        cls.user = users[0]
+
+        logs, workouts, entries, measurements, prs = [], [], [], [], []
+        for user in users:
+            habits = [
+                Habit.objects.create(user=user, name=f'Hábito {i}', target_frequency='diário')
+                for i in range(3)
+            ]
+            for day in range(cls.DAYS):
+                date = cls.today - timedelta(days=day)
+                logs.extend(
+                    HabitLog(habit=habit, user=user, date=date, completed=day % 4 != 0)
+                    for habit in habits
+                )
+                workouts.append(Workout(user=user, date_time=now - timedelta(days=day)))
+                entries.append(JournalEntry(user=user, content='...', mood_rating=3))
+                if day % 7 == 0:
+                    measurements.append(BodyMeasurement(user=user, date=date, weight_kg=80))
+                    prs.append(PersonalRecord(user=user, exercise_name=f'Exercício {day % 5}', weight_kg=100, date=date))
+
+        HabitLog.objects.bulk_create(logs)
+        Workout.objects.bulk_create(workouts)
+        JournalEntry.objects.bulk_create(entries)
+        BodyMeasurement.objects.bulk_create(measurements)
+        PersonalRecord.objects.bulk_create(prs)
+        rebuild_daily_summaries([user.id for user in users])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def hot_queries(self):
+        from .models import BodyMeasurement, PersonalRecord
+
+        user = self.user
+        week_start = self.today - timedelta(days=6)
+        start = timezone.now() - timedelta(days=30)
+        end = timezone.now()
+        return {
+            'habitlog_user_date_idx': HabitLog.objects.filter(
+                user=user, date__gte=week_start, date__lte=self.today, completed=True
+            ),
+            'workout_user_date_time_idx': Workout.objects.filter(
+                user=user, date_time__gte=start, date_time__lt=end
+            ),
+            'journal_user_date_idx': JournalEntry.objects.filter(
+                user=user, date__gte=start, date__lt=end
+            ),
+            'measurement_user_date_idx': BodyMeasurement.objects.filter(user=user).order_by('-date')[:12],
+            'pr_user_exercise_idx': PersonalRecord.objects.filter(user=user).values(
+                'exercise_name'
+            ).annotate(best=Max('weight_kg')).order_by('exercise_name'),
+            'pr_user_date_idx': PersonalRecord.objects.filter(user=user, date__gte=week_start),
+            'tracker_dailysummary_user_id_date': DailySummary.objects.filter(
+                user=user, date__gte=week_start, date__lte=self.today
+            ),
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for index_name, queryset in self.hot_queries().items():
+            with self.subTest(index=index_name):
+                plan = queryset.explain()
+                if connection.vendor == 'postgresql':
+                    self.assertNotIn('Seq Scan', plan)
+                else:
+                    self.assertNotIn('SCAN tracker_', plan)
+                self.assertIn(index_name, plan)
+
+
+class UserTimezoneTests(TestCase):
+    def setUp(self):
+        from users.models import UserProfile
+
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        UserProfile.objects.create(user=self.user, timezone='America/Sao_Paulo')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_workout_is_bucketed_in_user_timezone(self):
+        from datetime import date, datetime, timezone as dt_timezone
+
+        # 01:00 UTC do dia 10 ainda é dia 9 em São Paulo (UTC-3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Workout.objects.create(user=self.user, date_time=datetime(2025, 3, 10, 1, 0, tzinfo=dt_timezone.utc))
+
+        self.assertEqual(DailySummary.objects.get(user=self.user).date, date(2025, 3, 9))
+        self.assertEqual(len(self.client.get('/api/tracker/workouts/?date=2025-03-09').data['results']), 1)
+        self.assertEqual(len(self.client.get('/api/tracker/workouts/?date=2025-03-10').data['results']), 0)
+
+
+class WorkoutSetTests(TestCase):
+    def setUp(self):
+        from .models import Exercise
+
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Exercício global criado pela migration 0009
+        self.squat = Exercise.objects.get(name='Agachamento Livre (Squat)', user=None)
+
+    def _post_workout(self, exercises, **extra):
+        import json
+
+        return self.client.post('/api/tracker/workouts/', {
+            'title': 'Treino de Pernas',
+            'date_time': timezone.now().isoformat(),
+            'exercises_data': json.dumps(exercises),
+            **extra,
+        }, format='json')
+
+    def test_expand_sets_parses_free_text(self):
+        from .parsing import expand_sets
+
+        sets = expand_sets({'sets': '3', 'reps': '10/8/6', 'weight': '82,5kg'})
+        self.assertEqual([s['reps'] for s in sets], [10, 8, 6])
+        self.assertEqual({s['weight_kg'] for s in sets}, {82.5})
+
+        cardio = expand_sets({'time': '1:30', 'distance': '400m'})
+        self.assertEqual(cardio[0]['duration_seconds'], 90)
+        self.assertAlmostEqual(cardio[0]['distance_km'], 0.4)
+
+    def test_compound_durations(self):
+        from .parsing import parse_duration_seconds
+
+        self.assertEqual(parse_duration_seconds('1h30'), 5400)
+        self.assertEqual(parse_duration_seconds('1h30min'), 5400)
+        self.assertEqual(parse_duration_seconds('2min 15s'), 135)
+        self.assertEqual(parse_duration_seconds('30'), 1800)
+        self.assertIsNone(parse_duration_seconds('30min 1h'))
+
+    def test_serializer_dual_writes_sets(self):
+        from .models import WorkoutSet
+
+        response = self._post_workout([
+            {'exercise_name': 'Agachamento Livre (Squat)', 'sets': '3', 'reps': '10', 'weight': '100'},
+            {'exercise_name': 'Corrida', 'time': '30', 'distance': '5km'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        sets = WorkoutSet.objects.filter(workout_id=response.data['id'])
+        self.assertEqual(sets.count(), 4)
+        self.assertEqual(sets.filter(exercise=self.squat).count(), 3)
+
+        # Atualizar o JSON regrava as séries
+        self.client.patch(f"/api/tracker/workouts/{response.data['id']}/", {
+            'exercises_data': '[{"exercise_name": "Corrida", "time": "20"}]',
+        }, format='json')
+        self.assertEqual(sets.count(), 1)
+
+    def test_exercise_history_aggregates_in_sql(self):
+        self._post_workout([{'exercise_name': 'Agachamento Livre (Squat)', 'sets': '3', 'reps': '10', 'weight': '100'}])
+        self._post_workout([{'exercise_name': 'Agachamento Livre (Squat)', 'sets': '2', 'reps': '5', 'weight': '120'}])
+
+        data = self.client.get(f'/api/tracker/exercise-history/?exercise={self.squat.id}').data
+        self.assertEqual(len(data['sessions']), 2)
+        self.assertEqual(data['totals']['sets'], 5)
+        self.assertEqual(data['totals']['max_weight_kg'], 120)
+        self.assertEqual(data['totals']['volume_kg'], 3 * 10 * 100 + 2 * 5 * 120)
+
+        by_group = self.client.get('/api/tracker/exercise-history/?muscle_group=Pernas').data
+        self.assertEqual(by_group['totals']['sets'], 5)
+
+
+class PRHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _pr(self, exercise, weight, reps, days_ago):
+        from .models import PersonalRecord
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return PersonalRecord.objects.create(
+                user=self.user, exercise_name=exercise, weight_kg=weight, reps=reps,
+                date=timezone.localdate() - timedelta(days=days_ago),
+            )
+
+    def test_best_and_latest_come_from_the_right_rows(self):
+        best = self._pr('Supino Reto (Barra)', 100, 3, days_ago=30)
+        latest = self._pr('Supino Reto (Barra)', 90, 5, days_ago=1)
+        self._pr('Supino Reto (Barra)', 95, 1, days_ago=10)
+
+        [row] = self.client.get('/api/tracker/pr-history/').data
+        self.assertEqual(row['best_weight_kg'], 100)
+        self.assertEqual(row['best_reps'], best.reps)
+        self.assertEqual(row['best_date'], best.date.isoformat())
+        self.assertEqual(row['latest_weight_kg'], 90)
+        self.assertEqual(row['latest_reps'], latest.reps)
+        self.assertEqual(row['record_count'], 3)
+
+    def test_query_count_is_constant(self):
+        self._pr('Exercício 0', 50, 5, days_ago=0)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/tracker/pr-history/')
+
+        for i in range(1, 30):
+            self._pr(f'Exercício {i}', 50 + i, 5, days_ago=i)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/tracker/pr-history/')
+
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+
+class PersonalRecordDetectionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+
+    def _workout(self, weight, reps=5, days_ago=0):
+        import json
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return Workout.objects.create(
+                user=self.user,
+                date_time=timezone.now() - timedelta(days=days_ago),
+                exercises_data=json.dumps([
+                    {'exercise_name': 'Supino Reto (Barra)', 'sets': '3', 'reps': str(reps), 'weight': str(weight)},
+                ]),
+            )
+
+    def _records(self):
+        from .models import PersonalRecord
+
+        return list(PersonalRecord.objects.filter(user=self.user).order_by('date', 'id').values_list('weight_kg', 'reps'))
+
+    def test_detects_only_improvements(self):
+        self._workout(80, days_ago=3)
+        self._workout(75, days_ago=2)
+        self._workout(85, days_ago=1)
+        self._workout(60, reps=1, days_ago=0)
+        # 60kg x1 não supera nem o 1RM estimado (99.2) nem os 85kg já feitos com 5 reps
+        self.assertEqual(self._records(), [(80, 5), (85, 5)])
+
+    def test_new_rep_count_needs_to_beat_heavier_sets(self):
+        self._workout(100, reps=1, days_ago=3)
+        self._workout(50, reps=10, days_ago=2)  # 1RM estimado 66.7: não é recorde
+        self._workout(85, reps=5, days_ago=1)   # 1RM estimado 99.2: não é recorde
+        self.assertEqual(self._records(), [(100, 1)])
+
+        self._workout(87.5, reps=5, days_ago=0)  # 1RM estimado 102.1
+        self.assertEqual(self._records(), [(100, 1), (87.5, 5)])
+
+    def test_heavier_load_at_same_or_more_reps_is_a_record(self):
+        self._workout(85, reps=5, days_ago=1)
+        self._workout(90, reps=3, days_ago=0)  # 1RM estimado 99.0 < 99.2, mas 90 > 85 com 3+ reps
+        self.assertEqual(self._records(), [(85, 5), (90, 3)])
+
+    def test_update_recomputes_records_of_that_workout(self):
+        import json
+
+        workout = self._workout(100)
+        self.assertEqual(self._records(), [(100, 5)])
+
+        workout.exercises_data = json.dumps([{'exercise_name': 'Supino Reto (Barra)', 'reps': '5', 'weight': '110'}])
+        with self.captureOnCommitCallbacks(execute=True):
+            workout.save()
+        self.assertEqual(self._records(), [(110, 5)])
+
+    def test_backfill_matches_incremental_detection(self):
+        from .services import backfill_personal_records
+
+        for days_ago, weight in [(5, 80), (4, 90), (3, 85), (2, 95)]:
+            self._workout(weight, days_ago=days_ago)
+        incremental = self._records()
+
+        self.assertEqual(backfill_personal_records([self.user.id], batch_size=2), 3)
+        self.assertEqual(self._records(), incremental)
+
+
+class TrainingVolumeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_weekly_volume_per_muscle_group(self):
+        import json
+
+        for days_ago in (0, 7):
+            self.client.post('/api/tracker/workouts/', {
+                'date_time': (timezone.now() - timedelta(days=days_ago)).isoformat(),
+                'exercises_data': json.dumps([
+                    {'exercise_name': 'Leg Press 45', 'sets': '3', 'reps': '10', 'weight': '200'},
+                    {'exercise_name': 'Supino Reto (Barra)', 'sets': '2', 'reps': '5', 'weight': '80'},
+                    {'exercise_name': 'Exercício Inventado', 'sets': '1', 'reps': '10', 'weight': '10'},
+                ]),
+            }, format='json')
+
+        data = self.client.get('/api/tracker/training-volume/').data
+        self.assertEqual(data['totals']['Pernas'], {'tonnage_kg': 12000.0, 'sets': 6, 'reps': 60})
+        self.assertEqual(data['totals']['Peito']['sets'], 4)
+        self.assertEqual(data['totals']['Outros']['tonnage_kg'], 200.0)
+        self.assertEqual(sum(data['muscle_groups']['Pernas']['sets']), 6)
+        self.assertEqual(len(data['weeks']), len(data['muscle_groups']['Pernas']['sets']))
+
+@benchmark
+class TrainingVolumeBenchmarkTests(TestCase):
+    """5 anos de treinos diários com 25 séries cada, agregados pela view"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.exercises = list(Exercise.objects.filter(user__isnull=True).order_by('id')[:6])
+
+    def _seed(self, days, sets_per_day):
+        from .models import WorkoutSet
+
+        first = timezone.now() - timedelta(days=days)
+        workouts = Workout.objects.bulk_create([
+            Workout(user=self.user, date_time=first + timedelta(days=day), exercises_data='[]')
+            for day in range(days)
+        ])
+        WorkoutSet.objects.bulk_create([
+            WorkoutSet(
+                workout=workout, user=self.user, exercise=self.exercises[i % len(self.exercises)],
+                exercise_name=self.exercises[i % len(self.exercises)].name,
+                set_index=i + 1, reps=8 + i % 5, weight_kg=20 + i,
+            )
+            for workout in workouts
+            for i in range(sets_per_day)
+        ], batch_size=2000)
+
+    # Segundos para agregar ~45 mil séries pela view (cache frio), com folga para CI lento
+    BUDGET_SECONDS = 3.0
+
+    def _get(self):
+        from . import exercise_library
+
+        # Frio: sem cache das respostas e sem a versão da biblioteca já lida pelo processo
+        cache.clear()
+        exercise_library.forget_version()
+        start = (timezone.localdate() - timedelta(days=5 * 365)).isoformat()
+        with CaptureQueriesContext(connection) as queries:
+            began = time.perf_counter()
+            response = self.client.get(f'/api/tracker/training-volume/?from={start}')
+            elapsed = time.perf_counter() - began
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries), elapsed
+
+    def test_query_count_does_not_grow_with_history(self):
+        self._seed(days=7, sets_per_day=1)
+        _, small, _ = self._get()
+
+        self._seed(days=5 * 365, sets_per_day=25)
+        data, large, elapsed = self._get()
+
+        self.assertEqual(large, small)
+        self.assertEqual(sum(total['sets'] for total in data['totals'].values()), 7 + 5 * 365 * 25)
+        self.assertLess(elapsed, self.BUDGET_SECONDS)
+
+
+class BodyMetricsTests(TestCase):
+    def setUp(self):
+        from datetime import date
+
+        from users.models import UserProfile
+
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        UserProfile.objects.create(user=self.user, height_cm=180, birth_date=date(1990, 1, 1), gender='M')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_series_matches_model_methods_with_constant_queries(self):
+        from .models import BodyMeasurement
+
+        today = timezone.localdate()
+        for i in range(30):
+            BodyMeasurement.objects.create(
+                user=self.user, date=today - timedelta(days=7 * (29 - i)),
+                weight_kg=90 - i * 0.5, muscle_mass_kg=40 if i % 2 else None, fat_mass_percentage=20 - i * 0.1,
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/tracker/body-metrics/?limit=30').data
+        # versões, fuso e geração (ETag/cache) + medições + perfil, independente do número de medições
+        self.assertEqual(len(queries), 5)
+
+        self.assertEqual(len(data['measurements']), 30)
+        latest = BodyMeasurement.objects.filter(user=self.user).first()
+        self.assertEqual(data['latest']['bmi'], latest.calculate_bmi())
+        self.assertEqual(data['latest']['bmr'], latest.calculate_bmr())
+        self.assertEqual(data['latest']['muscle_mass_percentage'], round(40 / latest.weight_kg * 100, 1))
+        self.assertIsNone(data['measurements'][0]['muscle_mass_percentage'])
+        self.assertEqual(data['trends']['weight_change_kg'], -14.5)
+        self.assertEqual(data['trends']['fat_change_percent'], -2.9)
+        self.assertEqual(data['trends']['weight_rate_kg_per_week'], -0.5)
+
+    def test_missing_profile_data_returns_none(self):
+        self.user.profile.birth_date = None
+        self.user.profile.save()
+
+        response = self.client.post('/api/tracker/body-metrics/', {'weight_kg': '81'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['bmi'], 25.0)
+        self.assertIsNone(response.data['bmr'])
+
+
+class ProgressComparisonTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        DailySummary.objects.bulk_create([
+            DailySummary(user=self.user, date=self.today - timedelta(days=i), habits_completed=2,
+                         workouts=i % 2, journal_entries=1, journal_mood=4 if i % 3 else 2)
+            for i in range(400)
+        ])
+
+    def test_series_buckets_share_one_query(self):
+        url = '/api/tracker/progress-comparison/?period=month&granularity=week&buckets='
+        with CaptureQueriesContext(connection) as two:
+            self.client.get(url + '2')
+        with CaptureQueriesContext(connection) as many:
+            data = self.client.get(url + '52').data
+        self.assertEqual(len(two), len(many))
+
+        series = data['series']
+        self.assertEqual(len(series), 52)
+        self.assertEqual(series[-1]['end'], self.today.isoformat())
+        self.assertEqual(series[-1]['habits_completed'], 2 * (self.today.weekday() + 1))
+        self.assertEqual(series[0]['journal_entries'], 7)
+        self.assertEqual(series[0]['habits_completed'], 14)
+
+    def test_period_comparison_keeps_response_shape(self):
+        data = self.client.get('/api/tracker/progress-comparison/?period=custom&days=6').data
+        self.assertEqual(data['current_period']['habits_completed'], 14)
+        self.assertEqual(data['current_period']['journal_entries'], 7)
+        # dias 0..6: humor 2 nos dias 0, 3 e 6
+        self.assertEqual(data['current_period']['average_mood'], round((4 * 4 + 2 * 3) / 7, 2))
+        self.assertEqual(data['comparison']['habits_trend'], 'up')
+        self.assertEqual(len(data['series']), 2)
+        self.assertEqual(self.client.get('/api/tracker/progress-comparison/?granularity=year').status_code, 400)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        # Dois treinos por dia: o id desempata registros com a mesma data
+        Workout.objects.bulk_create([
+            Workout(user=self.user, date_time=now - timedelta(days=i // 2), exercises_data='[]')
+            for i in range(120)
+        ])
+
+    def _walk(self, url):
+        pages, ids = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url).data
+            pages.append(len(queries))
+            ids += [item['id'] for item in data['results']]
+            url = data['next']
+        return pages, ids
+
+    def test_pages_cover_every_row_newest_first(self):
+        pages, ids = self._walk('/api/tracker/workouts/')
+        self.assertEqual(len(pages), 3)  # page_size padrão: 50
+        self.assertEqual(len(ids), 120)
+        self.assertEqual(len(set(ids)), 120)
+        dates = list(Workout.objects.filter(id__in=ids[:3]).order_by('-date_time', '-id').values_list('id', flat=True))
+        self.assertEqual(ids[:3], dates)
+        # páginas profundas fazem as mesmas queries que a primeira (sem OFFSET/COUNT)
+        self.assertEqual(len(set(pages)), 1)
+
+    def test_page_size_is_capped(self):
+        Workout.objects.bulk_create([
+            Workout(user=self.user, date_time=timezone.now(), exercises_data='[]') for _ in range(100)
+        ])
+        self.assertEqual(len(self.client.get('/api/tracker/workouts/?page_size=10').data['results']), 10)
+        self.assertEqual(len(self.client.get('/api/tracker/workouts/?page_size=5000').data['results']), 200)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_list_returns_304_without_querying_data(self):
+        self.client.post('/api/tracker/habits/', {'name': 'Meditar', 'target_frequency': 'diário'}, format='json')
+        first = self.client.get('/api/tracker/habits/')
+        etag = first['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tracker/habits/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # só a leitura das versões; nenhuma query em tracker_habit
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('tracker_habit"', queries[0]['sql'])
+
+    def test_writes_change_etag(self):
+        habit = self.client.post('/api/tracker/habits/', {'name': 'Meditar', 'target_frequency': 'diário'}, format='json').data
+        habits_etag = self.client.get('/api/tracker/habits/')['ETag']
+        stats_etag = self.client.get('/api/tracker/habit-stats/')['ETag']
+
+        self.client.post('/api/tracker/habit-logs/bulk/', [
+            {'habit': habit['id'], 'date': timezone.localdate().isoformat()}
+        ], format='json')
+
+        # o log muda as estatísticas, mas não a lista de hábitos
+        self.assertEqual(self.client.get('/api/tracker/habits/', HTTP_IF_NONE_MATCH=habits_etag).status_code, 304)
+        response = self.client.get('/api/tracker/habit-stats/', HTTP_IF_NONE_MATCH=stats_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], stats_etag)
+
+        self.client.delete(f"/api/tracker/habits/{habit['id']}/")
+        self.assertEqual(self.client.get('/api/tracker/habits/', HTTP_IF_NONE_MATCH=habits_etag).status_code, 200)
+
+    def test_habit_stats_etag_follows_workouts(self):
+        stats_etag = self.client.get('/api/tracker/habit-stats/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/tracker/workouts/', {
+                'date_time': timezone.now().isoformat(), 'exercises_data': '[]',
+            }, format='json')
+
+        response = self.client.get('/api/tracker/habit-stats/', HTTP_IF_NONE_MATCH=stats_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['workout_count'], 1)
+
+    def test_global_exercise_changes_reach_muscle_group_views(self):
+        urls = ['/api/tracker/training-volume/', '/api/tracker/exercise-history/?muscle_group=Peito']
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+
+        exercise = Exercise.objects.filter(user__isnull=True).first()
+        exercise.muscle_group = 'Costas'
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise.save()
+
+        for url in urls:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, 200)
+
+
+class StatsCacheTests(TestCase):
+    def setUp(self):
+        from .stats_cache import reset_cache_counters
+
+        cache.clear()
+        reset_cache_counters()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.habit = Habit.objects.create(user=self.user, name='Meditar', target_frequency='diário')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_hit_skips_recompute_and_writes_invalidate(self):
+        from .stats_cache import cache_counters
+
+        self.assertEqual(self.client.get('/api/tracker/habit-stats/').data['completed_today'], 0)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/tracker/habit-stats/')
+        # hit: só o fuso do usuário (dia de hoje faz parte da chave), as versões do ETag e a geração
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(cache_counters()['habit_stats'], {'hits': 1, 'misses': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            HabitLog.objects.create(habit=self.habit, user=self.user, date=timezone.localdate(), completed=True)
+        self.assertEqual(self.client.get('/api/tracker/habit-stats/').data['completed_today'], 1)
+        self.assertEqual(cache_counters()['habit_stats']['misses'], 2)
+
+    def test_generation_lives_in_the_database(self):
+        from .models import DataVersion
+
+        self.client.get('/api/tracker/habit-stats/')
+        with self.captureOnCommitCallbacks(execute=True):
+            HabitLog.objects.create(habit=self.habit, user=self.user, date=timezone.localdate(), completed=True)
+        # Outro worker lê a mesma geração do banco, mesmo com um cache só dele
+        self.assertEqual(DataVersion.objects.get(user=self.user, resource='stats:habit_stats').version, 1)
+
+    def test_tests_use_an_in_memory_cache(self):
+        from django.conf import settings
+
+        # core.test_runner: nada dos testes vai para o diretório de cache compartilhado
+        self.assertEqual(settings.CACHES['default']['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_counters_are_logged_periodically(self):
+        from unittest import mock
+
+        with mock.patch('tracker.stats_cache.COUNTERS_LOG_EVERY', 2), self.assertLogs('tracker.stats_cache', 'INFO') as logs:
+            self.client.get('/api/tracker/habit-stats/')
+            self.client.get('/api/tracker/habit-stats/')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("'habit_stats': {'hits': 1, 'misses': 1}", logs.output[0])
+
+    def test_invalidation_is_per_dependency_and_per_user(self):
+        from .stats_cache import cache_counters
+
+        other = User.objects.create_user(username='outro', password='senha-forte-123')
+        self.client.get('/api/tracker/workout-stats/weekly/')
+        self.client.get('/api/tracker/pr-history/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Workout.objects.create(user=other, date_time=timezone.now(), exercises_data='[]')
+            Workout.objects.create(user=self.user, date_time=timezone.now(), exercises_data='[]')
+
+        self.assertEqual(self.client.get('/api/tracker/workout-stats/weekly/').data['count'], 1)
+        self.client.get('/api/tracker/pr-history/')
+        counters = cache_counters()
+        self.assertEqual(counters['weekly_workouts'], {'hits': 0, 'misses': 2})
+        # treino sem séries não gera PR: o histórico de PRs continua em cache
+        self.assertEqual(counters['pr_history'], {'hits': 1, 'misses': 1})
+
+
+class ListQueryCountTests(TestCase):
+    """As listagens fazem o mesmo número de queries com 1, 100 ou 1000 registros"""
+
+    ENDPOINTS = [
+        '/api/tracker/habits/?page_size=200',
+        '/api/tracker/habit-logs/?page_size=200',
+        '/api/tracker/daily-habits/',
+        '/api/tracker/workouts/?page_size=200',
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def _grow_to(self, rows):
+        existing = Habit.objects.filter(user=self.user).count()
+        habits = Habit.objects.bulk_create([
+            Habit(user=self.user, name=f'Hábito {i}', target_frequency='diário') for i in range(existing, rows)
+        ])
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=habit, user=self.user, date=self.today, completed=True) for habit in habits
+        ])
+        Workout.objects.bulk_create([
+            Workout(user=self.user, date_time=timezone.now(), exercises_data='[]') for _ in habits
+        ])
+
+    def _query_counts(self):
+        counts = {}
+        for url in self.ENDPOINTS:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts[url] = len(queries)
+        return counts
+
+    def test_constant_query_count(self):
+        self._grow_to(1)
+        one = self._query_counts()
+        self._grow_to(100)
+        hundred = self._query_counts()
+        self._grow_to(1000)
+        thousand = self._query_counts()
+
+        self.assertEqual(one, hundred)
+        self.assertEqual(one, thousand)
+
+    def test_habit_name_comes_from_the_join(self):
+        self._grow_to(3)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/tracker/daily-habits/').data
+        self.assertEqual({log['habit_name'] for log in data}, {'Hábito 0', 'Hábito 1', 'Hábito 2'})
+        self.assertTrue(any('INNER JOIN "tracker_habit"' in query['sql'] for query in queries))
+
+
+class HabitLogListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        self.habit = Habit.objects.create(user=self.user, name='Ler', target_frequency='diário')
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, user=self.user, date=self.today - timedelta(days=d), completed=True)
+            for d in range(3)
+        ])
+
+    def test_lists_every_day_paginated_and_filters_by_date(self):
+        data = self.client.get('/api/tracker/habit-logs/?page_size=2').data
+        self.assertEqual([log['date'] for log in data['results']], [
+            self.today.isoformat(), (self.today - timedelta(days=1)).isoformat(),
+        ])
+        self.assertIsNotNone(data['next'])
+
+        yesterday = (self.today - timedelta(days=1)).isoformat()
+        data = self.client.get(f'/api/tracker/habit-logs/?date={yesterday}').data
+        self.assertEqual([log['date'] for log in data['results']], [yesterday])
+
+        self.assertEqual(self.client.get('/api/tracker/habit-logs/?date=2024-02-30').status_code, 400)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Workout.objects.create(user=self.user, date_time=timezone.now(), title='Treino A', exercises_data='[{"exercise_name": "Remada"}]')
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        select = next(query['sql'] for query in queries if 'FROM "tracker_workout"' in query['sql'])
+        return response.data['results'][0], select
+
+    def test_fields_limits_response_and_select(self):
+        workout, select = self._get('/api/tracker/workouts/?fields=id,title,date_time')
+        self.assertEqual(set(workout), {'id', 'title', 'date_time'})
+        self.assertNotIn('exercises_data', select)
+        self.assertNotIn('comments', select)
+
+    def test_omit_drops_large_columns(self):
+        workout, select = self._get('/api/tracker/workouts/?omit=exercises_data,unknown')
+        self.assertNotIn('exercises_data', workout)
+        self.assertIn('title', workout)
+        self.assertNotIn('exercises_data', select)
+
+    def test_writes_return_full_representation(self):
+        response = self.client.post('/api/tracker/workouts/?fields=id', {
+            'date_time': timezone.now().isoformat(), 'title': 'Treino B', 'exercises_data': '[]',
+        }, format='json')
+        self.assertIn('exercises_data', response.data)
+
+
+class HabitHeatmapTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+        self.read = Habit.objects.create(user=self.user, name='Ler', target_frequency='diário')
+        self.run = Habit.objects.create(user=self.user, name='Correr', target_frequency='diário')
+
+    def _log(self, habit, *days_ago, completed=True):
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=habit, user=self.user, date=self.today - timedelta(days=d), completed=completed)
+            for d in days_ago
+        ])
+        rebuild_habit_bitmaps([self.user.id])
+
+    def test_per_habit_and_combined(self):
+        self._log(self.read, 0, 1, 2, 10, 11, 12, 13)
+        self._log(self.run, 2, 3, 400)  # 400 dias atrás fica fora da janela
+        self._log(self.run, 0, completed=False)
+
+        data = self.client.get('/api/tracker/habit-heatmap/').data
+        self.assertEqual(data['days'], 365)
+        read, run = data['habits']
+        self.assertEqual(read['days'][-3:], [1, 1, 1])
+        self.assertEqual(read['completed'], 7)
+        self.assertEqual(read['current_streak'], 3)
+        self.assertEqual(read['longest_streak'], 4)
+        self.assertEqual(run['completed'], 2)
+        self.assertEqual(run['current_streak'], 0)
+
+        combined = data['combined']
+        self.assertEqual(combined['counts'][-4:], [1, 2, 1, 1])
+        self.assertEqual(combined['completed'], 8)
+        self.assertEqual(combined['current_streak'], 4)
+        self.assertEqual(combined['all_completed_days'], 1)
+
+    def test_calendar_year_across_leap_day(self):
+        from datetime import date
+
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.read, user=self.user, date=day, completed=True)
+            for day in (date(2024, 2, 29), date(2024, 12, 31), date(2025, 1, 1))
+        ])
+        rebuild_habit_bitmaps([self.user.id])
+        data = self.client.get('/api/tracker/habit-heatmap/?year=2024').data
+        self.assertEqual(data['days'], 366)
+        days = data['habits'][0]['days']
+        self.assertEqual(days[59], 1)  # 29/02
+        self.assertEqual(days[-1], 1)
+        self.assertEqual(data['habits'][0]['completed'], 2)
+
+@benchmark
+class HabitHeatmapBenchmarkTests(TestCase):
+    """20 hábitos x 5 anos de check-ins pela view do heatmap"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def _seed(self, habit_count, days):
+        import numpy as np
+
+        rng = np.random.default_rng(7)
+        habits = Habit.objects.bulk_create([
+            Habit(user=self.user, name=f'Hábito {i}', target_frequency='diário') for i in range(habit_count)
+        ])
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=habit, user=self.user, date=self.today - timedelta(days=int(day)), completed=True)
+            for habit in habits
+            # Só dias dentro da janela pedida: datas reais, inclusive 29/02
+            for day in np.flatnonzero(rng.random(days) < 0.7)
+        ], batch_size=2000)
+        rebuild_habit_bitmaps([self.user.id])
+
+    # Segundos para o heatmap de 20 hábitos x 5 anos pela view (cache frio), com folga para CI lento
+    BUDGET_SECONDS = 0.25
+
+    def _get(self, days):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            began = time.perf_counter()
+            response = self.client.get(f'/api/tracker/habit-heatmap/?days={days}')
+            elapsed = time.perf_counter() - began
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries), elapsed
+
+    def test_query_count_does_not_grow_with_habits_or_years(self):
+        self._seed(habit_count=1, days=30)
+        _, small, _ = self._get(30)
+
+        self._seed(habit_count=20, days=5 * 365)
+        data, large, elapsed = self._get(5 * 365)
+
+        self.assertEqual(large, small)
+        self.assertEqual(len(data['habits']), 21)
+        self.assertEqual(
+            sum(habit['completed'] for habit in data['habits']),
+            HabitLog.objects.filter(user=self.user, completed=True).count(),
+        )
+        self.assertLess(elapsed, self.BUDGET_SECONDS)
+
+
+class HabitBitmapStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.habit = Habit.objects.create(user=self.user, name='Beber água', target_frequency='diário')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = timezone.localdate()
+
+    def _bitmap(self, year):
+        from .models import HabitYearBitmap
+
+        row = HabitYearBitmap.objects.filter(habit=self.habit, year=year).first()
+        return (row.completed_count, int.from_bytes(bytes(row.bits), 'little')) if row else None
+
+    def test_deleting_a_habit_refreshes_each_day_once(self):
+        def delete_habit_with_logs(days):
+            habit = Habit.objects.create(user=self.user, name=f'Hábito {days}', target_frequency='diário')
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(days):
+                    HabitLog.objects.create(
+                        habit=habit, user=self.user, date=self.today - timedelta(days=i), completed=True
+                    )
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    habit.delete()
+            return len(queries)
+
+        # O delete em cascata custa o mesmo com 5 ou 40 check-ins: os recálculos são agrupados
+        self.assertEqual(delete_habit_with_logs(5), delete_habit_with_logs(40))
+        self.assertFalse(DailySummary.objects.filter(user=self.user).exists())
+
+    def test_signals_keep_bitmap_and_values_in_sync(self):
+        from datetime import date
+
+        from .models import HabitDayValue
+
+        with self.captureOnCommitCallbacks(execute=True):
+            log = HabitLog.objects.create(habit=self.habit, user=self.user, date=date(2024, 1, 3), completed=True, value=2.5)
+            HabitLog.objects.create(habit=self.habit, user=self.user, date=date(2024, 12, 31), completed=True)
+        self.assertEqual(self._bitmap(2024), (2, (1 << 2) | (1 << 365)))
+        self.assertEqual(list(HabitDayValue.objects.values_list('date', 'value')), [(date(2024, 1, 3), 2.5)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            log.completed = False
+            log.value = None
+            log.save()
+        self.assertEqual(self._bitmap(2024), (1, 1 << 365))
+        self.assertFalse(HabitDayValue.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            HabitLog.objects.all().delete()
+        self.assertIsNone(self._bitmap(2024))
+
+    def test_moving_a_log_refreshes_both_bitmaps(self):
+        from .services import refresh_habit_bitmap
+
+        other = Habit.objects.create(user=self.user, name='Ler', target_frequency='diário')
+        with self.captureOnCommitCallbacks(execute=True):
+            log = HabitLog.objects.create(habit=self.habit, user=self.user, date=self.today, completed=True, value=1)
+        bit = 1 << (self.today.timetuple().tm_yday - 1)
+        self.assertEqual(self._bitmap(self.today.year), (1, bit))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/tracker/daily-habits/{log.id}/', {'habit': other.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self._bitmap(self.today.year))
+        self.assertEqual(other.year_bitmaps.get().completed_count, 1)
+
+        # Refresh repetido (ex: dois on_commit do mesmo hábito) regrava por upsert
+        refresh_habit_bitmap(other.id, self.today.year)
+        refresh_habit_bitmap(other.id, self.today.year)
+        self.assertEqual(other.year_bitmaps.get().completed_count, 1)
+        self.assertEqual(list(other.day_values.values_list('value', flat=True)), [1])
+
+    def test_bulk_upsert_refreshes_bitmaps(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/tracker/habit-logs/bulk/', [
+                {'habit': self.habit.id, 'date': str(self.today - timedelta(days=d)), 'completed': True}
+                for d in range(3)
+            ], format='json')
+        self.assertEqual(response.status_code, 200)
+        data = self.client.get('/api/tracker/habit-stats/').data
+        self.assertEqual(data['streak'], 3)
+
+    def test_rebuild_matches_incremental_sync(self):
+        from .services import habit_year_bitmaps
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for d in (0, 1, 5, 40, 400):
+                HabitLog.objects.create(habit=self.habit, user=self.user, date=self.today - timedelta(days=d), completed=True)
+        start, end = self.today - timedelta(days=800), self.today
+        incremental = habit_year_bitmaps(self.user.id, start, end)
+
+        rebuild_habit_bitmaps([self.user.id])
+        self.assertEqual(habit_year_bitmaps(self.user.id, start, end), incremental)
+
+    def test_completion_rate_counts_bits(self):
+        from .services import habit_completion_rate
+
+        Habit.objects.create(user=self.user, name='Ler', target_frequency='diário')
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, user=self.user, date=self.today - timedelta(days=d), completed=True)
+            for d in (0, 1, 2, 10)
+        ])
+        rebuild_habit_bitmaps([self.user.id])
+
+        rate = habit_completion_rate(self.user.id, self.today - timedelta(days=6), self.today)
+        self.assertEqual((rate['habits'], rate['completed'], rate['rate']), (2, 3, round(3 / 14 * 100, 1)))
+
+
+class ExerciseLibraryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Exercise.objects.create(name='Elevação Pélvica Zeta', muscle_group='Glúteos')
+        Exercise.objects.create(user=self.user, name='Elevação Zeta Caseira')
+        other = User.objects.create_user(username='outro', password='senha-forte-123')
+        Exercise.objects.create(user=other, name='Elevação Zeta Alheia')
+
+    def test_list_merges_global_index_with_own_exercises(self):
+        self.client.get('/api/tracker/exercises/')  # aquece o índice do processo
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tracker/exercises/')
+        # versões do ETag + exercícios do usuário; os globais e a versão deles vêm da memória
+        self.assertEqual(len(queries), 2)
+        names = [exercise['name'] for exercise in response.data]
+        self.assertIn('Elevação Pélvica Zeta', names)
+        self.assertIn('Elevação Zeta Caseira', names)
+        self.assertNotIn('Elevação Zeta Alheia', names)
+        self.assertEqual(Exercise.objects.filter(Q(user=self.user) | Q(user__isnull=True)).count(), len(names))
+
+    def test_autocomplete_is_accent_insensitive_prefix_search(self):
+        data = self.client.get('/api/tracker/exercises/autocomplete/?q=ELEVACAO zeta&fields=name').data
+        self.assertEqual(data, [{'name': 'Elevação Zeta Caseira'}])
+
+        data = self.client.get('/api/tracker/exercises/autocomplete/?q=zet').data
+        self.assertEqual(
+            [exercise['name'] for exercise in data],
+            ['Elevação Pélvica Zeta', 'Elevação Zeta Caseira'],
+        )
+        self.assertEqual(self.client.get('/api/tracker/exercises/autocomplete/?q=').data, [])
+
+    def test_global_changes_bump_the_index_version(self):
+        self.assertEqual(len(self.client.get('/api/tracker/exercises/autocomplete/?q=pelvica zeta').data), 1)
+        etag = self.client.get('/api/tracker/exercises/')['ETag']
+
+        # A versão vem do banco: não muda ao limpar o cache
+        cache.clear()
+        self.assertEqual(self.client.get('/api/tracker/exercises/')['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Exercise.objects.create(name='Pélvica Zeta Unilateral')
+        self.assertEqual(len(self.client.get('/api/tracker/exercises/autocomplete/?q=pelvica zeta').data), 2)
+        etag_after_create = self.client.get('/api/tracker/exercises/')['ETag']
+        self.assertNotEqual(etag_after_create, etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Exercise.objects.filter(name='Pélvica Zeta Unilateral').delete()
+        self.assertEqual(len(self.client.get('/api/tracker/exercises/autocomplete/?q=pelvica zeta').data), 1)
+        self.assertNotEqual(self.client.get('/api/tracker/exercises/')['ETag'], etag_after_create)
+
+    def test_writes_from_other_workers_are_seen_after_the_check_interval(self):
+        from unittest import mock
+
+        etag = self.client.get('/api/tracker/exercises/')['ETag']
+        # update() não dispara signals, como uma escrita feita por outro worker
+        Exercise.objects.filter(name='Elevação Pélvica Zeta').update(
+            name='Elevação Pélvica Zeta II', updated_at=timezone.now()
+        )
+        self.assertEqual(self.client.get('/api/tracker/exercises/')['ETag'], etag)
 
-# Create your tests here.
+        with mock.patch('tracker.exercise_library.VERSION_CHECK_SECONDS', 0):
+            self.assertNotEqual(self.client.get('/api/tracker/exercises/')['ETag'], etag)
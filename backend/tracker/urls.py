@@ -10,7 +10,7 @@ router = DefaultRouter()
 
 router.register(r'habits', views.HabitViewSet, basename='habit')
 router.register(r'daily-habits', views.DailyHabitLogViewSet, basename='daily-habit')
-router.register(r'habit-logs', views.DailyHabitLogViewSet, basename='habit-log-all')
+router.register(r'habit-logs', views.HabitLogViewSet, basename='habit-log-all')
 router.register(r'workouts', views.WorkoutViewSet, basename='workout')
 router.register(r'prs', views.PRViewSet, basename='pr')              
 router.register(r'body-measurements', views.BodyMeasurementViewSet, basename='measurement')
@@ -27,6 +27,11 @@ urlpatterns = [
     path('progress-comparison/', views.ProgressComparisonView.as_view(), name='progress-comparison'),
     path('body-metrics/', views.BodyMetricsView.as_view(), name='body-metrics'),
     path('pr-history/', views.PRHistoryView.as_view(), name='pr-history'),
+    path('timeline/', views.TimelineView.as_view(), name='timeline'),
+    path('habit-logs/bulk/', views.HabitLogBulkUpsertView.as_view(), name='habit-logs-bulk'),
+    path('exercise-history/', views.ExerciseHistoryView.as_view(), name='exercise-history'),
+    path('training-volume/', views.TrainingVolumeView.as_view(), name='training-volume'),
+    path('habit-heatmap/', views.HabitHeatmapView.as_view(), name='habit-heatmap'),
 
     # Rota principal: Inclui todas as URLs registradas no DefaultRouter acima
     path('', include(router.urls)),
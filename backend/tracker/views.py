@@ -1,77 +1,165 @@
 from rest_framework import viewsets, permissions
-from django.db.models import Q, Max
+from django.db.models import Q
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from core.sparse_fields import requested_field_names
 from .models import Habit, HabitLog, Workout, PersonalRecord, BodyMeasurement, LifeAssessment, JournalEntry, WorkoutTemplate, Exercise
 from .serializers import (
-    HabitSerializer, HabitLogSerializer, WorkoutSerializer, 
+    HabitSerializer, HabitLogSerializer, HabitLogBulkEntrySerializer, WorkoutSerializer, 
     PersonalRecordSerializer, BodyMeasurementSerializer, ExerciseSerializer,
     LifeAssessmentSerializer, JournalEntrySerializer, WorkoutTemplateSerializer
 )
+from . import exercise_library
+from .conditional import ConditionalGetMixin
+from .queryset_plan import optimize_for_request, serializer_field_names
+from .stats_cache import cached_stat_response
+from .services import (
+    BUCKET_GRANULARITIES, MAX_BUCKETS, body_metrics, body_metrics_calculator, bulk_upsert_habit_logs,
+    calculate_habit_streaks, day_window, exercise_history, get_user_timezone, habit_heatmap, local_day,
+    period_buckets, personal_record_history, summary_series, summary_totals, training_volume, user_today
+)
 
-class BaseUserViewSet(viewsets.ModelViewSet):
+class BaseUserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Classe base para filtrar dados apenas do usuário logado"""
     permission_classes = [permissions.IsAuthenticated]
+    # Ordem da paginação por cursor (core.pagination.DateCursorPagination): data natural do model
+    cursor_ordering = ('-id',)
 
     def get_queryset(self):
         # Filtra pela FK (user) que está nos modelos
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        # Joins, prefetches e colunas derivados dos campos do serializer (evita N+1) e de
+        # ?fields= / ?omit=; os campos de ordenação do cursor também precisam estar carregados
+        return optimize_for_request(
+            queryset, self.request, self.get_serializer_class(),
+            extra_columns=[field.lstrip('-') for field in self.cursor_ordering],
+        )
 
+    # Toda escrita incrementa a versão do recurso (ETag dos GETs, ver tracker/conditional.py)
     def perform_create(self, serializer):
         serializer.save(user=self.request.user) # Associa o dado ao usuário logado
+        self.bump_versions()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.bump_versions()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.bump_versions()
 
 
 # 1. Habit ViewSet (Lista Mestra)
 class HabitViewSet(BaseUserViewSet):
     queryset = Habit.objects.all()
     serializer_class = HabitSerializer
+    cursor_ordering = ('created_at', 'id')
+    version_resources = ('habits',)
+    version_writes = ('habits', 'habit_logs')  # excluir o hábito apaga os logs
     
     # Aqui permitimos criar o hábito, mas não implementamos o filtro de usuário, 
     # pois a lista mestra de hábitos deve ser a mesma para todos (ou global).
     # Vamos manter o filtro padrão do BaseUserViewSet para ver apenas os próprios.
 
 # 2. HabitLog ViewSet (Check-in Diário)
-class DailyHabitLogViewSet(viewsets.ModelViewSet):
+class DailyHabitLogViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = HabitLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # só os logs de hoje
+    version_resources = ('habit_logs', 'habits', 'profile')
+    version_writes = ('habit_logs',)
+    etag_includes_today = True
 
     def get_queryset(self):
-        # Filtra logs pelo usuário logado E pela data de hoje
-        today = timezone.localdate()
-        return HabitLog.objects.filter(user=self.request.user, date=today)
+        # Filtra logs pelo usuário logado E pela data de hoje (no fuso do usuário)
+        today = user_today(get_user_timezone(self.request.user.id))
+        queryset = HabitLog.objects.filter(user=self.request.user, date=today)
+        return optimize_for_request(queryset, self.request, self.get_serializer_class())
 
     def perform_create(self, serializer):
         # Garante que o log é salvo com o usuário logado e a data de hoje
-        serializer.save(user=self.request.user, date=timezone.localdate())
+        serializer.save(user=self.request.user, date=user_today(get_user_timezone(self.request.user.id)))
+        self.bump_versions()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.bump_versions()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.bump_versions()
 
 class HabitLogViewSet(BaseUserViewSet): # Adicionei este para podermos marcar o hábito
     queryset = HabitLog.objects.all()
     serializer_class = HabitLogSerializer
+    cursor_ordering = ('-date', '-id')
+    version_resources = ('habit_logs', 'habits')
+    version_writes = ('habit_logs',)
 
     def get_queryset(self):
         queryset = super().get_queryset()
         # Filtrar por data se fornecida como query param
         date_param = self.request.query_params.get('date', None)
         if date_param:
-            queryset = queryset.filter(date=date_param)
+            try:
+                day = parse_date(date_param)
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValidationError({'date': 'Use o formato YYYY-MM-DD'})
+            queryset = queryset.filter(date=day)
         return queryset
 
+    def perform_create(self, serializer):
+        # date é somente leitura no serializer: o check-in avulso vale para hoje
+        serializer.save(user=self.request.user, date=user_today(get_user_timezone(self.request.user.id)))
+        self.bump_versions()
+
+class HabitLogBulkUpsertView(APIView):
+    """
+    POST: Salva vários check-ins de hábitos de uma vez (ex: o dia inteiro no DailyLog).
+    Aceita uma lista de {habit, date, completed, value}; cria ou atualiza cada log.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_entries = 500
+
+    def post(self, request):
+        # Rejeita listas grandes antes de validar entrada por entrada
+        if isinstance(request.data, list) and len(request.data) > self.max_entries:
+            return Response({'error': f'Máximo de {self.max_entries} registros por requisição'}, status=400)
+
+        serializer = HabitLogBulkEntrySerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        logs = bulk_upsert_habit_logs(request.user, serializer.validated_data)
+        if logs is None:
+            return Response({'error': 'Hábito inválido ou de outro usuário'}, status=400)
+
+        return Response(HabitLogSerializer(logs, many=True).data)
+
 class WorkoutViewSet(BaseUserViewSet):
     queryset = Workout.objects.all()
     serializer_class = WorkoutSerializer
+    cursor_ordering = ('-date_time', '-id')
+    version_resources = ('workouts', 'profile')  # ?date= depende do fuso
+    version_writes = ('workouts', 'records')  # excluir o treino apaga os PRs detectados nele
 
     def get_queryset(self):
         queryset = super().get_queryset()
         # Filtrar por data se fornecida como query param
         date_param = self.request.query_params.get('date', None)
         if date_param:
-            # Workout usa date_time, então filtramos pela data (ignorando hora)
+            # Workout usa date_time: filtramos pelo intervalo do dia no fuso do usuário
+            # (sem __date, para o índice (user, date_time) ser usado)
             from datetime import datetime
             try:
                 date_obj = datetime.fromisoformat(date_param).date()
-                queryset = queryset.filter(date_time__date=date_obj)
+                start, end = day_window(date_obj, date_obj, get_user_timezone(self.request.user.id))
+                queryset = queryset.filter(date_time__gte=start, date_time__lt=end)
             except ValueError:
                 pass
         return queryset
@@ -79,29 +167,39 @@ class WorkoutViewSet(BaseUserViewSet):
 class PRViewSet(BaseUserViewSet):
     queryset = PersonalRecord.objects.all()
     serializer_class = PersonalRecordSerializer
+    cursor_ordering = ('-date', '-id')
+    version_resources = ('records',)
 
 class BodyMeasurementViewSet(BaseUserViewSet):
     queryset = BodyMeasurement.objects.all()
     serializer_class = BodyMeasurementSerializer
+    cursor_ordering = ('-date', '-id')
+    version_resources = ('measurements',)
 
 class LifeAssessmentViewSet(BaseUserViewSet):
     queryset = LifeAssessment.objects.all()
     serializer_class = LifeAssessmentSerializer
+    cursor_ordering = ('-date', '-id')
+    version_resources = ('assessments',)
 
 class JournalViewSet(BaseUserViewSet):
     queryset = JournalEntry.objects.all()
     serializer_class = JournalEntrySerializer
+    cursor_ordering = ('-date', '-id')
+    version_resources = ('journal', 'profile')  # ?date= depende do fuso
+    version_writes = ('journal',)
 
     def get_queryset(self):
         queryset = super().get_queryset()
         # Filtrar por data se fornecida como query param
         date_param = self.request.query_params.get('date', None)
         if date_param:
-            # JournalEntry usa date (DateTimeField), então filtramos pela data (ignorando hora)
+            # JournalEntry usa date (DateTimeField): filtramos pelo intervalo do dia no fuso do usuário
             from datetime import datetime
             try:
                 date_obj = datetime.fromisoformat(date_param).date()
-                queryset = queryset.filter(date__date=date_obj)
+                start, end = day_window(date_obj, date_obj, get_user_timezone(self.request.user.id))
+                queryset = queryset.filter(date__gte=start, date__lt=end)
             except ValueError:
                 pass
         return queryset
@@ -109,24 +207,88 @@ class JournalViewSet(BaseUserViewSet):
 class WorkoutTemplateViewSet(BaseUserViewSet):
     queryset = WorkoutTemplate.objects.all()
     serializer_class = WorkoutTemplateSerializer
+    cursor_ordering = ('created_at', 'id')
+    version_resources = ('templates',)
 
-class ExerciseViewSet(viewsets.ModelViewSet):
+class ExerciseViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    Catálogo de exercícios: os globais vêm do índice em memória (tracker/exercise_library.py)
+    e só os do usuário são lidos do banco. GET /exercises/autocomplete/?q=sup busca por
+    prefixo sem acento.
+    """
     serializer_class = ExerciseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # catálogo usado inteiro nos formulários de treino
+    version_resources = ('exercises',)
+    AUTOCOMPLETE_LIMIT = 10
+    MAX_AUTOCOMPLETE_LIMIT = 50
 
     def get_queryset(self):
         # Retorna exercícios criados pelo usuário OU exercícios públicos (user=None)
-        return Exercise.objects.filter(Q(user=self.request.user) | Q(user__isnull=True))
+        queryset = Exercise.objects.filter(Q(user=self.request.user) | Q(user__isnull=True))
+        return optimize_for_request(queryset, self.request, self.get_serializer_class())
+
+    def get_etag_extra(self, request):
+        return [self._library_version()]
+
+    def _library_version(self):
+        # Lida uma vez por requisição: serve ao ETag e ao índice global
+        if getattr(self, '_library_version_value', None) is None:
+            self._library_version_value = exercise_library.library_version()
+        return self._library_version_value
+
+    def _indexes(self):
+        """Índice global do processo + um índice com os exercícios do usuário"""
+        own = Exercise.objects.filter(user=self.request.user).order_by()
+        own_index = exercise_library.ExerciseIndex([
+            dict(row) for row in ExerciseSerializer(own, many=True).data
+        ])
+        return [exercise_library.global_index(self._library_version()), own_index]
+
+    def _sparse(self, entries):
+        # As entradas globais são dicts completos: aplica ?fields= / ?omit= aqui
+        names = requested_field_names(self.request, serializer_field_names(ExerciseSerializer))
+        if names is None:
+            return entries
+        return [{key: value for key, value in entry.items() if key in names} for entry in entries]
+
+    def list(self, request, *args, **kwargs):
+        return Response(self._sparse(exercise_library.merged(self._indexes())))
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', self.AUTOCOMPLETE_LIMIT)), self.MAX_AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit deve ser um número inteiro'}, status=400)
+        query = request.query_params.get('q', '')
+        if not exercise_library.normalize(query) or limit < 1:
+            return Response([])
+        return Response(self._sparse(exercise_library.search(self._indexes(), query, limit)))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        self.bump_versions()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.bump_versions()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.bump_versions()
 
-class WeeklyWorkoutStats(APIView):
+class WeeklyWorkoutStats(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('workouts', 'profile')
+    etag_includes_today = True
 
     def get(self, request, *args, **kwargs):
-        # 1. Define o período da semana (Segunda a Domingo)
-        today = timezone.localdate()
+        today = self.request_today(request)
+        return cached_stat_response('weekly_workouts', request, lambda: self.compute(request, today), today=today)
+
+    def compute(self, request, today):
+        # 1. Define o período da semana (Segunda a Domingo) no fuso do usuário
         weekday = today.weekday() # 0 = Segunda, 6 = Domingo
         
         # Início da semana (data da última Segunda-feira)
@@ -134,12 +296,8 @@ class WeeklyWorkoutStats(APIView):
         # Fim da semana (data do próximo Domingo)
         end_of_week = start_of_week + timedelta(days=6) 
         
-        # 2. CONTAGEM
-        workout_count = Workout.objects.filter(
-            user=request.user,
-            date_time__date__gte=start_of_week, # Maior ou igual ao início da semana
-            date_time__date__lte=end_of_week,   # Menor ou igual ao final da semana
-        ).count()
+        # 2. CONTAGEM (lida do resumo diário)
+        workout_count = summary_totals(request.user, start_of_week, end_of_week)['workouts']
         
         # 3. TARGET (Para teste, 5. Ver seção 3 para personalização)
         weekly_target = 5 
@@ -149,95 +307,46 @@ class WeeklyWorkoutStats(APIView):
             'target': weekly_target,
         })
 
-class PRHistoryView(APIView):
+class PRHistoryView(ConditionalGetMixin, APIView):
     """
-    Retorna o melhor PR (peso máximo) para cada exercício feito pelo usuário.
+    Retorna, para cada exercício feito pelo usuário, o melhor PR (peso máximo) com as
+    reps e a data desse mesmo registro, o PR mais recente e quantos registros existem.
+    Uma única query, independente do número de exercícios.
     """
     permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('records',)
 
     def get(self, request):
-        user = request.user
-
-        # 1. Filtra os PRs do usuário e agrupa pelo nome do exercício.
-        # 2. Encontra o peso máximo (Max('weight_kg')) para cada grupo.
-        # 3. Anota esse peso máximo como 'best_weight'.
-        pr_history = PersonalRecord.objects.filter(user=user).values(
-            'exercise_name'
-        ).annotate(
-            best_weight=Max('weight_kg'),
-            # Pega o ID do registro mais recente para ter acesso à data/reps
-            # (Essa parte é mais complexa em SQL puro, mas simplificamos aqui)
-            latest_record_id=Max('id')
-        ).order_by('exercise_name')
-
-        # Agora, para pegar os detalhes da data e reps do recorde:
-        # Puxamos os objetos PersonalRecord completos baseados nos IDs
-        detailed_history = []
-        for pr_summary in pr_history:
-            # Encontra o objeto completo que tem o ID do recorde mais recente
-            latest_record = PersonalRecord.objects.get(id=pr_summary['latest_record_id'])
-
-            detailed_history.append({
-                'exercise_name': pr_summary['exercise_name'],
-                'best_weight_kg': pr_summary['best_weight'],
-                'latest_reps': latest_record.reps,
-                'latest_date': latest_record.date.strftime('%Y-%m-%d'),
-            })
-
-        return Response(detailed_history)
+        return cached_stat_response(
+            'pr_history', request, lambda: Response(personal_record_history(request.user))
+        )
 
-class HabitStatsView(APIView):
+class HabitStatsView(ConditionalGetMixin, APIView):
     """
     Retorna estatísticas reais de hábitos: completados hoje, semana, streak atual, score geral
     """
     permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('habits', 'habit_logs', 'workouts', 'profile')  # workout_count
+    etag_includes_today = True
 
     def get(self, request):
-        from datetime import date, datetime
-        from django.db.models import Count, Q
+        today = self.request_today(request)
+        return cached_stat_response('habit_stats', request, lambda: self.compute(request, today), today=today)
 
+    def compute(self, request, today):
         user = request.user
-        today = timezone.localdate()
 
         # 1. Total de hábitos ativos do usuário
         total_habits = Habit.objects.filter(user=user).count()
 
-        # 2. Hábitos completados HOJE
-        completed_today = HabitLog.objects.filter(
-            user=user,
-            date=today,
-            completed=True
-        ).count()
-
-        # 3. Ações da semana (últimos 7 dias)
+        # 2 e 3. Hábitos completados HOJE e na semana (últimos 7 dias), lidos do resumo diário
         week_start = today - timedelta(days=6)
-        completed_week = HabitLog.objects.filter(
-            user=user,
-            date__gte=week_start,
-            date__lte=today,
-            completed=True
-        ).count()
-
-        # 4. Calcular streak (dias consecutivos)
-        streak = 0
-        check_date = today
-        while True:
-            # Verifica se teve pelo menos 1 hábito completado nesse dia
-            day_completed = HabitLog.objects.filter(
-                user=user,
-                date=check_date,
-                completed=True
-            ).exists()
-
-            if day_completed:
-                streak += 1
-                check_date -= timedelta(days=1)
-            else:
-                break
+        week_totals = summary_totals(user, week_start, today)
+        completed_week = week_totals['habits_completed']
+        completed_today = summary_totals(user, today, today)['habits_completed']
 
-            # Limite de segurança (não verificar mais de 365 dias)
-            if streak > 365:
-                break
+        # 4. Calcular streak (dias consecutivos) e maior streak em uma única query
+        streak, longest_streak = calculate_habit_streaks(user, today)
 
         # 5. Score geral (0-100) baseado em múltiplos fatores
         # Fatores: taxa de conclusão de hábitos, streak, consistência semanal
@@ -248,34 +357,40 @@ class HabitStatsView(APIView):
         score = min(int(completion_rate * 0.5 + streak_bonus + week_consistency), 100)
 
         # 6. Treinos da semana
-        workout_count = Workout.objects.filter(
-            user=user,
-            date_time__date__gte=week_start,
-            date_time__date__lte=today
-        ).count()
+        workout_count = week_totals['workouts']
 
         return Response({
             'total_habits': total_habits,
             'completed_today': completed_today,
             'completed_week': completed_week,
             'streak': streak,
+            'longest_streak': longest_streak,
             'score': score,
             'workout_count': workout_count,
             'completion_rate_today': round(completion_rate, 1)
         })
 
-class ProgressComparisonView(APIView):
+class ProgressComparisonView(ConditionalGetMixin, APIView):
     """
     Compara progresso entre períodos: mês passado, últimos 3/6/12 meses, ou período customizado
+
+    Opcional: buckets=N e granularity=day|week|month retornam também uma série com os
+    últimos N períodos. Tudo sai de uma única query de agregação condicional.
     """
     permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('habits', 'habit_logs', 'workouts', 'journal', 'profile')
+    etag_includes_today = True
 
     def get(self, request):
-        from datetime import date
+        today = self.request_today(request)
+        return cached_stat_response(
+            'progress_comparison', request, lambda: self.compute(request, today), today=today
+        )
+
+    def compute(self, request, today):
         from dateutil.relativedelta import relativedelta
 
         user = request.user
-        today = timezone.localdate()
 
         # Parâmetros: period = 'month' | '3months' | '6months' | 'year' | 'custom'
         # Se custom: start_date e end_date
@@ -304,33 +419,26 @@ class ProgressComparisonView(APIView):
             previous_start = current_start - relativedelta(months=months)
             previous_end = current_start - timedelta(days=1)
 
-        # Calcular métricas para período atual
-        current_habits = HabitLog.objects.filter(
-            user=user,
-            date__gte=current_start,
-            date__lte=current_end,
-            completed=True
-        ).count()
-
-        current_workouts = Workout.objects.filter(
-            user=user,
-            date_time__date__gte=current_start,
-            date_time__date__lte=current_end
-        ).count()
+        granularity = request.GET.get('granularity', 'month')
+        if granularity not in BUCKET_GRANULARITIES:
+            return Response({'error': f'granularity deve ser um de: {", ".join(BUCKET_GRANULARITIES)}'}, status=400)
+        try:
+            bucket_count = min(max(int(request.GET.get('buckets', 0)), 0), MAX_BUCKETS)
+        except ValueError:
+            return Response({'error': 'buckets inválido'}, status=400)
 
-        # Calcular métricas para período anterior
-        previous_habits = HabitLog.objects.filter(
-            user=user,
-            date__gte=previous_start,
-            date__lte=previous_end,
-            completed=True
-        ).count()
+        # Os dois períodos comparados e a série saem da mesma query
+        series_buckets = period_buckets(today, granularity, bucket_count) if bucket_count else []
+        totals = summary_series(
+            user, [(previous_start, previous_end), (current_start, current_end)] + series_buckets
+        )
+        previous_totals, current_totals = totals[0], totals[1]
+        series = totals[2:] if series_buckets else totals[:2]
 
-        previous_workouts = Workout.objects.filter(
-            user=user,
-            date_time__date__gte=previous_start,
-            date_time__date__lte=previous_end
-        ).count()
+        current_habits = current_totals['habits_completed']
+        current_workouts = current_totals['workouts']
+        previous_habits = previous_totals['habits_completed']
+        previous_workouts = previous_totals['workouts']
 
         # Calcular variações percentuais
         habits_change = ((current_habits - previous_habits) / previous_habits * 100) if previous_habits > 0 else 0
@@ -342,28 +450,36 @@ class ProgressComparisonView(APIView):
                 'start': current_start.isoformat(),
                 'end': current_end.isoformat(),
                 'habits_completed': current_habits,
-                'workouts_completed': current_workouts
+                'workouts_completed': current_workouts,
+                'journal_entries': current_totals['journal_entries'],
+                'average_mood': current_totals['average_mood']
             },
             'previous_period': {
                 'start': previous_start.isoformat(),
                 'end': previous_end.isoformat(),
                 'habits_completed': previous_habits,
-                'workouts_completed': previous_workouts
+                'workouts_completed': previous_workouts,
+                'journal_entries': previous_totals['journal_entries'],
+                'average_mood': previous_totals['average_mood']
             },
             'comparison': {
                 'habits_change_percent': round(habits_change, 1),
                 'workouts_change_percent': round(workouts_change, 1),
                 'habits_trend': 'up' if habits_change > 0 else 'down' if habits_change < 0 else 'stable',
                 'workouts_trend': 'up' if workouts_change > 0 else 'down' if workouts_change < 0 else 'stable'
-            }
+            },
+            'granularity': granularity if series_buckets else None,
+            'series': series
         })
 
-class BodyMetricsView(APIView):
+class BodyMetricsView(ConditionalGetMixin, APIView):
     """
     GET: Retorna evolução de métricas corporais ao longo do tempo
     POST: Cria nova medição corporal
     """
     permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('measurements', 'profile')
+    etag_includes_today = True
 
     def get(self, request):
         user = request.user
@@ -371,47 +487,12 @@ class BodyMetricsView(APIView):
         # Parâmetro opcional: limit (quantas medições retornar, padrão 12)
         limit = int(request.GET.get('limit', 12))
 
-        measurements = BodyMeasurement.objects.filter(
-            user=user
-        ).order_by('-date')[:limit]
-
-        # Inverter para ordem cronológica
-        measurements = reversed(list(measurements))
-
-        data = []
-        for m in measurements:
-            muscle_mass_percentage = None
-            if m.muscle_mass_kg and m.weight_kg:
-                muscle_mass_percentage = round((m.muscle_mass_kg / m.weight_kg) * 100, 1)
-
-            data.append({
-                'date': m.date.isoformat(),
-                'weight_kg': m.weight_kg,
-                'fat_percentage': m.fat_mass_percentage,
-                'muscle_mass_kg': m.muscle_mass_kg,
-                'muscle_mass_percentage': muscle_mass_percentage,
-                'bmi': m.calculate_bmi(),
-                'bmr': m.calculate_bmr(),
-                'notes': m.notes,
-                'has_photos': bool(m.photo_front or m.photo_back)
-            })
-
-        # Calcular tendências
-        if len(data) >= 2:
-            weight_trend = data[-1]['weight_kg'] - data[0]['weight_kg']
-            fat_trend = (data[-1]['fat_percentage'] - data[0]['fat_percentage']) if data[-1]['fat_percentage'] and data[0]['fat_percentage'] else None
-        else:
-            weight_trend = 0
-            fat_trend = None
-
-        return Response({
-            'measurements': data,
-            'trends': {
-                'weight_change_kg': round(weight_trend, 1),
-                'fat_change_percent': round(fat_trend, 1) if fat_trend else None
-            },
-            'latest': data[-1] if data else None
-        })
+        # Perfil carregado uma vez; IMC/TMB/tendências calculados para a série inteira.
+        # A idade (TMB) depende do dia de hoje, que entra na chave do cache
+        today = self.request_today(request)
+        return cached_stat_response(
+            'body_metrics', request, lambda: Response(body_metrics(user, limit)), today=today
+        )
 
     def post(self, request):
         """
@@ -454,8 +535,7 @@ class BodyMetricsView(APIView):
 
         # Usar data de hoje se não fornecida
         if not date:
-            from datetime import date as date_cls
-            date = date_cls.today()
+            date = user_today(get_user_timezone(user.id))
 
         # Criar medição
         measurement = BodyMeasurement.objects.create(
@@ -466,11 +546,9 @@ class BodyMetricsView(APIView):
             fat_mass_percentage=fat_mass_percentage,
             notes=notes
         )
+        self.bump_versions()
 
-        # Calcular porcentagem de massa magra
-        muscle_mass_percentage = None
-        if measurement.muscle_mass_kg and measurement.weight_kg:
-            muscle_mass_percentage = round((measurement.muscle_mass_kg / measurement.weight_kg) * 100, 1)
+        metrics = body_metrics_calculator(user.id).series([measurement.weight_kg], [measurement.muscle_mass_kg])
 
         return Response({
             'id': measurement.id,
@@ -478,9 +556,198 @@ class BodyMetricsView(APIView):
             'weight_kg': measurement.weight_kg,
             'muscle_mass_kg': measurement.muscle_mass_kg,
             'fat_percentage': measurement.fat_mass_percentage,
-            'muscle_mass_percentage': muscle_mass_percentage,
-            'bmi': measurement.calculate_bmi(),
-            'bmr': measurement.calculate_bmr(),
+            'muscle_mass_percentage': metrics['muscle_mass_percentage'][0],
+            'bmi': metrics['bmi'][0],
+            'bmr': metrics['bmr'][0],
             'notes': measurement.notes,
             'message': 'Medição cadastrada com sucesso!'
-        }, status=201)
\ No newline at end of file
+        }, status=201)
+
+class TimelineView(ConditionalGetMixin, APIView):
+    """
+    Linha do tempo agrupada por dia: hábitos completados, treinos e diário.
+    Substitui as 3 requisições por dia do Histórico por 3 queries por página.
+
+    Parâmetros: from, to (YYYY-MM-DD), page_size (dias por página, máx. 90) e cursor
+    (dia a partir do qual continuar, retornado em next_cursor). Os dias vêm do mais
+    recente para o mais antigo e dias sem nenhum registro são omitidos.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('habits', 'habit_logs', 'workouts', 'journal', 'profile')
+    etag_includes_today = True
+    default_page_size = 30
+    max_page_size = 90
+
+    def get(self, request):
+        from datetime import date
+
+        user = request.user
+        tz = get_user_timezone(user.id)
+        today = user_today(tz)
+
+        try:
+            range_end = date.fromisoformat(request.GET['to']) if request.GET.get('to') else today
+            range_start = (
+                date.fromisoformat(request.GET['from']) if request.GET.get('from')
+                else range_end - timedelta(days=6)
+            )
+            cursor = date.fromisoformat(request.GET['cursor']) if request.GET.get('cursor') else None
+            page_size = int(request.GET.get('page_size', self.default_page_size))
+        except ValueError:
+            return Response({'error': 'Parâmetros inválidos. Use datas no formato YYYY-MM-DD'}, status=400)
+
+        if range_start > range_end:
+            return Response({'error': "'from' deve ser anterior ou igual a 'to'"}, status=400)
+
+        page_size = min(max(page_size, 1), self.max_page_size)
+
+        # Janela desta página: do cursor (ou 'to') para trás, no máximo page_size dias
+        page_end = min(cursor, range_end) if cursor else range_end
+        page_start = max(page_end - timedelta(days=page_size - 1), range_start)
+
+        days = {}
+
+        def day_entry(day):
+            return days.setdefault(day, {
+                'date': day.isoformat(),
+                'habit_logs': [],
+                'workouts': [],
+                'journal': [],
+            })
+
+        if page_start <= page_end:
+            window_start, window_end = day_window(page_start, page_end, tz)
+
+            habit_logs = HabitLog.objects.filter(
+                user=user, date__gte=page_start, date__lte=page_end, completed=True
+            ).select_related('habit').order_by('date', 'id')
+            for log, data in zip(habit_logs, HabitLogSerializer(habit_logs, many=True).data):
+                day_entry(log.date)['habit_logs'].append(data)
+
+            workouts = Workout.objects.filter(
+                user=user, date_time__gte=window_start, date_time__lt=window_end
+            ).order_by('date_time')
+            for workout, data in zip(workouts, WorkoutSerializer(workouts, many=True).data):
+                day_entry(local_day(workout.date_time, tz))['workouts'].append(data)
+
+            entries = JournalEntry.objects.filter(
+                user=user, date__gte=window_start, date__lt=window_end
+            ).order_by('date')
+            for entry, data in zip(entries, JournalEntrySerializer(entries, many=True).data):
+                day_entry(local_day(entry.date, tz))['journal'].append(data)
+
+        next_day = page_start - timedelta(days=1)
+        next_cursor = next_day.isoformat() if next_day >= range_start else None
+
+        return Response({
+            'from': range_start.isoformat(),
+            'to': range_end.isoformat(),
+            'days': [days[day] for day in sorted(days, reverse=True)],
+            'next_cursor': next_cursor,
+        })
+
+
+class ExerciseHistoryView(ConditionalGetMixin, APIView):
+    """
+    Histórico de um exercício (ou grupo muscular) por sessão de treino: séries, reps,
+    carga máxima e volume. Agregado em SQL sobre as séries normalizadas (WorkoutSet).
+
+    Parâmetros: exercise (id da biblioteca), name (nome exato) ou muscle_group; limit (padrão 20).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('workouts', 'exercises')
+
+    def get_etag_extra(self, request):
+        # muscle_group também vem dos exercícios globais
+        return [exercise_library.library_version()]
+
+    def get(self, request):
+        exercise_id = request.GET.get('exercise')
+        exercise_name = request.GET.get('name')
+        muscle_group = request.GET.get('muscle_group')
+
+        if not (exercise_id or exercise_name or muscle_group):
+            return Response({'error': "Informe 'exercise', 'name' ou 'muscle_group'"}, status=400)
+
+        try:
+            exercise_id = int(exercise_id) if exercise_id else None
+            limit = min(max(int(request.GET.get('limit', 20)), 1), 200)
+        except ValueError:
+            return Response({'error': 'Parâmetros inválidos'}, status=400)
+
+        return Response(exercise_history(
+            request.user,
+            exercise_id=exercise_id,
+            exercise_name=exercise_name,
+            muscle_group=muscle_group,
+            limit=limit,
+        ))
+
+
+class TrainingVolumeView(ConditionalGetMixin, APIView):
+    """
+    Volume de treino semanal por grupo muscular (Exercise.muscle_group):
+    tonelagem (reps × carga), séries e repetições.
+
+    Parâmetros: from, to (YYYY-MM-DD). Padrão: últimas 12 semanas.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('workouts', 'exercises', 'profile')
+    etag_includes_today = True
+
+    def get_etag_extra(self, request):
+        # muscle_group também vem dos exercícios globais
+        return [exercise_library.library_version()]
+
+    def get(self, request):
+        from datetime import date
+
+        tz = get_user_timezone(request.user.id)
+        today = user_today(tz)
+
+        try:
+            end = date.fromisoformat(request.GET['to']) if request.GET.get('to') else today
+            start = (
+                date.fromisoformat(request.GET['from']) if request.GET.get('from')
+                else end - timedelta(weeks=12)
+            )
+        except ValueError:
+            return Response({'error': 'Datas inválidas. Use o formato YYYY-MM-DD'}, status=400)
+
+        if start > end:
+            return Response({'error': "'from' deve ser anterior ou igual a 'to'"}, status=400)
+
+        return Response({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            **training_volume(request.user, start, end, tz),
+        })
+
+
+class HabitHeatmapView(ConditionalGetMixin, APIView):
+    """
+    Heatmap estilo GitHub dos hábitos: um array 0/1 por dia para cada hábito e, no
+    combinado, quantos hábitos foram completados em cada dia, com taxas e streaks.
+
+    Parâmetros: year=AAAA (ano civil) ou days=N (últimos N dias até hoje, padrão 365).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    version_resources = ('habits', 'habit_logs', 'profile')
+    etag_includes_today = True
+    max_days = 366 * 5
+
+    def get(self, request):
+        from datetime import date
+
+        today = self.request_today(request)
+        try:
+            if request.GET.get('year'):
+                year = int(request.GET['year'])
+                start, end = date(year, 1, 1), date(year, 12, 31)
+            else:
+                days = min(max(int(request.GET.get('days', 365)), 1), self.max_days)
+                start, end = today - timedelta(days=days - 1), today
+        except ValueError:
+            return Response({'error': 'Use year=AAAA ou days=N'}, status=400)
+
+        return Response(habit_heatmap(request.user, start, end, today))
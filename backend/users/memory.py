@@ -0,0 +1,128 @@
+"""
+Memória das conversas com a IA com orçamento de tokens.
+
+O prompt leva o resumo da conversa (Conversation.summary) mais os turnos recentes que
+cabem em CHAT_MEMORY_TOKENS, lidos do mais novo para trás. Depois que a resposta é
+enviada, as mensagens que ficaram fora dessa janela são incorporadas ao resumo em lotes
+(o resumo anterior + o lote viram o novo resumo) e Conversation.summarized_until avança.
+Só vale a pena chamar o modelo quando o excedente chega a meio orçamento: abaixo disso
+as mensagens esperam as próximas, em vez de um resumo extra a cada turno. O tamanho
+do prompt fica estável mesmo com milhares de mensagens: só o resumo e a janela entram.
+"""
+import math
+
+from django.conf import settings
+
+from core.ai_provider import generate_text
+
+# Aproximação usada pelo Gemini para textos em português: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+# Limite de mensagens lidas para montar a janela (o orçamento normalmente corta antes)
+MAX_WINDOW_MESSAGES = 200
+
+# Lotes incorporados ao resumo por resposta; o que sobrar entra nas próximas
+MAX_FOLDS_PER_TURN = 3
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+
+class ConversationMemory:
+    def __init__(self, conversation, speaker_name, model_name,
+                 token_budget=None, summary_tokens=None):
+        self.conversation = conversation
+        self.speaker_name = speaker_name
+        self.model_name = model_name
+        self.token_budget = token_budget or settings.CHAT_MEMORY_TOKENS
+        self.summary_tokens = summary_tokens or settings.CHAT_SUMMARY_TOKENS
+
+    def _unsummarized(self):
+        messages = self.conversation.messages.only('id', 'role', 'content')
+        if self.conversation.summarized_until_id:
+            messages = messages.filter(id__gt=self.conversation.summarized_until_id)
+        return messages
+
+    def recent_messages(self):
+        """Turnos mais recentes (em ordem cronológica) que cabem no orçamento de tokens"""
+        window, used = [], 0
+        for message in self._unsummarized().order_by('-id')[:MAX_WINDOW_MESSAGES]:
+            cost = estimate_tokens(message.content)
+            if window and used + cost > self.token_budget:
+                break
+            window.append(message)
+            used += cost
+        window.reverse()
+        return window
+
+    def format_line(self, message, max_tokens=None):
+        content = message.content
+        if max_tokens is not None and estimate_tokens(content) > max_tokens:
+            content = content[:max_tokens * CHARS_PER_TOKEN] + '…'
+        speaker = 'Usuário' if message.role == 'user' else self.speaker_name
+        return f"{speaker}: {content}"
+
+    def history_text(self):
+        """Resumo (se houver) + turnos recentes, pronto para o prompt"""
+        lines = [
+            # Uma mensagem sozinha maior que o orçamento é cortada
+            self.format_line(message, max_tokens=self.token_budget)
+            for message in self.recent_messages()
+        ]
+        history = "\n".join(lines)
+        if self.conversation.summary:
+            return f"(Resumo da conversa até aqui: {self.conversation.summary})\n\n{history}"
+        return history
+
+    def fold_overflow(self):
+        """
+        Incorpora ao resumo as mensagens antigas que não cabem mais na janela, em lotes do
+        tamanho do orçamento e no máximo MAX_FOLDS_PER_TURN lotes, enquanto o excedente
+        somar pelo menos meio orçamento. Retorna quantas mensagens foram resumidas.
+        """
+        window = self.recent_messages()
+        if not window:
+            return 0
+
+        overflow = [
+            (message, min(estimate_tokens(message.content), self.token_budget))
+            for message in self._unsummarized().filter(id__lt=window[0].id).order_by('id')[:MAX_WINDOW_MESSAGES]
+        ]
+        pending = sum(cost for _, cost in overflow)
+
+        folded = 0
+        for _ in range(MAX_FOLDS_PER_TURN):
+            if pending * 2 < self.token_budget:
+                break
+            batch, used = [], 0
+            for message, cost in overflow[folded:]:
+                if batch and used + cost > self.token_budget:
+                    break
+                batch.append(message)
+                used += cost
+
+            self.conversation.summary = self._summarize(batch)
+            self.conversation.summarized_until = batch[-1]
+            self.conversation.save(update_fields=['summary', 'summarized_until'])
+            folded += len(batch)
+            pending -= used
+        return folded
+
+    def _summarize(self, batch):
+        transcript = "\n".join(self.format_line(message, max_tokens=self.token_budget) for message in batch)
+        prompt = f"""
+Atualize o resumo de uma conversa entre um usuário e {self.speaker_name}.
+
+**RESUMO ATUAL:**
+{self.conversation.summary or '(vazio)'}
+
+**NOVAS MENSAGENS:**
+{transcript}
+
+Escreva o resumo atualizado em no máximo {self.summary_tokens * CHARS_PER_TOKEN // 6} palavras,
+mantendo fatos sobre o usuário, decisões, metas e combinados. Retorne apenas o resumo.
+"""
+        summary = generate_text(prompt, model=self.model_name).strip()
+        # Garante o limite mesmo se o modelo passar do tamanho pedido
+        return summary[:self.summary_tokens * CHARS_PER_TOKEN]
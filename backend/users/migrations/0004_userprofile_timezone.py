@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_userprofile_birth_date_userprofile_gender_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='timezone',
+            field=models.CharField(blank=True, help_text='Fuso horário IANA (ex: America/Sao_Paulo). Vazio usa o TIME_ZONE do servidor', max_length=64),
+        ),
+    ]
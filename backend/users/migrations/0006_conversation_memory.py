@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='summarized_until',
+            field=models.ForeignKey(blank=True, help_text='Última mensagem incorporada ao resumo', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='users.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary',
+            field=models.TextField(blank=True, default='', help_text='Resumo das mensagens antigas'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='message_conversation_id_idx'),
+        ),
+    ]
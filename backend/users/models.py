@@ -16,6 +16,11 @@ class UserProfile(models.Model):
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, blank=True, null=True)
     birth_date = models.DateField(blank=True, null=True, help_text="Data de nascimento")
     height_cm = models.FloatField(blank=True, null=True, help_text="Altura em centímetros")
+    timezone = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Fuso horário IANA (ex: America/Sao_Paulo). Vazio usa o TIME_ZONE do servidor"
+    )
 
     # --- PERFIS COMPORTAMENTAIS ---
     # MBTI - Myers-Briggs Type Indicator (16 personalidades)
@@ -133,6 +138,9 @@ class AIInsight(models.Model):
     class Meta:
         ordering = ['-created_at', '-priority']
         verbose_name = "Insight da IA"
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='aiinsight_user_created_idx'),
+        ]
         verbose_name_plural = "Insights da IA"
 
     def __str__(self):
@@ -153,12 +161,22 @@ class Conversation(models.Model):
     ai_type = models.CharField(max_length=20, choices=AI_TYPE_CHOICES)
     title = models.CharField(max_length=200, help_text="Título automático baseado na primeira mensagem")
 
+    # Memória da conversa (users/memory.py): turnos antigos resumidos incrementalmente
+    summary = models.TextField(blank=True, default='', help_text="Resumo das mensagens antigas")
+    summarized_until = models.ForeignKey(
+        'Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        help_text="Última mensagem incorporada ao resumo"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-updated_at']
         verbose_name = "Conversa com IA"
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='conversation_user_updated_idx'),
+        ]
         verbose_name_plural = "Conversas com IA"
 
     def __str__(self):
@@ -185,6 +203,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Janela recente da conversa: mensagens depois do resumo, das mais novas para trás
+            models.Index(fields=['conversation', 'id'], name='message_conversation_id_idx'),
+        ]
         verbose_name = "Mensagem"
         verbose_name_plural = "Mensagens"
 
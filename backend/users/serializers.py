@@ -3,6 +3,9 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import UserProfile, AIInsight, Conversation, Message
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from core.sparse_fields import SparseFieldsetMixin
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -40,7 +43,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
 
     class Meta:
@@ -48,13 +51,21 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'username', 'mbti_type', 'disc_type', 'enneagram_type',
             'enneagram_wing', 'goals', 'challenges', 'motivation_style',
-            'triggers', 'preferred_communication', 'ai_coaching_enabled',
+            'triggers', 'preferred_communication', 'ai_coaching_enabled', 'timezone',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def validate_timezone(self, value):
+        if value:
+            try:
+                ZoneInfo(value)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise serializers.ValidationError("Fuso horário inválido. Use um nome IANA, ex: America/Sao_Paulo")
+        return value
+
 
-class AIInsightSerializer(serializers.ModelSerializer):
+class AIInsightSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     insight_type_display = serializers.CharField(source='get_insight_type_display', read_only=True)
 
     class Meta:
@@ -98,7 +109,7 @@ class EmailOrUsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     role_display = serializers.CharField(source='get_role_display', read_only=True)
 
     class Meta:
@@ -107,7 +118,7 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'context_used']
 
 
-class ConversationSerializer(serializers.ModelSerializer):
+class ConversationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     ai_type_display = serializers.CharField(source='get_ai_type_display', read_only=True)
     messages = MessageSerializer(many=True, read_only=True)
     message_count = serializers.SerializerMethodField()
@@ -121,7 +132,7 @@ class ConversationSerializer(serializers.ModelSerializer):
         return obj.messages.count()
 
 
-class ConversationListSerializer(serializers.ModelSerializer):
+class ConversationListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer mais leve para listagem de conversas (sem mensagens)"""
     ai_type_display = serializers.CharField(source='get_ai_type_display', read_only=True)
     message_count = serializers.SerializerMethodField()
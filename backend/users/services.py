@@ -1,9 +1,15 @@
-import google.generativeai as genai
-from decouple import config
+import logging
 from datetime import datetime, timedelta
 from django.utils import timezone
 from .models import UserProfile, AIInsight
-from tracker.models import Habit, HabitLog, Workout, PersonalRecord, BodyMeasurement, LifeAssessment
+from django.conf import settings
+from core.ai_provider import generate_text, stream_text
+from .memory import ConversationMemory
+from tracker.models import Habit, Workout, PersonalRecord, BodyMeasurement, LifeAssessment
+from tracker.services import habit_completion_rate, profile_timezone, user_today
+from tracker.stats_cache import cached_stat
+
+logger = logging.getLogger(__name__)
 
 
 class AICoachService:
@@ -15,29 +21,33 @@ class AICoachService:
     def __init__(self, user):
         self.user = user
         self.profile = UserProfile.objects.get_or_create(user=user)[0]
+        self._context = None
 
-        # Configurar Gemini
-        api_key = config('GEMINI_API_KEY')
-        genai.configure(api_key=api_key)
-
-        # Gemini 1.5 Pro: Melhor para insights personalizados e análise profunda
+        # Gemini configurado uma vez por processo; chamadas via core/ai_provider.py
         # Custo: ~$0.01 por insight gerado
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model_name = 'gemini-2.5-flash'
 
     def get_user_context(self):
         """
-        Coleta todos os dados relevantes do usuário para análise
+        Coleta todos os dados relevantes do usuário para análise.
+
+        Memoizado na instância (vários insights e mensagens reusam o mesmo snapshot) e
+        guardado no cache por AI_CONTEXT_CACHE_TIMEOUT; qualquer escrita em hábitos,
+        treinos, roda da vida, medidas ou perfil invalida o cache (tracker/stats_cache.py).
         """
+        if self._context is None:
+            today = user_today(profile_timezone(self.profile))
+            self._context = cached_stat(
+                'ai_context', self.user.pk, lambda: self._build_user_context(today),
+                timeout=settings.AI_CONTEXT_CACHE_TIMEOUT, today=today,
+            )
+        return self._context
+
+    def _build_user_context(self, today):
+        """Snapshot do usuário em um número fixo de queries (o perfil já está carregado)"""
         # Dados dos últimos 7 dias
         week_ago = timezone.now() - timedelta(days=7)
 
-        # Hábitos
-        habits = Habit.objects.filter(user=self.user)
-        habit_logs = HabitLog.objects.filter(
-            user=self.user,
-            date__gte=week_ago.date()
-        )
-
         # Treinos
         workouts = Workout.objects.filter(
             user=self.user,
@@ -47,19 +57,20 @@ class AICoachService:
         # Última avaliação da Roda da Vida
         latest_assessment = LifeAssessment.objects.filter(
             user=self.user
-        ).first()
+        ).order_by('-date', '-id').first()
 
         # Medidas corporais
         latest_measurement = BodyMeasurement.objects.filter(
             user=self.user
-        ).first()
+        ).only('weight_kg', 'muscle_mass_kg', 'fat_mass_percentage').first()
 
-        # Calcular taxa de conclusão de hábitos
-        total_habit_days = habits.count() * 7
-        completed_habit_days = habit_logs.filter(completed=True).count()
-        completion_rate = (completed_habit_days / total_habit_days * 100) if total_habit_days > 0 else 0
+        # Taxa de conclusão de hábitos nos últimos 7 dias (contada nos bitmaps anuais)
+        habit_progress = habit_completion_rate(
+            self.user.pk, today - timedelta(days=6), today,
+            habits=Habit.objects.filter(user=self.user).count(),
+        )
 
-        context = {
+        return {
             'perfil_comportamental': {
                 'mbti': self.profile.mbti_type or 'Não informado',
                 'disc': self.profile.disc_type or 'Não informado',
@@ -72,8 +83,8 @@ class AICoachService:
             'gatilhos': self.profile.triggers or 'Não informados',
             'preferencia_comunicacao': self.profile.preferred_communication,
             'progresso_7_dias': {
-                'habitos_total': habits.count(),
-                'taxa_conclusao': round(completion_rate, 1),
+                'habitos_total': habit_progress['habits'],
+                'taxa_conclusao': habit_progress['rate'],
                 'treinos_realizados': workouts,
                 'dias_analisados': 7,
             },
@@ -81,8 +92,6 @@ class AICoachService:
             'medidas_corporais': self._format_body_measurements(latest_measurement) if latest_measurement else None,
         }
 
-        return context
-
     def _format_life_wheel(self, assessment):
         return {
             'saude': assessment.health_score,
@@ -172,8 +181,8 @@ GERE OS INSIGHTS:
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            insights_text = response.text
+            # Mesmo perfil e progresso geram o mesmo prompt: respondido pelo cache
+            insights_text = generate_text(prompt, model=self.model_name)
 
             # Parsear a resposta e criar os insights
             insights = self._parse_insights_from_response(insights_text)
@@ -341,18 +350,14 @@ class AIChatService(AICoachService):
         self.ai_type = ai_type
         self.persona = self.AI_PERSONAS.get(ai_type, self.AI_PERSONAS['mentor'])
 
-    def generate_chat_response(self, conversation, user_message):
+    def build_chat_prompt(self, conversation, user_message):
         """
-        Gera resposta da IA baseada no histórico da conversa e contexto do usuário
+        Monta o prompt da conversa (perfil, progresso e histórico). Retorna (prompt, contexto).
         """
         context = self.get_user_context()
 
-        # Construir histórico de mensagens
-        messages_history = conversation.messages.all()[:20]  # Últimas 20 mensagens
-        history_text = "\n".join([
-            f"{'Usuário' if msg.role == 'user' else self.persona['name']}: {msg.content}"
-            for msg in messages_history
-        ])
+        # Histórico: resumo das mensagens antigas + turnos recentes dentro do orçamento de tokens
+        history_text = self.memory(conversation).history_text()
 
         system_prompt = f"""
 Você é {self.persona['name']}, {self.persona['role']}.
@@ -406,9 +411,27 @@ Você é {self.persona['name']}, {self.persona['role']}.
 **SUA RESPOSTA (como {self.persona['name']}):**
 """
 
+        return system_prompt, context
+
+    def memory(self, conversation):
+        return ConversationMemory(conversation, self.persona['name'], self.model_name)
+
+    def remember(self, conversation):
+        """Depois da resposta: resume as mensagens que saíram da janela recente"""
         try:
-            response = self.model.generate_content(system_prompt)
-            ai_response = response.text.strip()
+            self.memory(conversation).fold_overflow()
+        except Exception as e:
+            # Sem resumo novo a conversa continua funcionando: tenta de novo na próxima
+            logger.warning(f"Erro ao resumir conversa {conversation.pk}: {e}", exc_info=True)
+
+    def generate_chat_response(self, conversation, user_message):
+        """
+        Gera resposta da IA baseada no histórico da conversa e contexto do usuário
+        """
+        system_prompt, context = self.build_chat_prompt(conversation, user_message)
+
+        try:
+            ai_response = generate_text(system_prompt, model=self.model_name, cache=False).strip()
 
             return ai_response, context
 
@@ -416,6 +439,10 @@ Você é {self.persona['name']}, {self.persona['role']}.
             print(f"Erro ao gerar resposta do chat: {e}")
             return f"Desculpe, tive um problema técnico. Pode tentar novamente?", None
 
+    def stream_chat_response(self, prompt):
+        """Gera a resposta em pedaços de texto, à medida que o modelo produz (stream=True)"""
+        return stream_text(prompt, model=self.model_name)
+
     def _format_additional_context(self, context):
         """Formata contexto adicional dependendo do tipo de IA"""
         additional = ""
@@ -459,8 +486,7 @@ Retorne APENAS o título, sem aspas ou formatação extra.
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            title = response.text.strip().replace('"', '').replace("'", '')[:200]
+            title = generate_text(prompt, model=self.model_name).strip().replace('"', '').replace("'", '')[:200]
             return title
         except:
             # Fallback: usar as primeiras palavras da mensagem
@@ -0,0 +1,87 @@
+"""
+Respostas do chat em Server-Sent Events.
+
+O texto do modelo é repassado em eventos `token` à medida que chega; no fim, `on_complete`
+grava a mensagem da IA e o seu retorno vai no evento `done`. Sob ASGI (core/asgi.py, como
+rodam o Dockerfile e os docker-compose: gunicorn com uvicorn_worker.UvicornWorker) o
+stream é um gerador assíncrono: a leitura bloqueante do Gemini roda em threads do pool
+e a gravação no banco usa sync_to_async, então uma resposta lenta não prende um worker.
+Sob WSGI (runserver, gunicorn com workers síncronos) o mesmo fluxo roda como gerador
+síncrono e ocupa o worker até o fim da resposta.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+ERROR_MESSAGE = "Desculpe, tive um problema técnico. Pode tentar novamente?"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Aceita Accept: text/event-stream; erros de validação viram um evento `error`"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event('error', data).encode()
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _stream(chunks, on_complete):
+    parts = []
+    try:
+        for text in chunks:
+            if text:
+                parts.append(text)
+                yield sse_event('token', {'text': text})
+    except Exception as e:
+        logger.error(f"Erro no stream do chat: {e}", exc_info=True)
+        yield sse_event('error', {'error': ERROR_MESSAGE})
+        parts = None
+    yield sse_event('done', on_complete(''.join(parts) if parts is not None else None))
+
+
+async def _astream(chunks, on_complete):
+    iterator = iter(chunks)
+    sentinel = object()
+    # thread_sensitive=False: cada leitura do modelo roda no pool, fora da thread do ORM
+    next_chunk = sync_to_async(next, thread_sensitive=False)
+
+    parts = []
+    try:
+        while (text := await next_chunk(iterator, sentinel)) is not sentinel:
+            if text:
+                parts.append(text)
+                yield sse_event('token', {'text': text})
+    except Exception as e:
+        logger.error(f"Erro no stream do chat: {e}", exc_info=True)
+        yield sse_event('error', {'error': ERROR_MESSAGE})
+        parts = None
+    result = await sync_to_async(on_complete)(''.join(parts) if parts is not None else None)
+    yield sse_event('done', result)
+
+
+def event_stream_response(request, chunks, on_complete):
+    """
+    StreamingHttpResponse em text/event-stream com os pedaços de `chunks` (iterável de
+    textos). on_complete(texto_completo ou None em caso de erro) roda ao final e retorna
+    o payload do evento `done`.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = _astream(chunks, on_complete)
+    else:
+        content = _stream(chunks, on_complete)
+
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx não deve segurar os eventos
+    return response
@@ -1,3 +1,365 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import AIInsight, Conversation
+
+
+class InsightSparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        AIInsight.objects.create(user=self.user, insight_type='advice', title='Durma mais', content='x' * 5000)
+
+    def test_omitted_columns_are_deferred(self):
+        # insight_type_display vem de um método: a seleção usa .defer() em vez de .only()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/insights/?omit=content,context_data')
+        insight = response.data['results'][0]
+        self.assertNotIn('content', insight)
+        self.assertEqual(insight['insight_type_display'], 'Conselho')
+
+        select = next(query['sql'] for query in queries if 'FROM "users_aiinsight"' in query['sql'])
+        self.assertNotIn('"content"', select)
+        self.assertNotIn('"context_data"', select)
+
+
+class AICoachContextTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+
+    def test_parsing_insights_reuses_one_snapshot(self):
+        from .services import AICoachService
+
+        coach = AICoachService(self.user)
+        response_text = '\n---\n'.join(
+            f'TIPO: advice\nTÍTULO: Dica {i}\nPRIORIDADE: 2\nCONTEÚDO: Faça {i}' for i in range(5)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            insights = coach._parse_insights_from_response(response_text)
+        self.assertEqual(len(insights), 5)
+        # snapshot (fixo) + um INSERT por insight
+        context_queries = len(queries) - 5
+        self.assertLessEqual(context_queries, 6)
+        self.assertEqual(insights[0].context_data, insights[4].context_data)
+
+    def test_snapshot_is_cached_until_tracker_data_changes(self):
+        from tracker.models import Workout
+        from .services import AICoachService
+
+        self.assertEqual(AICoachService(self.user).get_user_context()['progresso_7_dias']['treinos_realizados'], 0)
+        coach = AICoachService(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            coach.get_user_context()
+        # só a geração do snapshot (DataVersion), nenhuma query nos dados do tracker
+        self.assertEqual(len(queries), 1)
+        self.assertIn('tracker_dataversion', queries[0]['sql'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Workout.objects.create(user=self.user, date_time=timezone.now(), exercises_data='[]')
+        context = AICoachService(self.user).get_user_context()
+        self.assertEqual(context['progresso_7_dias']['treinos_realizados'], 1)
+
+
+class AIProviderTests(TestCase):
+    def test_models_are_shared_and_fake_provider_swaps_in(self):
+        from core.ai_provider import FakeProvider, get_model, use_provider
+        from .services import AICoachService
+
+        with use_provider(FakeProvider(reply='TIPO: habit\nTÍTULO: Beba água\nCONTEÚDO: 2 litros')) as fake:
+            self.assertIs(get_model('gemini-2.5-flash'), get_model('gemini-2.5-flash'))
+
+            user = User.objects.create_user(username='senshi', password='senha-forte-123')
+            cache.clear()
+            insights = AICoachService(user).generate_daily_insights()
+
+        self.assertEqual([insight.title for insight in insights], ['Beba água'])
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual(fake.calls[0][0], 'gemini-2.5-flash')
+
+    def test_child_process_rebuilds_the_provider_after_fork(self):
+        from core import ai_provider
+
+        with ai_provider.use_provider(ai_provider.FakeProvider()):
+            ai_provider._reset_after_fork()  # o que os.register_at_fork roda no filho
+            self.assertIsNone(ai_provider._provider)
+
+
+class ConversationStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.conversation = Conversation.objects.create(user=self.user, ai_type='mentor', title='Nova Conversa')
+
+    def _stream(self, message):
+        from core.ai_provider import FakeProvider, use_provider
+
+        with use_provider(FakeProvider(reply='Comece com cinco minutos')):
+            response = self.client.post(
+                f'/api/auth/conversations/{self.conversation.id}/stream_message/',
+                {'message': message}, format='json', HTTP_ACCEPT='text/event-stream',
+            )
+            body = b''.join(response.streaming_content).decode() if response.streaming else response.content.decode()
+        return response, body
+
+    def test_tokens_are_streamed_and_reply_is_saved_at_the_end(self):
+        import json
+
+        response, body = self._stream('Como começo a meditar?')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = [
+            (block.split('\n')[0].removeprefix('event: '), json.loads(block.split('\n')[1].removeprefix('data: ')))
+            for block in body.strip().split('\n\n')
+        ]
+        tokens = [data['text'] for event, data in events if event == 'token']
+        self.assertEqual(''.join(tokens), 'Comece com cinco minutos')
+        self.assertGreater(len(tokens), 1)
+
+        event, done = events[-1]
+        self.assertEqual(event, 'done')
+        self.assertEqual(done['message']['content'], 'Comece com cinco minutos')
+        self.assertEqual(
+            list(self.conversation.messages.values_list('role', 'content')),
+            [('user', 'Como começo a meditar?'), ('assistant', 'Comece com cinco minutos')],
+        )
+
+    def test_empty_message_is_an_error_event(self):
+        response, body = self._stream('  ')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(body.startswith('event: error'))
+        self.assertFalse(self.conversation.messages.exists())
+
+    async def test_asgi_stream_uses_the_async_generator(self):
+        import json
+        from unittest import mock
+
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from core.ai_provider import FakeProvider, use_provider
+
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}', 'Accept': 'text/event-stream'}
+        # O AsyncClient chama response.close() dentro do event loop (o ASGIHandler usa
+        # sync_to_async): o resumo pós-resposta fica fora deste teste
+        with use_provider(FakeProvider(reply='Respire fundo agora')), \
+                mock.patch('users.services.AIChatService.remember'):
+            response = await AsyncClient().post(
+                f'/api/auth/conversations/{self.conversation.id}/stream_message/',
+                {'message': 'Estou ansioso'}, content_type='application/json', headers=headers,
+            )
+            self.assertTrue(response.is_async)
+            chunks = [chunk.decode() async for chunk in response.streaming_content]
+
+        # Um evento por pedaço, enviado assim que o modelo produz cada um
+        self.assertEqual([chunk.split('\n')[0] for chunk in chunks], ['event: token'] * 3 + ['event: done'])
+        done = json.loads(chunks[-1].split('\n')[1].removeprefix('data: '))
+        self.assertEqual(done['message']['content'], 'Respire fundo agora')
+        contents = await sync_to_async(list)(self.conversation.messages.values_list('role', 'content'))
+        self.assertEqual(contents, [('user', 'Estou ansioso'), ('assistant', 'Respire fundo agora')])
+
+
+class AIResponseCacheTests(TestCase):
+    def test_repeated_prompts_skip_the_model(self):
+        from core.ai_provider import FakeProvider, generate_text, response_cache, use_provider
+        from .services import AIChatService
+
+        user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        with use_provider(FakeProvider(reply='Meditação diária')) as fake:
+            chat = AIChatService(user, 'mentor')
+            self.assertEqual(chat.generate_conversation_title('Como medito?'), 'Meditação diária')
+            self.assertEqual(chat.generate_conversation_title('Como medito?'), 'Meditação diária')
+            self.assertEqual(len(fake.calls), 1)
+
+            # Espaços e indentação não mudam a chave; cache=False sempre chama o modelo
+            generate_text('  prompt\n  qualquer ')
+            generate_text('prompt qualquer')
+            generate_text('prompt qualquer', cache=False)
+            self.assertEqual(len(fake.calls), 3)
+            self.assertEqual(response_cache.stats()['models']['gemini-2.5-flash'], {'hits': 2, 'misses': 2, 'evictions': 0})
+
+    def test_identical_uploads_share_an_entry(self):
+        import io
+
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        from core.ai_cache import prompt_key
+        from core.ai_provider import FakeProvider, use_provider
+        from vision_ai.services import GeminiVisionService
+
+        def upload(color):
+            data = io.BytesIO()
+            Image.new('RGB', (4, 4), color).save(data, format='PNG')
+            return SimpleUploadedFile('prato.png', data.getvalue(), content_type='image/png')
+
+        with use_provider(FakeProvider(reply='Arroz e feijão')) as fake:
+            service = GeminiVisionService()
+            service.analyze_image(upload('red'))
+            service.analyze_image(upload('red'))
+            self.assertEqual(len(fake.calls), 1)
+            service.analyze_image(upload('blue'))
+            self.assertEqual(len(fake.calls), 2)
+
+        # A imagem decodificada não entra na chave: só os bytes do arquivo (cache_key)
+        self.assertIsNone(prompt_key('m', ['x', Image.new('RGB', (4, 4), 'red')]))
+        self.assertNotEqual(prompt_key('m', ['x', b'png']), prompt_key('m', ['x', b'jpg']))
+        self.assertNotEqual(prompt_key('m', 'x'), prompt_key('outro', 'x'))
+        self.assertIsNone(prompt_key('m', ['x', object()]))
+
+    def test_ttl_and_lru_eviction(self):
+        from core.ai_cache import PromptCache
+
+        now = [0]
+        lru = PromptCache(max_entries=2, ttl=60, clock=lambda: now[0])
+        lru.set('a', 'm', 'A')
+        lru.set('b', 'm', 'B')
+        self.assertEqual(lru.get('a', 'm'), 'A')  # 'a' passa a ser o mais recente
+        lru.set('c', 'm', 'C')
+        self.assertIsNone(lru.get('b', 'm'))
+        self.assertEqual(lru.get('a', 'm'), 'A')
+
+        now[0] = 61
+        self.assertIsNone(lru.get('a', 'm'))
+        self.assertEqual(lru.stats()['models']['m'], {'hits': 2, 'misses': 2, 'evictions': 1})
+
+    def test_evictions_count_under_the_evicted_model(self):
+        from core.ai_cache import PromptCache
+
+        lru = PromptCache(max_entries=1, ttl=60)
+        lru.set('a', 'flash', 'A')
+        lru.set('b', 'pro', 'B')
+        self.assertEqual(lru.stats()['models'], {'flash': {'hits': 0, 'misses': 0, 'evictions': 1}})
+
+
+class ConversationMemoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        self.conversation = Conversation.objects.create(user=self.user, ai_type='mentor', title='Longa')
+
+    def _add_messages(self, count, start=0):
+        from .models import Message
+
+        Message.objects.bulk_create([
+            Message(conversation=self.conversation, role='user' if i % 2 == 0 else 'assistant', content=f'mensagem {i} ' + 'x' * 190)
+            for i in range(start, start + count)
+        ])
+
+    def _memory(self, **kwargs):
+        from .memory import ConversationMemory
+
+        return ConversationMemory(self.conversation, 'Sofia', 'gemini-2.5-flash', **kwargs)
+
+    def test_prompt_keeps_the_newest_turns_and_stays_flat(self):
+        from core.ai_provider import FakeProvider, use_provider
+        from .services import AIChatService
+
+        with use_provider(FakeProvider()):
+            chat = AIChatService(self.user, 'mentor')
+            self._add_messages(100)
+            short_prompt, _ = chat.build_chat_prompt(self.conversation, 'oi')
+            self._add_messages(2000, start=100)
+            long_prompt, _ = chat.build_chat_prompt(self.conversation, 'oi')
+
+        self.assertIn('mensagem 2099 ', long_prompt)
+        self.assertNotIn('mensagem 0 ', long_prompt)
+        self.assertLess(abs(len(long_prompt) - len(short_prompt)), 300)
+
+    def test_overflow_is_folded_into_the_summary(self):
+        from core.ai_provider import FakeProvider, use_provider
+
+        self._add_messages(30)
+        memory = self._memory(token_budget=200, summary_tokens=50)
+        with use_provider(FakeProvider(reply='Usuário quer meditar todo dia')) as fake:
+            folded = memory.fold_overflow()
+
+        # ~51 tokens por mensagem: lotes de 3, no máximo 3 lotes por resposta
+        self.assertEqual(folded, 9)
+        self.assertEqual(len(fake.calls), 3)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.summary, 'Usuário quer meditar todo dia')
+        first_id = self.conversation.messages.order_by('id').first().id
+        self.assertEqual(self.conversation.summarized_until_id, first_id + 8)
+
+        with use_provider(FakeProvider(reply='Resumo novo')):
+            while memory.fold_overflow():
+                pass
+        window = memory.recent_messages()
+        self.assertEqual(self.conversation.summarized_until_id, window[0].id - 1)
+        self.assertTrue(memory.history_text().startswith('(Resumo da conversa até aqui: Resumo novo)'))
+
+    def test_small_overflow_waits_for_half_a_budget(self):
+        from core.ai_provider import FakeProvider, use_provider
+
+        self._add_messages(4)  # 4 x ~51 tokens: uma mensagem fica fora da janela de 200
+        memory = self._memory(token_budget=200, summary_tokens=50)
+        with use_provider(FakeProvider()) as fake:
+            self.assertEqual(memory.fold_overflow(), 0)
+            self._add_messages(1, start=4)  # duas fora da janela: ~102 tokens
+            self.assertEqual(memory.fold_overflow(), 2)
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_summary_runs_after_the_response_is_sent(self):
+        from unittest import mock
+
+        from rest_framework.response import Response
+
+        from core.ai_provider import FakeProvider, use_provider
+        from core.responses import call_after_response
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with use_provider(FakeProvider(reply='Ok')), mock.patch('users.services.AIChatService.remember') as remember:
+            response = client.post(
+                f'/api/auth/conversations/{self.conversation.id}/send_message/', {'message': 'oi'}, format='json',
+            )
+            self.assertEqual(response.status_code, 200)
+            remember.assert_called_once()
+
+        # Só roda quando o servidor chama close(), depois de enviar o corpo
+        callback = mock.Mock()
+        response = call_after_response(Response({}), callback)
+        callback.assert_not_called()
+        response.close()
+        callback.assert_called_once()
+
+
+class ProfileTimezoneTests(TransactionTestCase):
+    """Sem a transação do TestCase: o on_commit roda de verdade, como em produção (autocommit)"""
+
+    def test_stats_are_invalidated_after_the_summary_rebuild(self):
+        from datetime import datetime, timezone as dt_timezone
+        from unittest import mock
+
+        from tracker import stats_cache
+        from tracker.models import DailySummary, Workout
+
+        user = User.objects.create_user(username='senshi', password='senha-forte-123')
+        client = APIClient()
+        client.force_authenticate(user)
+        client.post('/api/auth/profile/', {'timezone': 'UTC'}, format='json')
+        # 01:00 UTC do dia 10: dia 10 em UTC, dia 9 em São Paulo
+        Workout.objects.create(user=user, date_time=datetime(2025, 3, 10, 1, 0, tzinfo=dt_timezone.utc))
+
+        seen = []
+        invalidate = stats_cache.invalidate_stats
+
+        def record(user_id, stats):
+            seen.append(list(DailySummary.objects.filter(user=user).values_list('date', flat=True)))
+            invalidate(user_id, stats)
+
+        with mock.patch('tracker.stats_cache.invalidate_stats', side_effect=record):
+            response = client.post('/api/auth/profile/', {'timezone': 'America/Sao_Paulo'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(seen)
+        self.assertTrue(all(days == [datetime(2025, 3, 9).date()] for days in seen))
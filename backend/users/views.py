@@ -1,8 +1,13 @@
+from django.db import transaction
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
+from core.responses import call_after_response
+from tracker.queryset_plan import optimize_for_request
 from .models import UserProfile, AIInsight, Conversation, Message
+from .streaming import ERROR_MESSAGE, EventStreamRenderer, event_stream_response
 from .serializers import (
     UserProfileSerializer, AIInsightSerializer, UserRegistrationSerializer,
     EmailOrUsernameTokenObtainPairSerializer, ConversationSerializer,
@@ -60,17 +65,28 @@ class UserProfileViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         # Não permite criar novo perfil, apenas atualizar
-        profile = self.get_object()
-        serializer = self.get_serializer(profile, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data)
+        return self.update(request, *args, **kwargs)
 
     def update(self, request, *args, **kwargs):
         profile = self.get_object()
+        previous_timezone = profile.timezone
         serializer = self.get_serializer(profile, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+
+        from tracker.services import bump_data_versions, rebuild_daily_summaries
+
+        # Uma transação: a invalidação das estatísticas (on_commit do save) só roda
+        # depois que o resumo diário já foi refeito no fuso novo
+        with transaction.atomic():
+            serializer.save()
+
+            # Altura, nascimento e fuso mudam as métricas e estatísticas: invalida os ETags
+            bump_data_versions(request.user.id, ['profile'])
+
+            if profile.timezone != previous_timezone:
+                # Treinos e diário mudam de dia quando o fuso muda: refaz o resumo diário
+                rebuild_daily_summaries([request.user.id])
+
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
@@ -100,6 +116,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
 class AIInsightViewSet(viewsets.ModelViewSet):
     serializer_class = AIInsightSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         queryset = AIInsight.objects.filter(user=self.request.user)
@@ -118,7 +135,9 @@ class AIInsightViewSet(viewsets.ModelViewSet):
         if insight_type:
             queryset = queryset.filter(insight_type=insight_type)
 
-        return queryset
+        return optimize_for_request(
+            queryset, self.request, self.get_serializer_class(), extra_columns=['created_at']
+        )
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
@@ -149,12 +168,16 @@ class ConversationViewSet(viewsets.ModelViewSet):
     ViewSet para gerenciar conversas com IAs especializadas
     """
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-updated_at', '-id')
 
     def get_queryset(self):
-        return Conversation.objects.filter(user=self.request.user)
+        queryset = Conversation.objects.filter(user=self.request.user)
+        return optimize_for_request(
+            queryset, self.request, self.get_serializer_class(), extra_columns=['updated_at']
+        )
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'by_ai_type'):
             return ConversationListSerializer
         return ConversationSerializer
 
@@ -223,9 +246,56 @@ class ConversationViewSet(viewsets.ModelViewSet):
             conversation.title = title
             conversation.save()
 
-        # Retornar conversa atualizada
+        # Retornar conversa atualizada; o resumo das mensagens antigas roda depois do envio
         serializer = ConversationSerializer(conversation)
-        return Response(serializer.data)
+        return call_after_response(Response(serializer.data), lambda: ai_service.remember(conversation))
+
+    @action(detail=True, methods=['post'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def stream_message(self, request, pk=None):
+        """
+        Como send_message, mas devolve a resposta da IA em Server-Sent Events:
+        eventos `token` com {"text"} à medida que o modelo gera e um `done` final com a
+        mensagem gravada e o título da conversa (ver users/streaming.py).
+        """
+        from .services import AIChatService
+
+        conversation = self.get_object()
+        user_message_content = request.data.get('message', '').strip()
+
+        if not user_message_content:
+            return Response(
+                {"error": "Mensagem não pode estar vazia"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        Message.objects.create(
+            conversation=conversation,
+            role='user',
+            content=user_message_content
+        )
+
+        ai_service = AIChatService(user=request.user, ai_type=conversation.ai_type)
+        prompt, context = ai_service.build_chat_prompt(conversation, user_message_content)
+
+        def finish(ai_response_content):
+            # Grava a resposta completa só quando o stream termina
+            ai_message = Message.objects.create(
+                conversation=conversation,
+                role='assistant',
+                content=(ai_response_content or '').strip() or ERROR_MESSAGE,
+                context_used=context if ai_response_content else None
+            )
+            if conversation.messages.count() == 2:  # User + Assistant
+                conversation.title = ai_service.generate_conversation_title(user_message_content)
+            conversation.save()
+            return {
+                "message": MessageSerializer(ai_message).data,
+                "conversation": {"id": conversation.id, "title": conversation.title},
+            }
+
+        response = event_stream_response(request, ai_service.stream_chat_response(prompt), finish)
+        # Resume as mensagens antigas só depois que o stream fecha
+        return call_after_response(response, lambda: ai_service.remember(conversation))
 
     @action(detail=True, methods=['delete'])
     def clear_history(self, request, pk=None):
@@ -235,6 +305,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
         conversation = self.get_object()
         conversation.messages.all().delete()
         conversation.title = "Nova Conversa"
+        conversation.summary = ''
+        conversation.summarized_until = None
         conversation.save()
 
         return Response({"message": "Histórico limpo com sucesso"})
@@ -253,5 +325,6 @@ class ConversationViewSet(viewsets.ModelViewSet):
             )
 
         conversations = self.get_queryset().filter(ai_type=ai_type)
-        serializer = ConversationListSerializer(conversations, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(conversations)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
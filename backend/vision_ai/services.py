@@ -1,15 +1,14 @@
-import google.generativeai as genai
-from decouple import config
+import hashlib
+
 from PIL import Image
 
+from core.ai_provider import generate_text
+
 class GeminiVisionService:
     def __init__(self):
-        # 1. Configura a chave pegando do arquivo .env (Segurança!)
-        api_key = config('GEMINI_API_KEY')
-        genai.configure(api_key=api_key)
-        
-        # 2. Escolhe o modelo. O 'flash' é mais rápido e barato para testes.
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        # Modelo compartilhado pelo processo (core/ai_provider.py).
+        # O 'flash' é mais rápido e barato para testes.
+        self.model_name = 'gemini-2.5-flash'
 
     def analyze_image(self, image_file):
         """
@@ -17,6 +16,12 @@ class GeminiVisionService:
         e retorna a descrição.
         """
         try:
+            # Digest dos bytes enviados: chave do cache sem decodificar os pixels
+            digest = hashlib.sha256()
+            for chunk in image_file.chunks():
+                digest.update(chunk)
+            image_file.seek(0)
+
             # Abre a imagem usando PIL (Python Imaging Library)
             img = Image.open(image_file)
             
@@ -32,10 +37,8 @@ class GeminiVisionService:
                 Se a imagem não for comida, diga "Isso não parece ser comida".
                 """
             
-            # Envia para o Gemini
-            response = self.model.generate_content([prompt, img])
-            
-            return response.text
+            # Envia para o Gemini (imagem idêntica = resposta do cache, sem rede)
+            return generate_text([prompt, img], model=self.model_name, cache_key=[prompt, digest.digest()])
         except Exception as e:
             print(f"Erro no Gemini: {e}")
             return "Desculpe, não consegui identificar a imagem no momento."
\ No newline at end of file
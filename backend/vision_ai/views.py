@@ -6,7 +6,7 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from .services import GeminiVisionService
 from .models import Analysis
 from rest_framework.permissions import IsAuthenticated
-import google.generativeai as genai
+from core.ai_provider import generate_text, get_provider
 import os
 import tempfile
 
@@ -102,10 +102,8 @@ class TranscribeAudioView(APIView):
             }, status=400)
 
         try:
-            # Configurar Gemini com API Key (mesmo método usado no services.py)
-            from decouple import config
-            api_key = config('GEMINI_API_KEY')
-            genai.configure(api_key=api_key)
+            # Gemini já configurado uma vez por processo (core/ai_provider.py)
+            provider = get_provider()
 
             # Salvar temporariamente o áudio
             with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as temp_audio:
@@ -115,7 +113,7 @@ class TranscribeAudioView(APIView):
 
             try:
                 # Upload do arquivo para o Gemini
-                uploaded_file = genai.upload_file(temp_path)
+                uploaded_file = provider.upload_file(temp_path)
 
                 # Aguardar processamento do arquivo (até 30 segundos)
                 import time
@@ -124,7 +122,7 @@ class TranscribeAudioView(APIView):
                 while uploaded_file.state.name == "PROCESSING" and wait_time < max_wait:
                     time.sleep(2)
                     wait_time += 2
-                    uploaded_file = genai.get_file(uploaded_file.name)
+                    uploaded_file = provider.get_file(uploaded_file.name)
 
                 if uploaded_file.state.name == "FAILED":
                     raise Exception(f"Gemini rejeitou o arquivo. Estado: {uploaded_file.state.name}. Verifique o formato do áudio.")
@@ -132,21 +130,20 @@ class TranscribeAudioView(APIView):
                 if uploaded_file.state.name == "PROCESSING":
                     raise Exception(f"Timeout ao processar áudio após {max_wait}s. Tente um arquivo menor.")
 
-                # Usar o modelo Gemini que suporta áudio
-                # gemini-1.5-flash ou gemini-1.5-pro (sem o -latest)
-                model = genai.GenerativeModel('gemini-1.5-flash')
-
                 # Prompt para transcrição
                 prompt = """
                 Por favor, transcreva este áudio em português brasileiro.
                 Retorne apenas a transcrição do que foi dito, sem comentários adicionais.
                 """
 
-                response = model.generate_content([uploaded_file, prompt])
-                transcription = response.text.strip()
+                # Modelo Gemini que suporta áudio: gemini-1.5-flash ou gemini-1.5-pro (sem o -latest)
+                # Arquivo enviado ao Gemini não é endereçável por conteúdo: sem cache
+                transcription = generate_text(
+                    [uploaded_file, prompt], model='gemini-1.5-flash', cache=False
+                ).strip()
 
                 # Deletar arquivo do Gemini e limpar arquivo temporário local
-                genai.delete_file(uploaded_file.name)
+                provider.delete_file(uploaded_file.name)
                 os.unlink(temp_path)
 
                 return Response({
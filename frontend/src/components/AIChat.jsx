@@ -1,4 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
+import { resultsOf } from '../utils/pagination';
+import { readEventStream } from '../utils/eventStream';
 
 const API_URL = window.location.hostname === 'localhost'
   ? 'http://127.0.0.1:8000'
@@ -57,7 +59,7 @@ function AIChat({ token }) {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       const data = await response.json();
-      setConversations(data);
+      setConversations(resultsOf(data));
     } catch (err) {
       console.error('Erro ao carregar conversas:', err);
     }
@@ -102,31 +104,43 @@ function AIChat({ token }) {
     setLoading(true);
     setError('');
 
-    // Adiciona mensagem do usuário otimisticamente
+    // Adiciona mensagem do usuário otimisticamente; a resposta da IA chega em pedaços (SSE)
     const tempUserMsg = { role: 'user', content: userMsg, created_at: new Date() };
-    setMessages([...messages, tempUserMsg]);
+    const history = [...messages, tempUserMsg];
+    setMessages(history);
 
     try {
       const response = await fetch(
-        `${API_URL}/api/auth/conversations/${currentConversation.id}/send_message/`,
+        `${API_URL}/api/auth/conversations/${currentConversation.id}/stream_message/`,
         {
           method: 'POST',
           headers: {
             'Authorization': `Bearer ${token}`,
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
           },
           body: JSON.stringify({ message: userMsg })
         }
       );
 
-      if (response.ok) {
-        const data = await response.json();
-        setMessages(data.messages || []);
-        setCurrentConversation(data);
-        loadConversations(); // Atualizar lista de conversas
-      } else {
+      if (!response.ok) {
         setError('Erro ao enviar mensagem');
+        return;
       }
+
+      let reply = '';
+      await readEventStream(response, (event, data) => {
+        if (event === 'token') {
+          reply += data.text;
+          setMessages([...history, { role: 'assistant', content: reply, created_at: new Date() }]);
+        } else if (event === 'error') {
+          setError(data.error || 'Erro ao gerar resposta');
+        } else if (event === 'done') {
+          setMessages([...history, data.message]);
+          setCurrentConversation((current) => ({ ...current, title: data.conversation.title }));
+          loadConversations(); // Atualizar lista de conversas
+        }
+      });
     } catch (err) {
       setError('Erro de conexão');
     } finally {
@@ -269,7 +283,7 @@ function AIChat({ token }) {
                   </div>
                 ))
               )}
-              {loading && (
+              {loading && messages[messages.length - 1]?.role !== 'assistant' && (
                 <div style={{ display: 'flex', justifyContent: 'flex-start', marginBottom: '15px' }}>
                   <div style={{ padding: '12px 16px', borderRadius: '12px', background: 'white', border: '1px solid #e0e0e0' }}>
                     <div style={{ display: 'flex', gap: '4px' }}>
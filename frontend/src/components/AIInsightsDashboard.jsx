@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react';
 import { Sparkles, AlertTriangle, Lightbulb, Trophy, X, Check, RefreshCw } from 'lucide-react';
+import { resultsOf } from '../utils/pagination';
 
 const API_URL = window.location.hostname === 'localhost'
   ? 'http://127.0.0.1:8000'
@@ -28,7 +29,7 @@ const AIInsightsDashboard = ({ token }) => {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       const data = await response.json();
-      setInsights(data);
+      setInsights(resultsOf(data));
     } catch (error) {
       console.error('Erro ao carregar insights:', error);
     } finally {
@@ -1,4 +1,5 @@
 import { useEffect, useState } from 'react';
+import { fetchAllPages, resultsOf } from '../utils/pagination';
 
 const API_URL = window.location.hostname === 'localhost'
   ? 'http://127.0.0.1:8000'
@@ -33,14 +34,17 @@ const HabitTrackerWheel = ({ token }) => {
       const habitsResponse = await fetch(`${API_URL}/api/tracker/habits/`, {
         headers: { 'Authorization': `Bearer ${token}` }
       });
-      const habitsData = await habitsResponse.json();
+      const habitsData = resultsOf(await habitsResponse.json());
       setHabits(habitsData.slice(0, 8)); // Limita a 8 hábitos para não poluir
 
-      // Busca todos os logs do mês atual
-      const logsResponse = await fetch(`${API_URL}/api/tracker/habit-logs/`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      const logsData = await logsResponse.json();
+      // Busca os logs do mês atual: vêm do mais recente ao mais antigo,
+      // então para de paginar ao chegar antes do início do mês
+      const monthStart = new Date(currentYear, currentMonth, 1);
+      const logsData = await fetchAllPages(
+        `${API_URL}/api/tracker/habit-logs/?page_size=200`,
+        { headers: { 'Authorization': `Bearer ${token}` } },
+        (page) => page.some(log => new Date(`${log.date}T00:00:00`) < monthStart)
+      );
 
       // Filtra logs do mês atual
       const monthLogs = logsData.filter(log => {
@@ -7,6 +7,7 @@ import {
   Legend,
 } from 'chart.js';
 import { PolarArea } from 'react-chartjs-2';
+import { resultsOf } from '../utils/pagination';
 
 ChartJS.register(RadialLinearScale, ArcElement, Tooltip, Legend);
 
@@ -26,7 +27,7 @@ const LifeWheel = ({ token }) => {
       const response = await fetch(`${API_URL}/api/tracker/life-assessments/`, {
         headers: { 'Authorization': `Bearer ${token}` }
       });
-      const result = await response.json();
+      const result = resultsOf(await response.json());
 
       if (result.length > 0) {
         const latest = result[0];
@@ -3,6 +3,7 @@
 import { useState, useEffect, useCallback } from 'react';
 import axiosInstance from '../utils/axiosInstance'; // Assumindo que você usa um axiosInstance configurado
 import { format } from 'date-fns';
+import { resultsOf } from '../utils/pagination';
 
 const useDailyHabits = (currentUserId) => {
     const [habits, setHabits] = useState([]);
@@ -18,7 +19,7 @@ const useDailyHabits = (currentUserId) => {
         try {
             // 1. Busca todos os hábitos (lista mestra)
             const masterHabitsResponse = await axiosInstance.get('/tracker/habits/');
-            const masterHabits = masterHabitsResponse.data;
+            const masterHabits = resultsOf(masterHabitsResponse.data);
 
             // 2. Busca os logs criados para HOJE
             // O backend já filtra por usuário e data de hoje.
@@ -61,36 +62,18 @@ const useDailyHabits = (currentUserId) => {
         const newCompletedStatus = !currentStatus;
         
         try {
-            // Se o Log já existe, faz PATCH (atualiza)
-            if (currentLogId) {
-                await axiosInstance.patch(`/tracker/daily-habits/${currentLogId}/`, {
-                    completed: newCompletedStatus,
-                    // Você pode adicionar 'value' aqui se for um hábito quantificável
-                });
-            } else {
-                // Se o Log não existe, faz POST (cria)
-                const newLogDate = format(new Date(), 'yyyyMMdd');
-                const response = await axiosInstance.post('/tracker/daily-habits/', {
-                    habit: habitId,
-                    completed: newCompletedStatus,
-                    date: newLogDate, // O backend já usa a data de hoje, mas é bom enviar
-                });
-                // O backend retornará o novo log. O ID dele precisa ser atualizado no state.
-                const newLogId = response.data.id;
-                
-                // Atualiza o state local com o novo log_id
-                setHabits(prevHabits => 
-                    prevHabits.map(h => 
-                        h.id === habitId ? { ...h, log_id: newLogId, completed: newCompletedStatus } : h
-                    )
-                );
-                return; // Já atualizou o state.
-            }
+            // Upsert: cria o log se não existir ou atualiza o existente (mesma chamada)
+            const response = await axiosInstance.post('/tracker/habit-logs/bulk/', [{
+                habit: habitId,
+                date: format(new Date(), 'yyyy-MM-dd'),
+                completed: newCompletedStatus,
+                value: habitToUpdate.value,
+            }]);
+            const [log] = response.data;
 
-            // Se for PATCH, apenas atualiza o status localmente após o sucesso
             setHabits(prevHabits => 
                 prevHabits.map(h => 
-                    h.id === habitId ? { ...h, completed: newCompletedStatus } : h
+                    h.id === habitId ? { ...h, log_id: log.id ?? currentLogId, completed: newCompletedStatus } : h
                 )
             );
         } catch (err) {
@@ -1,5 +1,6 @@
 import { useState, useEffect, useCallback, useMemo } from 'react';
 import axios from 'axios';
+import { resultsOf } from '../utils/pagination';
 
 // URL dinâmica baseada no ambiente
 const BASE_URL = window.location.hostname === 'localhost'
@@ -34,7 +35,7 @@ const useHabits = (token) => {
 
             // SOLUÇÃO TIPAGEM: 2. Cria uma cópia do array (spread [...]) antes de ordenar.
             // O .sort() em JavaScript pode ser problemático se usado diretamente no state.
-            const sortedData = [...response.data].sort((a, b) => a.id - b.id);
+            const sortedData = [...resultsOf(response.data)].sort((a, b) => a.id - b.id);
 
             console.log('Hábitos carregados:', sortedData);
             console.log('Primeiro hábito (para debug):', sortedData[0]);
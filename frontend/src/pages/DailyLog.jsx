@@ -30,6 +30,7 @@ import {
 import useHabits from '../hooks/useHabits';
 import { formatDateBR, formatRelativeDate } from '../utils/dateFormat';
 import DateInputBR from '../components/DateInputBR';
+import { resultsOf } from '../utils/pagination';
 
 const API_URL = window.location.hostname === 'localhost'
   ? 'http://127.0.0.1:8000'
@@ -98,7 +99,7 @@ const DailyLog = ({ token }) => {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       const data = await res.json();
-      setTemplates(data);
+      setTemplates(resultsOf(data));
     } catch (err) {
       console.error("Erro ao carregar templates:", err);
     }
@@ -123,7 +124,7 @@ const DailyLog = ({ token }) => {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       if (habitLogsRes.ok) {
-        const habitLogsData = await habitLogsRes.json();
+        const habitLogsData = resultsOf(await habitLogsRes.json());
         const completedIds = habitLogsData
           .filter(log => log.completed)
           .map(log => log.habit);
@@ -135,7 +136,7 @@ const DailyLog = ({ token }) => {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       if (workoutsRes.ok) {
-        const workoutsData = await workoutsRes.json();
+        const workoutsData = resultsOf(await workoutsRes.json());
         if (workoutsData.length > 0) {
           const workout = workoutsData[0];
           try {
@@ -154,7 +155,7 @@ const DailyLog = ({ token }) => {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       if (journalRes.ok) {
-        const journalData = await journalRes.json();
+        const journalData = resultsOf(await journalRes.json());
         if (journalData.length > 0) {
           const entry = journalData[0];
 
@@ -416,31 +417,27 @@ const DailyLog = ({ token }) => {
     setSaved(false);
 
     try {
-      // 1. Salvar hábitos completados
+      // 1. Salvar hábitos completados (todos em uma única requisição)
       const completedHabitsIds = Array.from(checkedHabits);
       if (completedHabitsIds.length > 0) {
-        const habitResponses = await Promise.all(completedHabitsIds.map(async habitId => {
-          const response = await fetch(`${API_URL}/api/tracker/habit-logs/`, {
-            method: 'POST',
-            headers: {
-              'Authorization': `Bearer ${token}`,
-              'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-              habit: habitId,
-              date: date,
-              completed: true
-            })
-          });
-
-          if (!response.ok) {
-            const errorText = await response.text();
-            console.error(`Erro ao salvar hábito ${habitId}:`, response.status, errorText);
-            throw new Error(`Erro ao salvar hábito: ${response.status}`);
-          }
+        const habitResponse = await fetch(`${API_URL}/api/tracker/habit-logs/bulk/`, {
+          method: 'POST',
+          headers: {
+            'Authorization': `Bearer ${token}`,
+            'Content-Type': 'application/json'
+          },
+          body: JSON.stringify(completedHabitsIds.map(habitId => ({
+            habit: habitId,
+            date: date,
+            completed: true
+          })))
+        });
 
-          return response;
-        }));
+        if (!habitResponse.ok) {
+          const errorText = await habitResponse.text();
+          console.error('Erro ao salvar hábitos:', habitResponse.status, errorText);
+          throw new Error(`Erro ao salvar hábitos: ${habitResponse.status}`);
+        }
         console.log('✅ Hábitos salvos com sucesso');
       }
 
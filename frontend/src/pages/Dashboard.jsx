@@ -25,6 +25,7 @@ import useHabits from '../hooks/useHabits';
 import useHabitStats from '../hooks/useHabitStats';
 import useProgressComparison from '../hooks/useProgressComparison';
 import useBodyMetrics from '../hooks/useBodyMetrics';
+import { resultsOf } from '../utils/pagination';
 
 const API_URL = window.location.hostname === 'localhost'
   ? 'http://127.0.0.1:8000'
@@ -61,9 +62,9 @@ const Dashboard = ({ token }) => {
       const res = await fetch(`${API_URL}/api/tracker/life-assessments/`, {
         headers: { 'Authorization': `Bearer ${token}` }
       });
-      const data = await res.json();
+      const data = resultsOf(await res.json());
       if (data.length > 0) {
-        const latest = data[data.length - 1];
+        const latest = data[0]; // lista vem da avaliação mais recente para a mais antiga
         setLifeAreas([
           { name: 'Saúde', value: latest.health || 0, icon: Heart, color: 'from-red-500 to-pink-500' },
           { name: 'Carreira', value: latest.career || 0, icon: Briefcase, color: 'from-blue-500 to-cyan-500' },
@@ -21,44 +21,37 @@ const History = ({ token }) => {
   const fetchHistory = async () => {
     setLoading(true);
     try {
-      // Buscar dados dos últimos N dias
+      // Buscar dados dos últimos N dias em uma única chamada (paginada por dias)
       const today = new Date();
-      const historyData = [];
-
-      for (let i = 0; i < days; i++) {
-        const currentDate = new Date(today);
-        currentDate.setDate(today.getDate() - i);
-        const dateStr = currentDate.toISOString().split('T')[0];
-
-        // Buscar dados do dia
-        const [habitLogs, workouts, journals] = await Promise.all([
-          fetch(`${API_URL}/api/tracker/habit-logs/?date=${dateStr}`, {
-            headers: { 'Authorization': `Bearer ${token}` }
-          }).then(res => res.ok ? res.json() : []),
+      const fromDate = new Date(today);
+      fromDate.setDate(today.getDate() - (days - 1));
+      const toStr = today.toISOString().split('T')[0];
+      const fromStr = fromDate.toISOString().split('T')[0];
 
-          fetch(`${API_URL}/api/tracker/workouts/?date=${dateStr}`, {
-            headers: { 'Authorization': `Bearer ${token}` }
-          }).then(res => res.ok ? res.json() : []),
+      const historyData = [];
+      let cursor = null;
 
-          fetch(`${API_URL}/api/tracker/journal/?date=${dateStr}`, {
-            headers: { 'Authorization': `Bearer ${token}` }
-          }).then(res => res.ok ? res.json() : [])
-        ]);
+      do {
+        const params = new URLSearchParams({ from: fromStr, to: toStr, page_size: days });
+        if (cursor) params.set('cursor', cursor);
 
-        const completedHabits = habitLogs.filter(log => log.completed);
-        const workout = workouts.length > 0 ? workouts[0] : null;
-        const journal = journals.length > 0 ? journals[0] : null;
+        const res = await fetch(`${API_URL}/api/tracker/timeline/?${params}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!res.ok) break;
+        const page = await res.json();
 
-        // Só adicionar se tiver algum dado
-        if (completedHabits.length > 0 || workout || journal) {
+        page.days.forEach(day => {
           historyData.push({
-            date: dateStr,
-            completedHabits,
-            workout,
-            journal
+            date: day.date,
+            completedHabits: day.habit_logs,
+            workout: day.workouts.length > 0 ? day.workouts[0] : null,
+            journal: day.journal.length > 0 ? day.journal[0] : null
           });
-        }
-      }
+        });
+
+        cursor = page.next_cursor;
+      } while (cursor);
 
       setHistory(historyData);
     } catch (error) {
@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import { Trash2, Plus, Save, Settings, Dumbbell, Copy, X, Check, Search } from 'lucide-react';
+import { resultsOf } from '../utils/pagination';
 
 const API_URL = window.location.hostname === 'localhost'
   ? 'http://127.0.0.1:8000'
@@ -33,7 +34,7 @@ const Training = ({ token }) => {
         headers: { 'Authorization': `Bearer ${token}` }
       });
       const dataTemp = await resTemp.json();
-      setTemplates(dataTemp);
+      setTemplates(resultsOf(dataTemp));
 
       fetchExercises();
     } catch (err) {
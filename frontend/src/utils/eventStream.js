@@ -0,0 +1,47 @@
+/**
+ * Respostas em Server-Sent Events (text/event-stream) lidas via fetch.
+ * EventSource não serve aqui: só faz GET e não envia o header Authorization.
+ */
+
+/**
+ * Interpreta um bloco "event: x\ndata: {...}"
+ * @param {string} block - Texto entre duas linhas em branco
+ * @returns {{event: string, data: Object}|null}
+ */
+const parseEvent = (block) => {
+  let event = 'message';
+  const data = [];
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+  }
+  return data.length ? { event, data: JSON.parse(data.join('\n')) } : null;
+};
+
+/**
+ * Lê o corpo da resposta e chama onEvent para cada evento recebido
+ * @param {Response} response - Resposta do fetch
+ * @param {Function} onEvent - Recebe (event, data)
+ */
+export const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const flush = (block) => {
+    const parsed = parseEvent(block);
+    if (parsed) onEvent(parsed.event, parsed.data);
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      flush(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+    }
+  }
+  if (buffer.trim()) flush(buffer);
+};
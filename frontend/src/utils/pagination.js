@@ -0,0 +1,40 @@
+/**
+ * Listas da API vêm paginadas por cursor: { next, previous, results }.
+ * Endpoints sem paginação continuam retornando um array simples.
+ */
+
+/**
+ * Itens de uma resposta de lista (paginada ou não)
+ * @param {Object|Array} data - Corpo JSON da resposta
+ * @returns {Array} Itens da página
+ */
+export const resultsOf = (data) => {
+  if (Array.isArray(data)) return data;
+  return data?.results || [];
+};
+
+/**
+ * Busca todas as páginas seguindo o cursor `next`
+ * @param {string} url - URL da primeira página
+ * @param {Object} options - Opções do fetch (headers com o token)
+ * @param {Function} [shouldStop] - Recebe os itens da página; retorna true para parar antes do fim
+ * @returns {Promise<Array>} Itens de todas as páginas buscadas
+ */
+export const fetchAllPages = async (url, options, shouldStop) => {
+  let items = [];
+  let next = url;
+
+  while (next) {
+    const response = await fetch(next, options);
+    if (!response.ok) throw new Error(`Erro ${response.status} ao buscar ${next}`);
+
+    const data = await response.json();
+    const page = resultsOf(data);
+    items = items.concat(page);
+
+    if (Array.isArray(data) || (shouldStop && shouldStop(page))) break;
+    next = data.next;
+  }
+
+  return items;
+};